@@ -9,6 +9,8 @@ import psutil
 import logging
 from pyrogram import Client
 from pyrogram.types import Message
+from datetime import datetime, timedelta
+from database import format_timestamp
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +26,10 @@ async def handle_admin_commands(client: Client, message: Message, db, runner):
         await handle_restart(client, message, db, runner)
     elif command == "stats":
         await handle_stats(client, message, db, runner)
+    elif command == "quarantine":
+        await handle_quarantine(client, message, db)
+    elif command == "release":
+        await handle_release(client, message, db, runner)
 
 async def handle_broadcast(client: Client, message: Message, db):
     """Broadcast message to all users"""
@@ -73,17 +79,10 @@ async def handle_broadcast(client: Client, message: Message, db):
 
 async def handle_total(client: Client, message: Message, db):
     """Show total statistics"""
-    stats = await db.get_stats()
-    all_bots = await db.get_all_bots()
-    
-    # Count bots per user
-    user_bot_counts = {}
-    for bot in all_bots:
-        user_id = bot["user_id"]
-        user_bot_counts[user_id] = user_bot_counts.get(user_id, 0) + 1
+    stats = await db.get_detailed_stats()
     
     # Top users
-    top_users = sorted(user_bot_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+    top_users = [(user["_id"], user["bot_count"]) for user in stats["top_users"][:5]]
     
     text = f"""
 📊 **Bot Hoster Statistics**
@@ -150,6 +149,144 @@ async def handle_restart(client: Client, message: Message, db, runner):
             f"Check logs for more details."
         )
 
+async def handle_quarantine(client: Client, message: Message, db):
+    """List crash-looping bots that are no longer auto-restarted"""
+    bots = await db.get_quarantined_bots()
+    
+    if not bots:
+        await message.reply_text("✅ **No quarantined bots**")
+        return
+    
+    total_seconds = sum(bot.get("quarantine", {}).get("restart_seconds", 0) for bot in bots)
+    
+    text = f"""
+🚫 **Quarantined Bots**
+
+Crash-looping bots: `{len(bots)}`
+⏱️ Time spent restarting: `{total_seconds:.1f}s`
+
+━━━━━━━━━━━━━━━━
+"""
+    
+    for idx, bot in enumerate(bots[:20], 1):
+        quarantine = bot.get("quarantine", {})
+        text += (
+            f"{idx}. @{bot.get('bot_username', 'unknown')} (ID: `{bot['_id']}`)\n"
+            f"   🔄 Restarts: {quarantine.get('restarts', 0)} | "
+            f"⏱️ {quarantine.get('restart_seconds', 0):.1f}s\n"
+            f"   ⚠️ {quarantine.get('reason', 'unknown')} since {format_timestamp(quarantine.get('since'))}\n"
+        )
+    
+    if len(bots) > 20:
+        text += f"\n... and {len(bots) - 20} more\n"
+    
+    text += "\nUse `/release <bot_id>` to lift a quarantine"
+    
+    await message.reply_text(text)
+
+async def handle_release(client: Client, message: Message, db, runner):
+    """Lift the quarantine of a crash-looping bot"""
+    if len(message.command) < 2:
+        await message.reply_text(
+            "**🔓 Release Command**\n\n"
+            "Usage: `/release <bot_id>`\n\n"
+            "Example: `/release 507f1f77bcf86cd799439011`"
+        )
+        return
+    
+    bot_id = message.command[1]
+    
+    bot = await db.get_bot(bot_id)
+    if not bot:
+        await message.reply_text("❌ Bot not found!")
+        return
+    
+    if bot.get("status") != "crash_looping":
+        await message.reply_text("⚠️ Bot is not quarantined!")
+        return
+    
+    runner.restart_policy.reset(bot_id)
+    await db.update_bot_status(bot_id, "stopped")
+    
+    await message.reply_text(
+        f"🔓 **Quarantine Lifted!**\n\n"
+        f"**Bot ID:** `{bot_id}`\n"
+        f"**Username:** @{bot.get('bot_username', 'unknown')}\n"
+        f"**Status:** 🔴 Stopped (owner can start it again)"
+    )
+
+def format_worker_load(worker_pool):
+    """Format per-worker load of the Python worker pool"""
+    if not worker_pool:
+        return "Python bots run in-process"
+    
+    lines = []
+    for worker in worker_pool.get_load():
+        lines.append(
+            f"#{worker['index']} (pid {worker['pid']}): `{worker['bots']}` bots, "
+            f"CPU `{worker.get('cpu_percent', 0)}%`, RAM `{worker.get('memory_mb', 0)}MB`"
+        )
+    if worker_pool.respawn_count:
+        lines.append(f"♻️ Respawned: `{worker_pool.respawn_count}`")
+    return "\n".join(lines) or "No workers running"
+
+def format_warm_boot(boot_stats: dict):
+    """Format the last warm boot metrics"""
+    if not boot_stats:
+        return "No warm boot yet"
+    
+    return (
+        f"Restored: `{boot_stats['started']}/{boot_stats['total']}`\n"
+        f"❌ Failed: `{boot_stats['failed']}`\n"
+        f"⏱️ Time to restore: `{boot_stats['time_to_restore']}s`"
+    )
+
+def format_build_cache(cache_stats: dict):
+    """Format Go build cache metrics"""
+    return (
+        f"Binaries: `{cache_stats['binaries']}` (`{cache_stats['size_mb']}MB`)\n"
+        f"Toolchain caches: `{cache_stats['toolchain_mb']}MB`\n"
+        f"Hit rate: `{cache_stats['hit_rate']}%` "
+        f"(`{cache_stats['hits']}` hits, `{cache_stats['misses']}` builds)\n"
+        f"❌ Failed builds: `{cache_stats['failures']}`"
+    )
+
+def format_validation_cache(cache_stats: dict):
+    """Format validation cache metrics"""
+    return (
+        f"Hit rate: `{cache_stats['hit_rate']}%` "
+        f"(`{cache_stats['hits'] + cache_stats['db_hits']}` hits, `{cache_stats['misses']}` misses)\n"
+        f"Cached verdicts: `{cache_stats['entries']}`"
+    )
+
+def format_code_cache(cache_stats: dict):
+    """Format Python code cache metrics"""
+    return (
+        f"Hit rate: `{cache_stats['hit_rate']}%` "
+        f"(`{cache_stats['hits'] + cache_stats['disk_hits']}` hits, `{cache_stats['misses']}` compiles)\n"
+        f"⏱️ Compile time saved: `{cache_stats['compile_seconds_saved']}s`\n"
+        f"On disk: `{cache_stats['files']}` (`{cache_stats['size_mb']}MB`)"
+    )
+
+def format_bot_cache(cache_stats: dict):
+    """Format bot document cache metrics"""
+    return (
+        f"Hit rate: `{cache_stats['hit_rate']}%` "
+        f"(`{cache_stats['hits']}` hits, `{cache_stats['misses']}` misses)\n"
+        f"Cached bots: `{cache_stats['entries']}`, invalidations: `{cache_stats['invalidations']}`\n"
+        f"Change stream: `{'on' if cache_stats['change_stream'] else 'off'}`"
+    )
+
+def format_retention(retention: dict):
+    """Format log/state collection sizes and eviction rate"""
+    logs, states = retention['logs'], retention['states']
+    rate = retention['evictions_per_min']
+    return (
+        f"Logs: `{logs['count']}` (`{logs['size_mb']}MB`{', capped' if logs['capped'] else ''})\n"
+        f"States: `{states['count']}` (`{states['size_mb']}MB`)\n"
+        f"🗑️ Evictions: `{rate if rate is not None else 'n/a'}`/min"
+    )
+
 async def handle_stats(client: Client, message: Message, db, runner):
     """Show system statistics"""
     stats = await db.get_stats()
@@ -161,6 +298,13 @@ async def handle_stats(client: Client, message: Message, db, runner):
     
     # Bot stats
     running_bots = await db.get_running_bots()
+    restarted = await db.get_bots_restarted_since(datetime.now() - timedelta(days=1), limit=5)
+    
+    try:
+        retention = format_retention(await db.get_retention_stats())
+    except Exception as e:
+        logger.error(f"Error getting retention stats: {e}")
+        retention = "Unavailable"
     
     text = f"""
 📊 **System Statistics**
@@ -181,6 +325,34 @@ Total Bots: `{stats['total_bots']}`
 ━━━━━━━━━━━━━━━━
 Total Users: `{stats['total_users']}`
 
+**⚙️ Worker Load:**
+━━━━━━━━━━━━━━━━
+{format_worker_load(runner.worker_pool)}
+
+**♻️ Last Warm Boot:**
+━━━━━━━━━━━━━━━━
+{format_warm_boot(runner.warm_boot_stats)}
+
+**🐹 Go Build Cache:**
+━━━━━━━━━━━━━━━━
+{format_build_cache(runner.go_build_cache.get_stats())}
+
+**🧪 Validation Cache:**
+━━━━━━━━━━━━━━━━
+{format_validation_cache(runner.validation_cache.get_stats())}
+
+**🐍 Python Code Cache:**
+━━━━━━━━━━━━━━━━
+{format_code_cache(runner.code_cache.get_stats())}
+
+**🤖 Bot Cache:**
+━━━━━━━━━━━━━━━━
+{format_bot_cache(db.bot_cache.get_stats())}
+
+**🗄️ Log Retention:**
+━━━━━━━━━━━━━━━━
+{retention}
+
 **🏃 Currently Running Bots:**
 ━━━━━━━━━━━━━━━━
 """
@@ -191,6 +363,11 @@ Total Users: `{stats['total_users']}`
     if len(running_bots) > 10:
         text += f"\n... and {len(running_bots) - 10} more\n"
     
+    if restarted:
+        text += "\n**🔁 Restarted in the Last 24h:**\n━━━━━━━━━━━━━━━━\n"
+        for bot in restarted:
+            text += f"• @{bot.get('bot_username', 'unknown')} at {format_timestamp(bot.get('last_restart'))}\n"
+    
     text += f"""
 ━━━━━━━━━━━━━━━━
 ⚡ **Powered by Zero Dev Bro**
@@ -0,0 +1,391 @@
+"""
+Script Analyzer - AST-based analysis of uploaded Python scripts
+Developer: @Zeroboy216
+Channel: @zerodevbro
+
+A single ast.parse pass collects imports, uses of blocked functions (through
+aliases, builtins.* and io.open too; names the script binds itself are not the
+builtins), handler registrations and basic metrics. The tree is compiled into the code object the bot later runs,
+and both are cached by content hash.
+
+Run as a script it analyzes one source read from stdin and prints the result
+as JSON; the validator uses that for uploads too large to parse in-process.
+"""
+
+import ast
+import hashlib
+import json
+import sys
+import time
+from collections import OrderedDict
+
+ANALYSIS_CACHE_SIZE = 256
+
+# Modules whose attributes are the builtins themselves: builtins.open is open
+BUILTIN_MODULES = ("builtins", "__builtins__")
+
+# Other qualified names for a blocked builtin
+BUILTIN_EQUIVALENTS = {"io.open": "open", "os.open": "open", "codecs.open": "open", "os.fdopen": "open"}
+
+COMPREHENSIONS = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+
+
+def script_hash(script: str):
+    return hashlib.sha256(script.encode('utf-8', errors='surrogateescape')).hexdigest()
+
+
+def _dotted_name(node):
+    """'a.b.c' for Name/Attribute chains, None for anything else"""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+def _targets(node):
+    """Names an assignment target binds: 'a, (b, *c)' binds a, b and c"""
+    return {child.id for child in ast.walk(node) if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Store)}
+
+
+def _assigned(stmt):
+    """Names a statement of a module or class body binds once it has run"""
+    if isinstance(stmt, ast.Assign):
+        return set().union(*(_targets(target) for target in stmt.targets))
+    if isinstance(stmt, ast.AnnAssign) and stmt.value is not None:
+        return _targets(stmt.target)
+    if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return {stmt.name}
+    return set()
+
+
+def _locals(node):
+    """Local names of a function or lambda: everything it binds minus global/nonlocal declarations"""
+    args = node.args
+    names = {arg.arg for arg in args.posonlyargs + args.args + args.kwonlyargs + [args.vararg, args.kwarg] if arg}
+    declared = set()
+    pending = list(node.body) if isinstance(node.body, list) else [node.body]
+    while pending:
+        child = pending.pop()
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(child.name)
+            continue
+        if isinstance(child, (ast.Lambda,) + COMPREHENSIONS):
+            continue  # scopes of their own
+        if isinstance(child, (ast.Global, ast.Nonlocal)):
+            declared.update(child.names)
+        elif isinstance(child, ast.Name) and isinstance(child.ctx, (ast.Store, ast.Del)):
+            names.add(child.id)
+        elif isinstance(child, (ast.ExceptHandler, ast.MatchAs, ast.MatchStar)) and child.name:
+            names.add(child.name)
+        elif isinstance(child, ast.MatchMapping) and child.rest:
+            names.add(child.rest)
+        elif isinstance(child, (ast.Import, ast.ImportFrom)):
+            names.update((alias.asname or alias.name).split(".")[0] for alias in child.names if alias.name != "*")
+        pending.extend(ast.iter_child_nodes(child))
+    return names - declared
+
+
+class _Collector(ast.NodeVisitor):
+    """Finds blocked names, following imports and scopes.
+
+    A bare name is only the builtin if nothing binds it first: function locals
+    shadow it for the whole function, module and class bodies only from the
+    statement that binds it (in the same or an enclosing block) onwards.
+    """
+
+    def __init__(self, blocked):
+        self.blocked = blocked  # qualified names, e.g. 'os.system', 'eval'
+        self.builtins = {name for name in blocked if "." not in name}
+        self.aliases = {}       # local name -> qualified name
+        self.scopes = []        # {'kind', 'locals' (functions), 'blocks' (module/class: names bound so far)}
+        self.deleted = set()    # names a 'del' may unbind again
+        self.imports = set()
+        self.hits = []
+        self.handlers = []
+
+    def _canonical(self, name: str):
+        """The blocked name ``name`` stands for: 'builtins.eval' and 'io.open' are 'eval' and 'open'"""
+        name = BUILTIN_EQUIVALENTS.get(name, name)
+        head, _, attr = name.rpartition(".")
+        if head in BUILTIN_MODULES and attr in self.builtins:
+            return attr
+        return name
+
+    def _flag(self, name: str, node):
+        if self._canonical(name) in self.blocked:
+            self.hits.append({'name': name, 'line': node.lineno, 'column': node.col_offset + 1})
+
+    def _resolve(self, dotted: str):
+        head, _, rest = dotted.partition(".")
+        qualified = self.aliases.get(head, head)
+        return f"{qualified}.{rest}" if rest else qualified
+
+    def _is_bound(self, name: str):
+        """Whether ``name`` refers to a variable of the script here rather than to a builtin"""
+        for depth, scope in enumerate(reversed(self.scopes)):
+            if scope['kind'] == 'function':
+                if name in scope['locals']:
+                    return True
+            elif scope['kind'] == 'class' and depth:
+                continue  # a class body isn't visible from the functions in it
+            elif name not in self.deleted and any(name in block for block in scope['blocks']):
+                return True
+        return False
+
+    # Scopes and blocks
+
+    def _visit_block(self, statements, bound=()):
+        blocks = self.scopes[-1]['blocks']
+        blocks.append(set(bound))
+        for statement in statements:
+            self.visit(statement)
+            blocks[-1].update(_assigned(statement))
+        blocks.pop()
+
+    def _visit_scope(self, kind: str, statements, names=()):
+        self.scopes.append({'kind': kind, 'locals': set(names), 'blocks': []})
+        self._visit_block(statements)
+        self.scopes.pop()
+
+    def generic_visit(self, node):
+        for _, value in ast.iter_fields(node):
+            if isinstance(value, list) and value and isinstance(value[0], ast.stmt):
+                self._visit_block(value)
+            elif isinstance(value, list):
+                for item in value:
+                    if isinstance(item, ast.AST):
+                        self.visit(item)
+            elif isinstance(value, ast.AST):
+                self.visit(value)
+
+    def visit_Module(self, node):
+        self.deleted = {
+            child.id for child in ast.walk(node) if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Del)
+        }
+        self._visit_scope('module', node.body)
+
+    def visit_ClassDef(self, node):
+        for child in node.decorator_list + node.bases + node.keywords:
+            self.visit(child)
+        self._visit_scope('class', node.body)
+
+    def _visit_defaults(self, args):
+        # Defaults and annotations are evaluated in the enclosing scope
+        for child in args.defaults + [default for default in args.kw_defaults if default]:
+            self.visit(child)
+        for arg in args.posonlyargs + args.args + args.kwonlyargs + [args.vararg, args.kwarg]:
+            if arg and arg.annotation:
+                self.visit(arg.annotation)
+
+    def _visit_function(self, node):
+        for decorator in node.decorator_list:
+            target = decorator.func if isinstance(decorator, ast.Call) else decorator
+            dotted = _dotted_name(target) or ""
+            if dotted.rpartition(".")[2].startswith("on_"):
+                self.handlers.append({'name': node.name, 'event': dotted.rpartition(".")[2], 'line': node.lineno})
+            self.visit(decorator)
+        self._visit_defaults(node.args)
+        if node.returns:
+            self.visit(node.returns)
+        self._visit_scope('function', node.body, _locals(node))
+
+    visit_FunctionDef = _visit_function
+    visit_AsyncFunctionDef = _visit_function
+
+    def visit_Lambda(self, node):
+        self._visit_defaults(node.args)
+        self.scopes.append({'kind': 'function', 'locals': _locals(node), 'blocks': []})
+        self.visit(node.body)
+        self.scopes.pop()
+
+    def _visit_comprehension(self, node):
+        # The first iterable is evaluated in the enclosing scope
+        self.visit(node.generators[0].iter)
+        names = set().union(*(_targets(generator.target) for generator in node.generators))
+        self.scopes.append({'kind': 'function', 'locals': names, 'blocks': []})
+        for position, generator in enumerate(node.generators):
+            if position:
+                self.visit(generator.iter)
+            for condition in generator.ifs:
+                self.visit(condition)
+        for field in ('elt', 'key', 'value'):
+            if hasattr(node, field):
+                self.visit(getattr(node, field))
+        self.scopes.pop()
+
+    visit_ListComp = visit_SetComp = visit_DictComp = visit_GeneratorExp = _visit_comprehension
+
+    def visit_For(self, node):
+        self.visit(node.iter)
+        self._visit_block(node.body, _targets(node.target))
+        self._visit_block(node.orelse)
+
+    visit_AsyncFor = visit_For
+
+    def visit_With(self, node):
+        for item in node.items:
+            self.visit(item.context_expr)
+        bound = set().union(*(_targets(item.optional_vars) for item in node.items if item.optional_vars))
+        self._visit_block(node.body, bound)
+
+    visit_AsyncWith = visit_With
+
+    def visit_ExceptHandler(self, node):
+        if node.type:
+            self.visit(node.type)
+        self._visit_block(node.body, {node.name} if node.name else ())
+
+    # Names
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            self.imports.add(alias.name)
+            self.aliases[(alias.asname or alias.name).split(".")[0]] = alias.name if alias.asname else alias.name.split(".")[0]
+            self._flag(alias.name, node)
+
+    def visit_ImportFrom(self, node):
+        module = "." * node.level + (node.module or "")
+        self.imports.add(module)
+        for alias in node.names:
+            if alias.name == "*":
+                for name in self.blocked:
+                    if name.startswith(f"{module}."):
+                        self._flag(name, node)
+                continue
+            qualified = f"{module}.{alias.name}"
+            self.aliases[alias.asname or alias.name] = qualified
+            self._flag(qualified, node)
+
+    def visit_Name(self, node):
+        if not isinstance(node.ctx, ast.Load):
+            return
+        if node.id in self.aliases:
+            self._flag(self._resolve(node.id), node)
+        elif not self._is_bound(node.id):
+            self._flag(node.id, node)
+
+    def visit_Attribute(self, node):
+        dotted = _dotted_name(node)
+        if dotted is None:
+            self.generic_visit(node)
+            return
+        head = dotted.partition(".")[0]
+        if head not in self.aliases and self._is_bound(head):
+            return  # attribute of a script variable, e.g. message.document.file
+        # Flag the chain and each of its prefixes: 'os.system.__call__' still uses 'os.system'
+        resolved = self._resolve(dotted).split(".")
+        for end in range(len(resolved), 0, -1):
+            self._flag(".".join(resolved[:end]), node)
+
+    def visit_Call(self, node):
+        dotted = _dotted_name(node.func) or ""
+        if dotted.endswith("add_handler") and node.args:
+            handler = _dotted_name(getattr(node.args[0], "func", node.args[0])) or "handler"
+            self.handlers.append({'name': handler, 'event': "add_handler", 'line': node.lineno})
+        # getattr(builtins, 'open') reaches a builtin without naming it
+        if self._resolve(dotted) in ("getattr", "builtins.getattr") and len(node.args) > 1:
+            target, attr = _dotted_name(node.args[0]), node.args[1]
+            if target and isinstance(attr, ast.Constant) and isinstance(attr.value, str):
+                self._flag(f"{self._resolve(target)}.{attr.value}", node)
+        self.generic_visit(node)
+
+
+def analyze_source(script: str, blocked, compile_code: bool = True):
+    """Analyze a Python source, returns (analysis, code object or None)"""
+    analysis = {
+        'syntax_error': None,
+        'imports': [],
+        'blocked': [],
+        'handlers': [],
+        'lines': script.count("\n") + 1,
+        'compile_seconds': 0.0,  # parse + compile, what a cached code object saves
+    }
+
+    started = time.perf_counter()
+    try:
+        tree = ast.parse(script, "<string>", "exec")
+    except SyntaxError as e:
+        analysis['syntax_error'] = str(e)
+        return analysis, None
+
+    parse_seconds = time.perf_counter() - started
+    collector = _Collector({name.rstrip("(") for name in blocked})
+    collector.visit(tree)
+    analysis['imports'] = sorted(collector.imports)
+    analysis['blocked'] = sorted(collector.hits, key=lambda hit: (hit['line'], hit['column']))
+    analysis['handlers'] = collector.handlers
+
+    code = None
+    if compile_code:
+        started = time.perf_counter()
+        try:
+            code = compile(tree, "<string>", "exec")
+        except SyntaxError as e:
+            # Some errors (e.g. 'return' outside function) are only raised by the compiler
+            analysis['syntax_error'] = str(e)
+        analysis['compile_seconds'] = round(parse_seconds + time.perf_counter() - started, 4)
+    return analysis, code
+
+
+class ScriptAnalyzer:
+    """Content-hash cache of analyses; compiled code goes to ``code_cache``"""
+
+    def __init__(self, blocked, max_entries: int = ANALYSIS_CACHE_SIZE, code_cache=None):
+        self.blocked = list(blocked)
+        self.max_entries = max_entries
+        self.code_cache = code_cache
+        self.entries = OrderedDict()  # script hash -> analysis
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def store(self, script: str, analysis, code=None):
+        """Remember a fresh analysis of a script and its code object.
+
+        Not thread-safe: analyze off the loop with analyze_source, then store on it.
+        """
+        self.stats['misses'] += 1
+        if code is not None and self.code_cache is not None:
+            self.code_cache.store(script, code, analysis['compile_seconds'])
+        key = script_hash(script)
+        self.entries[key] = analysis
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def cached(self, script: str):
+        """Cached analysis of a script, or None"""
+        key = script_hash(script)
+        analysis = self.entries.get(key)
+        if analysis is not None:
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+        return analysis
+
+    def analyze(self, script: str):
+        """Analysis of a script, parsing and compiling it on a cache miss"""
+        analysis = self.cached(script)
+        if analysis is not None:
+            return analysis
+
+        analysis, code = analyze_source(script, self.blocked)
+        self.store(script, analysis, code)
+        return analysis
+
+    def metrics(self, script: str):
+        """Line and handler counts of an analyzed script (empty if not analyzed)"""
+        analysis = self.entries.get(script_hash(script))
+        if analysis is None:
+            return {}
+        return {'lines': analysis['lines'], 'handlers': len(analysis['handlers'])}
+
+    def get_stats(self):
+        return {**self.stats, 'entries': len(self.entries)}
+
+
+if __name__ == "__main__":
+    request = json.loads(sys.stdin.buffer.read())
+    result, _ = analyze_source(request['source'], request['blocked'])
+    sys.stdout.write(json.dumps(result))
@@ -0,0 +1,414 @@
+"""
+Benchmarks for Bot Hoster internals
+Developer: @Zeroboy216
+Channel: @zerodevbro
+
+Usage:
+    python3 benchmark.py idle --bots 1000 5000 --duration 10
+    python3 benchmark.py session --token <bot token> --runs 5
+    python3 benchmark.py checkers --language js rb --scripts 200
+    python3 benchmark.py scan --sizes 1K 100K 10M
+    python3 benchmark.py botlist --bots 500 --script-size 100K   (needs MONGO_URL)
+    python3 benchmark.py states --rate 1000 --duration 10         (needs MONGO_URL)
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from pyrogram import Client
+
+from config import API_ID, API_HASH, BLOCKED_IMPORTS, DANGEROUS_PATTERNS, DATABASE_NAME
+from database import Database
+from runner import BotSupervisor
+from scanner import COMMON_RULES, PatternScanner
+from sessions import SessionStore
+from statestore import StateStore
+from validator import ScriptValidator
+
+
+class _FakeClient:
+    """Minimal stand-in for an idle, connected Pyrogram client"""
+
+    def __init__(self):
+        self.disconnect_handler = None
+        self.is_connected = True
+
+    def add_handler(self, handler, group: int = 0):
+        self.disconnect_handler = handler.callback
+
+
+def _count_wakeups(loop):
+    """Count selector wakeups and timers scheduled on the loop"""
+    counter = {'wakeups': 0, 'timers': 0}
+    selector = loop._selector
+    original_select = selector.select
+    original_call_at = loop.call_at
+
+    def select(timeout=None):
+        events = original_select(timeout)
+        counter['wakeups'] += 1
+        return events
+
+    def call_at(when, callback, *args, **kwargs):
+        counter['timers'] += 1
+        return original_call_at(when, callback, *args, **kwargs)
+
+    selector.select = select
+    loop.call_at = call_at
+    return counter
+
+
+async def _legacy_keep_alive(bot_id: str, registry: dict):
+    """The old per-bot polling loop from BotRunner._keep_bot_alive"""
+    while bot_id in registry:
+        await asyncio.sleep(1)
+
+
+async def _measure(duration: float):
+    """Measure loop wakeups and CPU use while the loop sits idle"""
+    counter = _count_wakeups(asyncio.get_running_loop())
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+
+    await asyncio.sleep(duration)
+
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    return counter['wakeups'] / wall, counter['timers'] / wall, cpu / wall * 100
+
+
+async def bench_idle_polling(bots: int, duration: float):
+    registry = {f"bot{i}": True for i in range(bots)}
+    tasks = [asyncio.create_task(_legacy_keep_alive(bot_id, registry)) for bot_id in registry]
+    await asyncio.sleep(1)  # let every poller settle into its sleep cycle
+
+    result = await _measure(duration)
+
+    registry.clear()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return result
+
+
+async def bench_idle_supervisor(bots: int, duration: float):
+    async def on_crash(bot_id, reason):
+        pass
+
+    supervisor = BotSupervisor(on_crash)
+    for i in range(bots):
+        supervisor.watch_client(f"bot{i}", _FakeClient())
+    await asyncio.sleep(1)
+
+    result = await _measure(duration)
+
+    for i in range(bots):
+        supervisor.unwatch(f"bot{i}")
+    return result
+
+
+def run_idle(args):
+    print(f"{'mode':<12}{'bots':>8}{'wakeups/s':>12}{'timers/s':>12}{'cpu %':>10}")
+    for bots in args.bots:
+        for name, bench in (("polling", bench_idle_polling), ("supervisor", bench_idle_supervisor)):
+            wakeups, timers, cpu = asyncio.run(bench(bots, args.duration))
+            print(f"{name:<12}{bots:>8}{wakeups:>12.1f}{timers:>12.1f}{cpu:>10.1f}")
+
+
+async def bench_session(token: str, runs: int):
+    """Client start latency: fresh in-memory login vs cached session"""
+    in_memory = []
+    for _ in range(runs):
+        client = Client("bench", api_id=API_ID, api_hash=API_HASH, bot_token=token, in_memory=True)
+        started = time.perf_counter()
+        await client.start()
+        in_memory.append(time.perf_counter() - started)
+        await client.stop()
+
+    store = SessionStore(root=tempfile.mkdtemp(prefix="bench_sessions_"), enabled=True)
+    cached = []
+    for _ in range(runs + 1):
+        started = time.perf_counter()
+        client = await store.start_client(token)
+        cached.append(time.perf_counter() - started)
+        await client.stop()
+
+    # The first cached run creates the session file
+    return in_memory, cached[1:]
+
+
+def run_session(args):
+    in_memory, cached = asyncio.run(bench_session(args.token, args.runs))
+    print(f"{'mode':<12}{'median ms':>12}{'min ms':>10}{'max ms':>10}")
+    for name, samples in (("in-memory", in_memory), ("cached", cached)):
+        print(
+            f"{name:<12}{statistics.median(samples) * 1000:>12.1f}"
+            f"{min(samples) * 1000:>10.1f}{max(samples) * 1000:>10.1f}"
+        )
+
+
+SAMPLE_SCRIPTS = {
+    'js': "const TelegramBot = require('node-telegram-bot-api');\n"
+          "const bot = new TelegramBot(process.env.BOT_TOKEN, { polling: true });\n"
+          "bot.onText(/\\/start/, (msg) => bot.sendMessage(msg.chat.id, 'Hello'));\n",
+    'rb': "require 'telegram/bot'\n"
+          "Telegram::Bot::Client.run(ENV['BOT_TOKEN']) do |bot|\n"
+          "  bot.listen { |message| bot.api.send_message(chat_id: message.chat.id, text: 'Hello') }\n"
+          "end\n",
+    'php': "<?php\n$token = getenv('BOT_TOKEN');\necho file_get_contents(\"https://api.telegram.org/bot$token/getMe\");\n",
+}
+
+
+async def bench_checkers(file_type: str, scripts: int, use_daemons: bool):
+    """Syntax checks per second through ScriptValidator"""
+    validator = ScriptValidator(queue_limit=scripts, use_daemons=use_daemons)
+    # Vary the source so nothing downstream can short-circuit on identical input
+    sources = [f"{SAMPLE_SCRIPTS[file_type]}\n# {i}\n" if file_type != 'js'
+               else f"{SAMPLE_SCRIPTS[file_type]}\n// {i}\n" for i in range(scripts)]
+
+    await validator.check_syntax(file_type, sources[0])  # warm up the daemons
+    started = time.perf_counter()
+    results = await asyncio.gather(*[validator.check_syntax(file_type, source) for source in sources])
+    elapsed = time.perf_counter() - started
+    await validator.close()
+
+    errors = sum(1 for result in results if result)
+    return scripts / elapsed, elapsed / scripts * 1000, errors
+
+
+def run_checkers(args):
+    print(f"{'language':<10}{'mode':<10}{'checks/s':>12}{'ms/check':>12}{'errors':>8}")
+    for file_type in args.language:
+        for name, use_daemons in (("spawn", False), ("daemon", True)):
+            try:
+                rate, latency, errors = asyncio.run(bench_checkers(file_type, args.scripts, use_daemons))
+            except FileNotFoundError:
+                print(f"{file_type:<10}{name:<10}{'runtime not installed':>32}")
+                break
+            print(f"{file_type:<10}{name:<10}{rate:>12.1f}{latency:>12.2f}{errors:>8}")
+
+
+def _legacy_scan(script: str):
+    """The old validate_script + _validate_python substring checks"""
+    script_lower = script.lower()
+    dangerous = [pattern for pattern in DANGEROUS_PATTERNS if pattern.lower() in script_lower]
+    blocked = [pattern for pattern in BLOCKED_IMPORTS if pattern in script]
+    return dangerous + blocked
+
+
+def _parse_size(size: str):
+    units = {'K': 1024, 'M': 1024 * 1024}
+    return int(size[:-1]) * units[size[-1].upper()] if size[-1].upper() in units else int(size)
+
+
+def _sample_source(size: int):
+    """Clean Python source of roughly ``size`` characters with one hit at the end"""
+    block = (
+        "@app.on_message(filters.command('start'))\n"
+        "async def start(client, message):\n"
+        "    await message.reply_text('Hello ' + message.from_user.first_name)\n\n"
+    )
+    return (block * (size // len(block) + 1))[:size] + "\nresult = eval(payload)\n"
+
+
+def _best_of(func, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def run_scan(args):
+    # Same rule lists as the legacy checks above
+    scanner = PatternScanner(COMMON_RULES + [("blocked", BLOCKED_IMPORTS, False)])
+    print(f"{'size':>8}{'legacy ms':>12}{'scanner ms':>12}{'MB/s':>10}{'hits':>6}")
+    for size in args.sizes:
+        source = _sample_source(_parse_size(size))
+        legacy = _best_of(lambda: _legacy_scan(source), args.repeat)
+        single = _best_of(lambda: scanner.scan(source), args.repeat)
+        throughput = len(source) / single / (1024 * 1024)
+        print(f"{size:>8}{legacy * 1000:>12.2f}{single * 1000:>12.2f}{throughput:>10.1f}{len(scanner.scan(source)):>6}")
+
+
+async def _best_of_async(func, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+async def bench_bot_list(bots: int, users: int, script_size: int, repeat: int):
+    """List query latency with inline scripts, then after moving them to the scripts collection"""
+    db = Database(name=f"{DATABASE_NAME}_bench")
+    await db.client.drop_database(db.db.name)
+    try:
+        script = _sample_source(script_size)
+        await db.bots.insert_many([{
+            "user_id": i % users,
+            "token": f"{i}:bench",
+            "script": f"{script}\n# bot {i}\n",
+            "bot_username": f"bench_{i}_bot",
+            "status": "running" if i % 2 else "stopped",
+            "file_metadata": {"file_name": "bot.py", "file_type": "py", "file_size": script_size},
+        } for i in range(bots)])
+        await db.bots.create_index("user_id")
+        await db.bots.create_index("status")
+
+        # The old list queries fetched whole documents, scripts included
+        legacy = [
+            lambda: db.bots.find({"user_id": 0}).to_list(length=None),
+            lambda: db.bots.find().to_list(length=None),
+            lambda: db.bots.find({"status": "running"}).to_list(length=None),
+        ]
+        before = [await _best_of_async(query, repeat) for query in legacy]
+
+        await db.migrate_inline_scripts()
+        lean = [lambda: db.get_user_bots(0), db.get_all_bots, db.get_running_bots]
+        after = [await _best_of_async(query, repeat) for query in lean]
+        return before, after
+    finally:
+        await db.client.drop_database(db.db.name)
+
+
+def run_bot_list(args):
+    before, after = asyncio.run(bench_bot_list(args.bots, args.users, _parse_size(args.script_size), args.repeat))
+    print(f"{'query':<20}{'inline ms':>12}{'lean ms':>12}{'speedup':>10}")
+    for name, old, new in zip(("get_user_bots", "get_all_bots", "get_running_bots"), before, after):
+        print(f"{name:<20}{old * 1000:>12.1f}{new * 1000:>12.1f}{old / new:>9.1f}x")
+
+
+async def _drive(handle, rate: int, duration: float):
+    """Call ``handle(i)`` ``rate`` times a second for ``duration`` seconds, returns each call's latency"""
+    latencies = []
+
+    async def timed(i):
+        started = time.perf_counter()
+        await handle(i)
+        latencies.append(time.perf_counter() - started)
+
+    tasks = []
+    start = time.perf_counter()
+    for i in range(int(rate * duration)):
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(timed(i)))
+    await asyncio.gather(*tasks)
+    return sorted(latencies)
+
+
+async def bench_states(rate: int, duration: float, users: int):
+    """Message-path state lookups and updates, one round trip each vs the write-behind store"""
+    db = Database(name=f"{DATABASE_NAME}_bench")
+    await db.client.drop_database(db.db.name)
+    await db.states.create_index("user_id", unique=True)
+    try:
+        def handler(get, set_state, clear):
+            # Every message reads the state; users walk through the add-bot flow
+            async def handle(i):
+                user_id = i % users
+                state = await get(user_id)
+                if state is None:
+                    await set_state(user_id, "waiting_token")
+                elif state["action"] == "waiting_token":
+                    await set_state(user_id, "waiting_script", {"token": f"{user_id}:bench"})
+                else:
+                    await clear(user_id)
+            return handle
+
+        async def legacy_set(user_id, action, data=None):
+            await db.states.update_one(
+                {"user_id": user_id},
+                {"$set": {"action": action, "message_id": None, "data": data or {}, "timestamp": datetime.now()}},
+                upsert=True
+            )
+
+        async def legacy_get(user_id):
+            return await db.states.find_one({"user_id": user_id})
+
+        async def legacy_clear(user_id):
+            await db.states.delete_one({"user_id": user_id})
+
+        legacy = await _drive(handler(legacy_get, legacy_set, legacy_clear), rate, duration)
+        await db.states.delete_many({})
+
+        store = StateStore(db.states)
+
+        async def store_set(user_id, action, data=None):
+            store.set(user_id, action, None, data)
+
+        async def store_clear(user_id):
+            store.clear(user_id)
+
+        buffered = await _drive(handler(store.get, store_set, store_clear), rate, duration)
+        await store.close()
+        return legacy, buffered, store.get_stats()
+    finally:
+        await db.client.drop_database(db.db.name)
+
+
+def _percentile(latencies: list, p: float):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+
+def run_states(args):
+    legacy, buffered, stats = asyncio.run(bench_states(args.rate, args.duration, args.users))
+    print(f"{args.rate} msgs/s for {args.duration}s, {args.users} users")
+    print(f"{'path':<16}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, latencies in (("round trips", legacy), ("state store", buffered)):
+        print(f"{name:<16}{_percentile(latencies, 0.5) * 1000:>10.2f}"
+              f"{_percentile(latencies, 0.99) * 1000:>10.2f}{latencies[-1] * 1000:>10.2f}")
+    print(f"State writes: {stats['writes']}, persisted: {stats['persisted']} in {stats['flushes']} bulk writes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bot Hoster benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    idle = subparsers.add_parser("idle", help="Event-loop wakeups and CPU with idle hosted bots")
+    idle.add_argument("--bots", type=int, nargs="+", default=[1000, 5000])
+    idle.add_argument("--duration", type=float, default=10.0)
+    idle.set_defaults(func=run_idle)
+
+    session = subparsers.add_parser("session", help="Bot start latency with and without the session cache")
+    session.add_argument("--token", required=True, help="Token of a test bot")
+    session.add_argument("--runs", type=int, default=5)
+    session.set_defaults(func=run_session)
+
+    checkers = subparsers.add_parser("checkers", help="Syntax-check throughput, spawn per check vs daemons")
+    checkers.add_argument("--language", nargs="+", choices=sorted(SAMPLE_SCRIPTS), default=["js", "rb", "php"])
+    checkers.add_argument("--scripts", type=int, default=200)
+    checkers.set_defaults(func=run_checkers)
+
+    scan = subparsers.add_parser("scan", help="Security pattern scan, per-pattern substring checks vs single pass")
+    scan.add_argument("--sizes", nargs="+", default=["1K", "10K", "100K", "1M", "10M"])
+    scan.add_argument("--repeat", type=int, default=5)
+    scan.set_defaults(func=run_scan)
+
+    botlist = subparsers.add_parser("botlist", help="Bot list query latency, inline scripts vs scripts collection")
+    botlist.add_argument("--bots", type=int, default=500)
+    botlist.add_argument("--users", type=int, default=50)
+    botlist.add_argument("--script-size", default="100K")
+    botlist.add_argument("--repeat", type=int, default=5)
+    botlist.set_defaults(func=run_bot_list)
+
+    states = subparsers.add_parser("states", help="Message-path latency, state round trips vs write-behind store")
+    states.add_argument("--rate", type=int, default=1000, help="Messages per second")
+    states.add_argument("--duration", type=float, default=10.0)
+    states.add_argument("--users", type=int, default=500)
+    states.set_defaults(func=run_states)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
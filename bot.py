@@ -7,10 +7,10 @@ Version: 2.0
 
 import os
 import asyncio
-from pyrogram import Client, filters
+from pyrogram import Client, filters, idle
 from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton, Message
-from config import API_ID, API_HASH, BOT_TOKEN, OWNER_ID, BOT_USERNAME
-from database import Database
+from config import API_ID, API_HASH, BOT_TOKEN, OWNER_ID, BOT_USERNAME, AUTO_RESTART, LOG_CHANNEL, SCRIPT_VERSIONS_SHOWN
+from database import Database, format_timestamp
 from runner import BotRunner
 from admin import handle_admin_commands
 import logging
@@ -314,7 +314,7 @@ async def my_bots_command(client: Client, message: Message):
         text += f"┣━ **Name:** @{bot.get('bot_username', 'unknown')}\n"
         text += f"┣━ **ID:** `{bot['_id']}`\n"
         text += f"┣━ **Status:** {status_text}\n"
-        text += f"┗━ **Added:** {bot.get('created_at', 'N/A')}\n\n"
+        text += f"┗━ **Added:** {format_timestamp(bot.get('created_at'))}\n\n"
         
         button_text = f"⏹️ Stop #{idx}" if bot.get("status") == "running" else f"▶️ Start #{idx}"
         
@@ -338,7 +338,7 @@ async def my_bots_command(client: Client, message: Message):
     await message.reply_text(text, reply_markup=InlineKeyboardMarkup(keyboards))
 
 # Handle messages based on user state (text and ANY file type)
-@app.on_message(filters.private & ~filters.command(["start", "help", "mybots", "addbot", "cancel", "broadcast", "total", "restart", "stats"]))
+@app.on_message(filters.private & ~filters.command(["start", "help", "mybots", "addbot", "cancel", "broadcast", "total", "restart", "stats", "quarantine", "release"]))
 async def handle_message(client: Client, message: Message):
     user_id = message.from_user.id
     state = await db.get_user_state(user_id)
@@ -1073,7 +1073,7 @@ async def callback_handler(client: Client, callback_query):
             text += f"┣━ **Name:** @{bot.get('bot_username', 'unknown')}\n"
             text += f"┣━ **ID:** `{bot['_id']}`\n"
             text += f"┣━ **Status:** {status_text}\n"
-            text += f"┗━ **Added:** {bot.get('created_at', 'N/A')}\n\n"
+            text += f"┗━ **Added:** {format_timestamp(bot.get('created_at'))}\n\n"
             
             button_text = f"⏹️ Stop #{idx}" if bot.get("status") == "running" else f"▶️ Start #{idx}"
             
@@ -1178,7 +1178,7 @@ async def callback_handler(client: Client, callback_query):
         
     elif data.startswith("toggle_"):
         bot_id = data.split("_")[1]
-        bot = await db.get_bot(bot_id)
+        bot = await db.get_bot(bot_id, with_script=True)
         
         if not bot:
             await callback_query.answer("❌ Bot not found!", show_alert=True)
@@ -1194,6 +1194,7 @@ async def callback_handler(client: Client, callback_query):
             await callback_query.answer("⏹️ Bot stopped successfully!")
         else:
             file_ext = bot.get("file_metadata", {}).get("file_type", "py")
+            runner.restart_policy.reset(bot_id)
             success = await runner.start_bot(bot_id, bot["token"], bot["script"], file_ext)
             if success:
                 await db.update_bot_status(bot_id, "running")
@@ -1218,7 +1219,7 @@ async def callback_handler(client: Client, callback_query):
             text += f"┣━ **Name:** @{bot.get('bot_username', 'unknown')}\n"
             text += f"┣━ **ID:** `{bot['_id']}`\n"
             text += f"┣━ **Status:** {status_text}\n"
-            text += f"┗━ **Added:** {bot.get('created_at', 'N/A')}\n\n"
+            text += f"┗━ **Added:** {format_timestamp(bot.get('created_at'))}\n\n"
             
             button_text = f"⏹️ Stop #{idx}" if bot.get("status") == "running" else f"▶️ Start #{idx}"
             
@@ -1314,7 +1315,7 @@ async def callback_handler(client: Client, callback_query):
                 f"**📛 Name:** @{bot.get('bot_username', 'unknown')}\n"
                 f"**🆔 ID:** `{bot_id}`\n"
                 f"**📊 Status:** {'🟢 Running' if bot.get('status') == 'running' else '🔴 Stopped'}\n"
-                f"**📅 Created:** {bot.get('created_at', 'N/A')}\n\n"
+                f"**📅 Created:** {format_timestamp(bot.get('created_at'))}\n\n"
                 f"━━━━━━━━━━━━━━━━━━━━━━\n"
                 f"⚠️ **This action cannot be undone!**\n"
                 f"━━━━━━━━━━━━━━━━━━━━━━\n\n"
@@ -1339,6 +1340,8 @@ async def callback_handler(client: Client, callback_query):
         
         # Stop and delete the bot
         await runner.stop_bot(bot_id)
+        runner.restart_policy.reset(bot_id)
+        runner.session_store.invalidate(bot["token"])
         await db.delete_bot(bot_id)
         
         await callback_query.answer("🗑️ Bot deleted successfully!", show_alert=True)
@@ -1385,7 +1388,7 @@ async def callback_handler(client: Client, callback_query):
             text += f"┣━ **Name:** @{bot.get('bot_username', 'unknown')}\n"
             text += f"┣━ **ID:** `{bot['_id']}`\n"
             text += f"┣━ **Status:** {status_text}\n"
-            text += f"┗━ **Added:** {bot.get('created_at', 'N/A')}\n\n"
+            text += f"┗━ **Added:** {format_timestamp(bot.get('created_at'))}\n\n"
             
             button_text = f"⏹️ Stop #{idx}" if bot.get("status") == "running" else f"▶️ Start #{idx}"
             
@@ -1429,17 +1432,42 @@ async def callback_handler(client: Client, callback_query):
         # Get bot statistics
         status_icon = "🟢" if bot.get("status") == "running" else "🔴"
         status_text = "Online & Running" if bot.get("status") == "running" else "Offline"
+        if bot.get("status") == "crash_looping":
+            status_icon = "🚫"
+            status_text = "Crash-looping (auto-restart paused)"
         
         file_info = bot.get("file_metadata", {})
         file_name = file_info.get("file_name", "Unknown")
         file_type = file_info.get("file_type", "py")
         file_size = file_info.get("file_size", 0)
+        lines = await db.get_script_lines(bot)
         
         type_emoji = {
             'py': '🐍', 'js': '📜', 'sh': '🐚',
             'rb': '💎', 'php': '🐘', 'go': '🔵', 'txt': '📝'
         }.get(file_type, '📄')
         
+        # Script history: stored bytes per version, deduplicated bodies cost nothing
+        current_version = bot.get("script_version", 1)
+        versions = await db.get_script_versions(bot_id, limit=SCRIPT_VERSIONS_SHOWN)
+        storage = await db.get_script_storage(bot_id)
+        versions_text = ""
+        for version in versions:
+            marker = "▶️" if version["version"] == current_version else "▫️"
+            stored = f"+{version['added_bytes'] / 1024:.2f}KB" if version["added_bytes"] else "deduplicated"
+            versions_text += (
+                f"{marker} v{version['version']}: {version['size'] / 1024:.2f}KB "
+                f"({stored}) {version['created_at'].strftime('%Y-%m-%d %H:%M')}\n"
+            )
+        versions_text += f"**Stored:** {storage['added_bytes'] / 1024:.2f}KB for {storage['versions']} versions"
+        rollback = runner.rollbacks.get(bot_id)
+        if rollback:
+            versions_text += (
+                f"\n**Last Rollback:** v{rollback['restored_version']} "
+                f"in {rollback['restore_latency']:.2f}s"
+            )
+        previous = next((v["version"] for v in versions if v["version"] < current_version), None)
+        
         stats_text = f"""
 ╔═══════════════════════════╗
 ║   **📊 BOT STATISTICS**   ║
@@ -1456,12 +1484,17 @@ async def callback_handler(client: Client, callback_query):
 **File:** `{file_name}`
 **Type:** {file_type.upper()}
 **Size:** {file_size / 1024:.2f}KB
-**Lines:** {len(bot.get('script', '').split(chr(10)))}
+**Lines:** {lines}
+**Version:** v{current_version}
+
+**🗂️ Script Versions:**
+━━━━━━━━━━━━━━━━━━━━━━
+{versions_text}
 
 **📅 Timeline:**
 ━━━━━━━━━━━━━━━━━━━━━━
-**Created:** {bot.get('created_at', 'N/A')}
-**Last Updated:** {bot.get('updated_at', 'N/A')}
+**Created:** {format_timestamp(bot.get('created_at'))}
+**Last Updated:** {format_timestamp(bot.get('updated_at'))}
 
 **⚙️ Performance:**
 ━━━━━━━━━━━━━━━━━━━━━━
@@ -1474,10 +1507,11 @@ async def callback_handler(client: Client, callback_query):
 ━━━━━━━━━━━━━━━━━━━━━━
 """
         
-        keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton("🔄 Refresh", callback_data=f"botstats_{bot_id}")],
-            [InlineKeyboardButton("🔙 Back to My Bots", callback_data="my_bots")]
-        ])
+        buttons = [[InlineKeyboardButton("🔄 Refresh", callback_data=f"botstats_{bot_id}")]]
+        if previous:
+            buttons.append([InlineKeyboardButton(f"⏪ Roll back to v{previous}", callback_data=f"rollback_{bot_id}_{previous}")])
+        buttons.append([InlineKeyboardButton("🔙 Back to My Bots", callback_data="my_bots")])
+        keyboard = InlineKeyboardMarkup(buttons)
         
         try:
             await callback_query.message.edit_text(
@@ -1487,9 +1521,32 @@ async def callback_handler(client: Client, callback_query):
         except Exception as e:
             logger.error(f"Error editing message: {e}")
         await callback_query.answer()
+    
+    elif data.startswith("rollback_"):
+        _, bot_id, version = data.split("_")
+        bot = await db.get_bot(bot_id)
+        
+        if not bot:
+            await callback_query.answer("❌ Bot not found!", show_alert=True)
+            return
+        
+        if bot["user_id"] != user_id:
+            await callback_query.answer("❌ Not your bot!", show_alert=True)
+            return
+        
+        target = await runner.rollback_bot(bot_id, int(version))
+        if not target:
+            await callback_query.answer("❌ Version not found!", show_alert=True)
+            return
+        
+        rollback = runner.rollbacks[bot_id]
+        await callback_query.answer(
+            f"⏪ Rolled back to v{target['version']} in {rollback['restore_latency']:.2f}s",
+            show_alert=True
+        )
 
 # Admin commands
-@app.on_message(filters.command(["broadcast", "total", "restart", "stats"]) & filters.user(OWNER_ID))
+@app.on_message(filters.command(["broadcast", "total", "restart", "stats", "quarantine", "release"]) & filters.user(OWNER_ID))
 async def admin_commands(client: Client, message: Message):
     await handle_admin_commands(client, message, db, runner)
 
@@ -1530,6 +1587,49 @@ async def catch_all(client: Client, message: Message):
             "Use /help for more information."
         )
 
+async def warm_boot():
+    """Restore every bot that was running before the last shutdown"""
+    started, failed = await runner.restart_all_bots()
+    stats = runner.warm_boot_stats
+    
+    if LOG_CHANNEL and stats.get('total'):
+        try:
+            await app.send_message(
+                int(LOG_CHANNEL),
+                f"♻️ **Warm Boot Complete**\n\n"
+                f"🟢 Started: `{started}`\n"
+                f"❌ Failed: `{failed}`\n"
+                f"⏱️ Time to restore: `{stats['time_to_restore']}s`"
+            )
+        except Exception as e:
+            logger.error(f"Failed to report warm boot: {e}")
+
+async def main():
+    await app.start()
+    logger.info("✅ Hoster bot started")
+    
+    # Bring bot documents to the current schema, then build indexes (incl. TTL for logs/states)
+    await db.migrate_inline_scripts()
+    await db.migrate_script_versions()
+    await db.migrate_bot_timestamps()
+    await db.create_indexes()
+    db.watch_bot_changes()
+    db.start_stats_reconcile()
+    
+    # Reclaim scripts leaked by a previous run, then keep collecting on CLEANUP_INTERVAL
+    maintenance = asyncio.create_task(runner.run_maintenance())
+    
+    # Restore hosted bots in the background so the control bot answers right away
+    restore = asyncio.create_task(warm_boot()) if AUTO_RESTART else None
+    
+    await idle()
+    
+    maintenance.cancel()
+    if restore:
+        restore.cancel()
+    await runner.graceful_shutdown()
+    await app.stop()
+
 # Run the bot
 if __name__ == "__main__":
     logger.info("╔═══════════════════════════════════╗")
@@ -1541,7 +1641,7 @@ if __name__ == "__main__":
     logger.info("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
     
     try:
-        app.run()
+        app.run(main())
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
     except Exception as e:
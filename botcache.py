@@ -0,0 +1,123 @@
+"""
+Bot Cache - Read-through cache of bot documents
+Developer: @Zeroboy216
+Channel: @zerodevbro
+
+Keeps recently read bot documents in memory for BOT_CACHE_TTL seconds, so
+repeated taps on the same bot's buttons don't each cost a MongoDB round trip.
+Every write in Database invalidates the bot it touched. With several hoster
+instances on one replica set, a change stream on the bots collection also
+invalidates entries written by the other instances; without a replica set
+the TTL bounds how stale another instance's write can be.
+"""
+
+import asyncio
+import copy
+import logging
+import time
+from collections import OrderedDict
+
+from pymongo.errors import OperationFailure
+
+from config import BOT_CACHE_SIZE, BOT_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait before reopening a change stream that failed
+WATCH_RETRY_DELAY = 5
+
+
+class BotCache:
+    """Bounded LRU of bot documents with a TTL"""
+
+    def __init__(self, max_entries: int = BOT_CACHE_SIZE, ttl: float = BOT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()  # bot_id -> (expires at, document)
+        self.generation = 0           # bumped by every invalidation
+        self.watch_task = None
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'invalidations': 0, 'stream_invalidations': 0}
+
+    def get(self, bot_id: str):
+        """A copy of the cached document, or None"""
+        entry = self.entries.get(bot_id)
+        if entry is None:
+            self.stats['misses'] += 1
+            return None
+        if entry[0] < time.monotonic():
+            del self.entries[bot_id]
+            self.stats['expired'] += 1
+            self.stats['misses'] += 1
+            return None
+        self.entries.move_to_end(bot_id)
+        self.stats['hits'] += 1
+        return copy.deepcopy(entry[1])
+
+    def put(self, bot_id: str, doc: dict, generation: int):
+        """Cache a document read while the cache was at ``generation``.
+
+        If anything was invalidated since, the read may predate a write and is not cached.
+        """
+        if generation != self.generation:
+            return
+        self.entries[bot_id] = (time.monotonic() + self.ttl, copy.deepcopy(doc))
+        self.entries.move_to_end(bot_id)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, bot_id: str = None):
+        """Forget one bot, or every bot when ``bot_id`` is None"""
+        self.generation += 1
+        self.stats['invalidations'] += 1
+        if bot_id is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(str(bot_id), None)
+
+    def watch(self, collection):
+        """Start invalidating from a change stream on ``collection``"""
+        if self.watch_task is None:
+            self.watch_task = asyncio.get_running_loop().create_task(self._watch(collection))
+
+    async def _watch(self, collection):
+        while True:
+            try:
+                async with collection.watch() as stream:
+                    logger.info("👀 Bot cache following the bots change stream")
+                    # Writes made while the stream was down were missed
+                    self.invalidate()
+                    async for change in stream:
+                        if 'documentKey' in change:
+                            self.invalidate(change['documentKey']['_id'])
+                            self.stats['stream_invalidations'] += 1
+                        else:
+                            self.invalidate()  # drop, rename or invalidate event
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in (40573, 20):  # standalone server: no change streams
+                    logger.warning("⚠️ MongoDB has no change streams, bot cache relies on its TTL")
+                    return
+                logger.warning(f"⚠️ Bot change stream failed, retrying: {e}")
+            except Exception as e:
+                logger.warning(f"⚠️ Bot change stream failed, retrying: {e}")
+            self.invalidate()
+            await asyncio.sleep(WATCH_RETRY_DELAY)
+
+    async def close(self):
+        if self.watch_task:
+            self.watch_task.cancel()
+            try:
+                await self.watch_task
+            except asyncio.CancelledError:
+                pass
+            self.watch_task = None
+
+    def get_stats(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'entries': len(self.entries),
+            'hit_rate': round(self.stats['hits'] / lookups * 100, 1) if lookups else 0.0,
+            'change_stream': self.watch_task is not None and not self.watch_task.done(),
+        }
@@ -0,0 +1,214 @@
+"""
+Go Build Cache - Content-addressed cache of compiled Go bots
+Developer: @Zeroboy216
+Channel: @zerodevbro
+
+Binaries are keyed by sha256(script, Go version, build flags) and kept in a
+persistent directory together with a shared GOCACHE/GOMODCACHE, so restarts
+and crash-restarts of a Go bot reuse the binary instead of recompiling.
+Builds run under a global concurrency limit and the cache is trimmed
+least-recently-used first once it grows past its size budget. Binaries used
+in the last EVICTION_GRACE seconds are never evicted, so a binary another
+build has just produced can't disappear before it is executed. The Go
+toolchain caches count towards the same budget: when binaries and caches
+together exceed it, maintenance runs ``go clean -cache -modcache`` while no
+build is running.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from config import GO_BUILD_CACHE_DIR, GO_BUILD_CACHE_MAX_MB, GO_BUILD_CONCURRENCY, GO_BUILD_FLAGS
+
+logger = logging.getLogger(__name__)
+
+# Seconds a freshly built or reused binary is protected from eviction
+EVICTION_GRACE = 300
+
+
+class GoBuildError(Exception):
+    """Raised when a Go script fails to compile"""
+
+
+class GoBuildCache:
+    """Persistent, size-bounded cache of compiled Go binaries"""
+
+    def __init__(self, root: str = GO_BUILD_CACHE_DIR, max_bytes: int = GO_BUILD_CACHE_MAX_MB * 1024 * 1024,
+                 concurrency: int = GO_BUILD_CONCURRENCY, build_flags: str = GO_BUILD_FLAGS):
+        self.root = os.path.abspath(root)
+        self.bin_dir = os.path.join(self.root, "bin")
+        self.build_dir = os.path.join(self.root, "build")
+        self.max_bytes = max_bytes
+        self.build_flags = build_flags.split()
+        self.concurrency = max(1, concurrency)
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.locks = {}  # cache key -> asyncio.Lock, so one script is built once
+        self.go_version = None
+        self.stats = {
+            'hits': 0, 'misses': 0, 'failures': 0, 'evictions': 0, 'build_seconds': 0.0,
+            'toolchain_cleans': 0, 'toolchain_mb': 0.0,
+        }
+
+        for directory in (self.bin_dir, self.build_dir):
+            os.makedirs(directory, exist_ok=True)
+
+        self.toolchain_dirs = (os.path.join(self.root, "gocache"), os.path.join(self.root, "gomodcache"))
+        self.env = {
+            **os.environ,
+            'GOCACHE': self.toolchain_dirs[0],
+            'GOMODCACHE': self.toolchain_dirs[1],
+        }
+
+    async def _get_go_version(self):
+        if self.go_version is None:
+            process = await asyncio.create_subprocess_exec(
+                'go', 'version',
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            stdout, _ = await process.communicate()
+            self.go_version = stdout.decode().strip()
+        return self.go_version
+
+    async def cache_key(self, script: str):
+        """Content hash of everything that affects the binary"""
+        digest = hashlib.sha256()
+        digest.update(script.encode())
+        digest.update(b"\0" + (await self._get_go_version()).encode())
+        digest.update(b"\0" + " ".join(self.build_flags).encode())
+        return digest.hexdigest()
+
+    async def get_binary(self, script: str):
+        """Path of the compiled binary for a script, building it on a miss"""
+        key = await self.cache_key(script)
+        binary_path = os.path.join(self.bin_dir, key)
+
+        async with self.locks.setdefault(key, asyncio.Lock()):
+            if os.path.exists(binary_path):
+                self.stats['hits'] += 1
+                os.utime(binary_path)  # mtime doubles as the LRU clock
+                return binary_path
+
+            self.stats['misses'] += 1
+            async with self.semaphore:
+                await self._build(script, binary_path)
+
+        await asyncio.get_running_loop().run_in_executor(None, self.evict)
+        return binary_path
+
+    async def _build(self, script: str, binary_path: str):
+        """Compile a script into ``binary_path``"""
+        work_dir = tempfile.mkdtemp(dir=self.build_dir)
+        try:
+            source_path = os.path.join(work_dir, "main.go")
+            with open(source_path, 'w', encoding='utf-8') as f:
+                f.write(script)
+
+            started = time.perf_counter()
+            process = await asyncio.create_subprocess_exec(
+                'go', 'build', *self.build_flags, '-o', os.path.join(work_dir, "bot"), source_path,
+                cwd=work_dir,
+                env=self.env,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            _, stderr = await process.communicate()
+            self.stats['build_seconds'] += time.perf_counter() - started
+
+            if process.returncode != 0:
+                self.stats['failures'] += 1
+                raise GoBuildError(stderr.decode(errors='ignore')[:1000])
+
+            # Atomic publish: concurrent readers never see a half-written binary
+            os.replace(os.path.join(work_dir, "bot"), binary_path)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.bin_dir):
+            try:
+                stat = os.stat(os.path.join(self.bin_dir, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        return entries
+
+    def evict(self):
+        """Drop least-recently-used binaries until the cache fits its budget"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        protected = time.time() - EVICTION_GRACE
+
+        for mtime, size, name in sorted(entries):
+            if total <= self.max_bytes or mtime > protected:
+                break
+            try:
+                os.remove(os.path.join(self.bin_dir, name))
+                total -= size
+                self.stats['evictions'] += 1
+            except FileNotFoundError:
+                pass
+
+        return total
+
+    def _toolchain_bytes(self):
+        size = 0
+        for directory in self.toolchain_dirs:
+            for dirpath, _, files in os.walk(directory):
+                for name in files:
+                    try:
+                        size += os.lstat(os.path.join(dirpath, name)).st_size
+                    except FileNotFoundError:
+                        pass
+        return size
+
+    async def trim_toolchain_caches(self):
+        """Clear GOCACHE/GOMODCACHE once they and the binaries exceed the budget; True if cleared"""
+        loop = asyncio.get_running_loop()
+        binaries = await loop.run_in_executor(None, self.evict)
+        toolchain = await loop.run_in_executor(None, self._toolchain_bytes)
+        self.stats['toolchain_mb'] = round(toolchain / (1024 * 1024), 1)
+        if binaries + toolchain <= self.max_bytes:
+            return False
+
+        # Holding every build slot keeps builds from using the caches while they are cleared
+        for _ in range(self.concurrency):
+            await self.semaphore.acquire()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                'go', 'clean', '-cache', '-modcache',
+                env=self.env,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE
+            )
+            _, stderr = await process.communicate()
+        except FileNotFoundError:
+            return False
+        finally:
+            for _ in range(self.concurrency):
+                self.semaphore.release()
+
+        if process.returncode != 0:
+            logger.error(f"❌ go clean failed: {stderr.decode(errors='ignore')[:200]}")
+            return False
+        self.stats['toolchain_cleans'] += 1
+        logger.info(f"🧹 Cleared Go toolchain caches ({self.stats['toolchain_mb']}MB)")
+        self.stats['toolchain_mb'] = 0.0
+        return True
+
+    def get_stats(self):
+        entries = self._entries()
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'build_seconds': round(self.stats['build_seconds'], 2),
+            'hit_rate': round(self.stats['hits'] / lookups * 100, 1) if lookups else 0.0,
+            'binaries': len(entries),
+            'size_mb': round(sum(size for _, size, _ in entries) / (1024 * 1024), 1),
+        }
@@ -0,0 +1,226 @@
+"""
+Syntax Checkers - Long-lived syntax-check daemons for node, ruby and php
+Developer: @Zeroboy216
+Channel: @zerodevbro
+
+Instead of forking ``node --check``, ``ruby -c`` or ``php -l`` per upload, a
+few interpreters per runtime stay up and compile scripts sent over stdin.
+Each request is a length-prefixed UTF-8 source, each reply a length-prefixed
+JSON ``{"ok": bool, "error": str}``. Checkers are recycled after a number of
+checks and replaced when they crash or hang.
+"""
+
+import asyncio
+import json
+import logging
+import struct
+
+from config import CHECKER_MAX_CHECKS, RUNTIME_CHECK_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+FRAME_HEADER = struct.Struct("!I")
+
+# CommonJS sources are compiled with the module wrapper's parameters, like
+# ``node --check``; ES module syntax falls back to vm.SourceTextModule
+NODE_CHECKER = r"""
+const vm = require('vm');
+const CJS_PARAMS = ['exports', 'require', 'module', '__filename', '__dirname'];
+const ESM_HINT = /Cannot use import statement|Unexpected token 'export'|import\.meta|await is only valid/;
+
+function check(source) {
+  source = source.replace(/^#!.*/, '');
+  try {
+    vm.compileFunction(source, CJS_PARAMS, { filename: '[stdin]' });
+    return { ok: true };
+  } catch (e) {
+    if (vm.SourceTextModule && ESM_HINT.test(e.message)) {
+      try {
+        new vm.SourceTextModule(source, { identifier: '[stdin]' });
+        return { ok: true };
+      } catch (moduleError) {
+        e = moduleError;
+      }
+    }
+    const where = (e.stack || '').split('\n\n')[0];
+    return { ok: false, error: where.startsWith('[stdin]') ? `${where}\n\n${e.name}: ${e.message}` : `${e.name}: ${e.message}` };
+  }
+}
+
+let buffer = Buffer.alloc(0);
+process.stdin.on('data', (chunk) => {
+  buffer = Buffer.concat([buffer, chunk]);
+  while (buffer.length >= 4) {
+    const length = buffer.readUInt32BE(0);
+    if (buffer.length < 4 + length) break;
+    const source = buffer.subarray(4, 4 + length).toString('utf8');
+    buffer = buffer.subarray(4 + length);
+    const reply = Buffer.from(JSON.stringify(check(source)), 'utf8');
+    const header = Buffer.alloc(4);
+    header.writeUInt32BE(reply.length, 0);
+    process.stdout.write(Buffer.concat([header, reply]));
+  }
+});
+process.stdin.on('end', () => process.exit(0));
+"""
+
+RUBY_CHECKER = r"""
+require 'json'
+$stdin.binmode
+$stdout.binmode
+loop do
+  header = $stdin.read(4)
+  break if header.nil? || header.bytesize < 4
+  source = $stdin.read(header.unpack1('N')).to_s.force_encoding('UTF-8')
+  begin
+    RubyVM::InstructionSequence.compile(source, '-')
+    reply = { ok: true }
+  rescue SyntaxError => e
+    reply = { ok: false, error: e.message.scrub }
+  end
+  payload = JSON.generate(reply)
+  $stdout.write([payload.bytesize].pack('N') + payload)
+  $stdout.flush
+end
+"""
+
+PHP_CHECKER = r"""
+function read_exactly($length) {
+    $data = '';
+    while (strlen($data) < $length) {
+        $chunk = fread(STDIN, $length - strlen($data));
+        if ($chunk === false || $chunk === '') {
+            exit(0);
+        }
+        $data .= $chunk;
+    }
+    return $data;
+}
+while (true) {
+    $source = read_exactly(unpack('N', read_exactly(4))[1]);
+    try {
+        token_get_all($source, TOKEN_PARSE);
+        $reply = ['ok' => true];
+    } catch (ParseError $e) {
+        $reply = ['ok' => false, 'error' => 'PHP Parse error: ' . $e->getMessage() . ' on line ' . $e->getLine()];
+    }
+    $payload = json_encode($reply, JSON_INVALID_UTF8_SUBSTITUTE);
+    fwrite(STDOUT, pack('N', strlen($payload)) . $payload);
+    fflush(STDOUT);
+}
+"""
+
+CHECKER_COMMANDS = {
+    'js': ['node', '--experimental-vm-modules', '--no-warnings', '-e', NODE_CHECKER],
+    'rb': ['ruby', '-e', RUBY_CHECKER],
+    'php': ['php', '-r', PHP_CHECKER],
+}
+
+
+class CheckerProcess:
+    """One running checker interpreter"""
+
+    def __init__(self, process):
+        self.process = process
+        self.checks = 0
+
+    @property
+    def alive(self):
+        return self.process.returncode is None
+
+    async def check(self, script: str, timeout: float):
+        """Returns the syntax error message, or None if the script compiles"""
+        data = script.encode('utf-8', errors='surrogateescape')
+        self.process.stdin.write(FRAME_HEADER.pack(len(data)) + data)
+        await self.process.stdin.drain()
+
+        async def read_reply():
+            header = await self.process.stdout.readexactly(FRAME_HEADER.size)
+            (length,) = FRAME_HEADER.unpack(header)
+            return json.loads(await self.process.stdout.readexactly(length))
+
+        reply = await asyncio.wait_for(read_reply(), timeout)
+        self.checks += 1
+        return None if reply.get('ok') else reply.get('error') or "syntax error"
+
+    async def close(self):
+        if self.alive:
+            try:
+                self.process.stdin.close()
+                await asyncio.wait_for(self.process.wait(), 2)
+            except Exception:
+                self.process.kill()
+                await self.process.wait()
+
+
+class CheckerPool:
+    """A few long-lived checkers for one runtime"""
+
+    def __init__(self, file_type: str, size: int, max_checks: int = CHECKER_MAX_CHECKS,
+                 timeout: float = RUNTIME_CHECK_TIMEOUT):
+        self.file_type = file_type
+        self.argv = CHECKER_COMMANDS[file_type]
+        self.size = max(1, size)
+        self.max_checks = max_checks
+        self.timeout = timeout
+        self.idle = []       # started checkers waiting for work
+        self.running = 0     # checkers alive, idle or busy
+        self.available = asyncio.Semaphore(self.size)
+        self.stats = {'spawned': 0, 'recycled': 0, 'crashed': 0, 'checks': 0}
+
+    async def _spawn(self):
+        process = await asyncio.create_subprocess_exec(
+            *self.argv,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        self.stats['spawned'] += 1
+        self.running += 1
+        return CheckerProcess(process)
+
+    async def _retire(self, checker: CheckerProcess):
+        self.running -= 1
+        await checker.close()
+
+    async def check(self, script: str):
+        """Check a script on a pooled checker, returns the error message or None"""
+        async with self.available:
+            checker = None
+            while self.idle and checker is None:
+                candidate = self.idle.pop()
+                if candidate.alive:
+                    checker = candidate
+                else:
+                    self.stats['crashed'] += 1
+                    await self._retire(candidate)
+            if checker is None:
+                checker = await self._spawn()
+
+            try:
+                error = await checker.check(script, self.timeout)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+                # Hung or crashed mid-check: replace it, the next upload gets a fresh one
+                self.stats['crashed'] += 1
+                if checker.alive:
+                    checker.process.kill()
+                await self._retire(checker)
+                raise
+            except BaseException:
+                await self._retire(checker)
+                raise
+
+            self.stats['checks'] += 1
+            if checker.checks >= self.max_checks:
+                self.stats['recycled'] += 1
+                await self._retire(checker)
+            else:
+                self.idle.append(checker)
+            return error
+
+    async def close(self):
+        while self.idle:
+            await self._retire(self.idle.pop())
+
+    def get_stats(self):
+        return {**self.stats, 'running': self.running}
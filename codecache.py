@@ -0,0 +1,200 @@
+"""
+Code Cache - Compiled code objects for in-process Python bots
+Developer: @Zeroboy216
+Channel: @zerodevbro
+
+Code objects are kept in memory by script hash and, optionally, marshalled to
+CODE_CACHE_DIR so a restart of the runner (or a worker process) loads them
+instead of compiling the script again. Files live in a directory named after
+the interpreter's bytecode magic number, so a Python upgrade never loads code
+compiled by another version.
+
+The cache belongs to the event loop (or the worker's main thread): lookups
+and stores happen there. Only evict(), which touches nothing but files, may
+run in an executor.
+"""
+
+import importlib.util
+import logging
+import marshal
+import os
+import struct
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+from analyzer import script_hash
+from config import CODE_CACHE_DIR, CODE_CACHE_DISK, CODE_CACHE_SIZE, CODE_CACHE_MAX_MB
+
+logger = logging.getLogger(__name__)
+
+# Disk entries start with the seconds the original compile took
+HEADER = struct.Struct("!d")
+
+PYTHON_TAG = f"{sys.implementation.cache_tag}-{importlib.util.MAGIC_NUMBER.hex()}"
+
+
+class CodeCache:
+    """LRU of compiled scripts with an optional marshal-on-disk layer"""
+
+    def __init__(self, root: str = CODE_CACHE_DIR, disk: bool = CODE_CACHE_DISK,
+                 max_entries: int = CODE_CACHE_SIZE, max_bytes: int = CODE_CACHE_MAX_MB * 1024 * 1024):
+        self.root = os.path.join(os.path.abspath(root), PYTHON_TAG)
+        self.disk = disk
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # script hash -> (code, compile seconds)
+        self.bots = {}                # bot_id -> per-bot counters
+        self.stats = {
+            'hits': 0, 'disk_hits': 0, 'misses': 0, 'disk_errors': 0, 'evictions': 0,
+            'compile_seconds': 0.0, 'compile_seconds_saved': 0.0,
+        }
+        self.disk_files = 0   # as of the last evict() scan, plus files written since
+        self.disk_bytes = 0
+
+        if self.disk:
+            try:
+                os.makedirs(self.root, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"⚠️ Code cache directory unavailable, keeping code in memory only: {e}")
+                self.disk = False
+
+    def _path(self, key: str):
+        return os.path.join(self.root, f"{key}.code")
+
+    def _remember(self, key: str, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _read(self, key: str):
+        """(code, compile seconds) from disk, or None"""
+        if not self.disk:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            (seconds,) = HEADER.unpack_from(data)
+            code = marshal.loads(data[HEADER.size:])
+            os.utime(path)  # mtime doubles as the LRU clock
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # Truncated or foreign file: drop it, the script is compiled again
+            logger.warning(f"⚠️ Discarding unreadable code cache entry {key[:12]}: {e}")
+            self.stats['disk_errors'] += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return code, seconds
+
+    def _write(self, key: str, code, seconds: float):
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            data = HEADER.pack(seconds) + marshal.dumps(code)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+            self.disk_files += 1
+            self.disk_bytes += len(data)
+        except Exception as e:
+            self.stats['disk_errors'] += 1
+            logger.warning(f"⚠️ Code cache write failed: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def store(self, script: str, code, seconds: float):
+        """Remember the code object compiled for a script and what compiling it cost"""
+        key = script_hash(script)
+        self._remember(key, (code, seconds))
+        if self.disk and not os.path.exists(self._path(key)):
+            self._write(key, code, seconds)
+
+    def load(self, script: str, bot_id: str = None):
+        """Code object for a script, compiling it only if no cached copy exists"""
+        key = script_hash(script)
+        source = 'memory'
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        else:
+            entry = self._read(key)
+            source = 'disk'
+            if entry is not None:
+                self._remember(key, entry)
+
+        if entry is None:
+            source = 'miss'
+            started = time.perf_counter()
+            code = compile(script, "<string>", "exec")
+            seconds = time.perf_counter() - started
+            self.stats['misses'] += 1
+            self.stats['compile_seconds'] += seconds
+            self.store(script, code, seconds)
+            saved = 0.0
+        else:
+            code, saved = entry
+            self.stats['hits' if source == 'memory' else 'disk_hits'] += 1
+            self.stats['compile_seconds_saved'] += saved
+
+        if bot_id is not None:
+            bot = self.bots.setdefault(bot_id, {'code_cache_hits': 0, 'compile_seconds_saved': 0.0})
+            bot['code_cache'] = source
+            bot['code_cache_hits'] += source != 'miss'
+            bot['compile_seconds_saved'] = round(bot['compile_seconds_saved'] + saved, 4)
+        return code
+
+    def get_bot_stats(self, bot_id: str):
+        """Last lookup result, hits and compile time saved for one bot"""
+        return dict(self.bots.get(bot_id, {}))
+
+    def _files(self):
+        entries = []
+        if not self.disk:
+            return entries
+        for name in os.listdir(self.root):
+            try:
+                stat = os.stat(os.path.join(self.root, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        return entries
+
+    def evict(self):
+        """Drop least-recently-used files until the disk layer fits its budget (safe in an executor)"""
+        entries = self._files()
+        total = sum(size for _, size, _ in entries)
+        files = len(entries)
+
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.root, name))
+                total -= size
+                files -= 1
+                self.stats['evictions'] += 1
+            except FileNotFoundError:
+                pass
+
+        self.disk_files, self.disk_bytes = files, total
+        return total
+
+    def get_stats(self):
+        lookups = self.stats['hits'] + self.stats['disk_hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'compile_seconds': round(self.stats['compile_seconds'], 3),
+            'compile_seconds_saved': round(self.stats['compile_seconds_saved'], 3),
+            'hit_rate': round((self.stats['hits'] + self.stats['disk_hits']) / lookups * 100, 1) if lookups else 0.0,
+            'entries': len(self.entries),
+            'files': self.disk_files,
+            'size_mb': round(self.disk_bytes / (1024 * 1024), 1),
+        }
@@ -34,6 +34,8 @@ SESSION_DIR = os.getenv("SESSION_DIR", "./sessions")
 DOWNLOAD_DIR = os.getenv("DOWNLOAD_DIR", "./downloads")
 LOG_DIR = os.getenv("LOG_DIR", "./logs")
 
+SESSION_CACHE_ENABLED = os.getenv("SESSION_CACHE", "true").lower() == "true"  # persist hosted bot sessions
+
 # Create directories if they don't exist
 for directory in [SESSION_DIR, DOWNLOAD_DIR, LOG_DIR]:
     os.makedirs(directory, exist_ok=True)
@@ -52,6 +54,7 @@ BLOCKED_IMPORTS = [
     "subprocess.Popen",
     "eval(",
     "exec(",
+    "compile(",
     "__import__",
     "open(",
     "file(",
@@ -61,6 +64,25 @@ BLOCKED_IMPORTS = [
     "importlib.import_module",
 ]
 
+# Patterns rejected in scripts of every language
+DANGEROUS_PATTERNS = [
+    'rm -rf /', 'format c:', 'del /f /s /q',  # Destructive commands
+    '__import__("os").system', 'eval(', 'exec(',  # Dangerous functions
+    'subprocess.call', 'os.system',  # System access
+]
+
+# A JavaScript upload must contain at least one of these
+JS_REQUIRED_PATTERNS = ['require(', 'import ', 'bot.on', '.sendMessage']
+
+# Extremely dangerous shell commands
+SHELL_BLOCKED_COMMANDS = [
+    'rm -rf /',
+    'mkfs.',
+    'dd if=/dev/zero',
+    '> /dev/sda',
+    'chmod 777 /',
+]
+
 # Supported File Types Configuration
 SUPPORTED_FILE_TYPES = {
     "py": {
@@ -126,6 +148,20 @@ BOT_FOOTER = """
 # Logging Configuration
 LOG_LEVEL = "DEBUG" if DEBUG else "INFO"
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+LOG_BUFFER_SIZE = 64 * 1024  # bytes of recent stdout/stderr kept per subprocess bot stream
+LOG_BUFFER_MAX_MB = int(os.getenv("LOG_BUFFER_MAX_MB", "64"))  # output kept for stopped bots is evicted past this
+BOT_OUTPUT_LOGGING = os.getenv("BOT_OUTPUT_LOGGING", "false").lower() == "true"  # store subprocess bot output in MongoDB
+LOG_BATCH_SIZE = 500  # log entries per insert_many
+LOG_FLUSH_INTERVAL = 1.0  # seconds a log entry may wait for its batch to fill
+LOG_QUEUE_LIMIT = 10000  # log entries waiting for MongoDB before new ones are dropped
+LOG_RATE_PER_BOT = 20  # log entries per second a bot may write on average
+LOG_BURST_PER_BOT = 200  # log entries a bot may write in one burst
+LOG_ENQUEUE_TIMEOUT = 2  # seconds add_log waits for room in a full queue
+LOG_SEGMENT_MB = int(os.getenv("LOG_SEGMENT_MB", "8"))  # size at which a bot's log segment in LOG_DIR is rotated
+LOG_SEGMENT_SECONDS = int(os.getenv("LOG_SEGMENT_SECONDS", "86400"))  # age at which it is rotated
+LOG_INDEX_INTERVAL = 16 * 1024  # bytes between sparse index entries (also the compressed block size)
+LOG_MAX_OPEN_SEGMENTS = 256  # segment files kept open for appending
+LOG_WRITE_QUEUE = 10000  # output chunks waiting for the log writer thread before new ones are dropped
 
 # Rate Limiting (future feature)
 RATE_LIMIT_REQUESTS = 30
@@ -138,16 +174,70 @@ MAX_UPLOAD_SIZE_MB = 10
 
 # Runtime Validation
 RUNTIME_CHECK_TIMEOUT = 5  # seconds
+VALIDATION_CONCURRENCY = int(os.getenv("VALIDATION_CONCURRENCY", "0")) or (os.cpu_count() or 1)  # checks at once
+VALIDATION_LANGUAGE_CONCURRENCY = 2  # checks at once per language
+VALIDATION_QUEUE_LIMIT = 50  # checks waiting per language before uploads are turned away
+CHECKER_DAEMONS_ENABLED = os.getenv("CHECKER_DAEMONS", "true").lower() == "true"  # keep node/ruby/php checkers running
+CHECKER_MAX_CHECKS = 500  # checks before a checker process is recycled
+VALIDATION_CACHE_SIZE = 1000  # validation verdicts kept in memory
+VALIDATION_CACHE_PERSIST = os.getenv("VALIDATION_CACHE_PERSIST", "false").lower() == "true"  # also keep them in MongoDB
+VALIDATION_CACHE_TTL_DAYS = int(os.getenv("VALIDATION_CACHE_TTL_DAYS", "30"))  # days a persisted verdict is kept
 
 # Auto-restart Settings
 AUTO_RESTART_DELAY = 5  # seconds
 MAX_AUTO_RESTARTS = 10  # maximum restarts before giving up
 RESTART_WINDOW = 3600  # time window in seconds for counting restarts
+MAX_RESTART_BACKOFF = 300  # upper bound in seconds for the exponential restart delay
+DISCONNECT_GRACE_PERIOD = 30  # seconds a Python bot may stay disconnected before restart
+
+# Script Workspace Settings (point WORKSPACE_DIR at a tmpfs to keep scripts in RAM)
+WORKSPACE_DIR = os.getenv("WORKSPACE_DIR", "./workspace")
+WORKSPACE_GC_GRACE = int(os.getenv("WORKSPACE_GC_GRACE", "3600"))  # seconds an unused script is kept
+
+# Go Build Cache Settings
+GO_BUILD_CACHE_DIR = os.getenv("GO_BUILD_CACHE_DIR", "./cache/go")
+GO_BUILD_CACHE_MAX_MB = int(os.getenv("GO_BUILD_CACHE_MAX_MB", "1024"))  # size budget for binaries and the Go toolchain caches
+GO_BUILD_CONCURRENCY = int(os.getenv("GO_BUILD_CONCURRENCY", "2"))  # parallel go builds
+GO_BUILD_FLAGS = os.getenv("GO_BUILD_FLAGS", "-trimpath")
+
+# Python Code Cache Settings (compiled scripts of in-process bots)
+CODE_CACHE_DIR = os.getenv("CODE_CACHE_DIR", "./cache/code")
+CODE_CACHE_DISK = os.getenv("CODE_CACHE_DISK", "true").lower() == "true"  # marshal code objects to disk
+CODE_CACHE_SIZE = 256  # code objects kept in memory
+CODE_CACHE_MAX_MB = int(os.getenv("CODE_CACHE_MAX_MB", "256"))  # LRU size budget for the disk layer
+
+# Token Verification Settings
+BOT_API_URL = os.getenv("BOT_API_URL", "https://api.telegram.org")
+TOKEN_VERIFY_CACHE_TTL = 300  # seconds a getMe result is reused
+TOKEN_VERIFY_CACHE_SIZE = 1000  # verification results kept in memory
+TOKEN_VERIFY_CONCURRENCY = 10  # verifications in flight at once
+
+# Worker Pool Settings (host Python bots in separate processes)
+WORKER_POOL_ENABLED = os.getenv("WORKER_POOL", "false").lower() == "true"
+WORKER_POOL_SIZE = int(os.getenv("WORKER_POOL_SIZE", "0")) or (os.cpu_count() or 1)
+WORKER_REQUEST_TIMEOUT = 120  # seconds to wait for a worker to start or stop a bot
+
+# Warm Boot Settings (restoring running bots on startup)
+WARM_BOOT_CONCURRENCY = int(os.getenv("WARM_BOOT_CONCURRENCY", "20"))  # bots started in parallel
+WARM_BOOT_JITTER = float(os.getenv("WARM_BOOT_JITTER", "0.5"))  # max random delay per start, seconds
 
 # Performance Settings
 BOT_IDLE_TIMEOUT = 3600  # seconds before stopping idle bots
 CLEANUP_INTERVAL = 86400  # seconds between cleanup tasks (24 hours)
 LOG_RETENTION_DAYS = 30  # days to keep logs
+STATE_TTL_HOURS = 24  # hours an abandoned conversation state is kept
+STATE_CACHE_SIZE = 10000  # users whose conversation state is kept in memory
+STATE_FLUSH_INTERVAL = float(os.getenv("STATE_FLUSH_INTERVAL", "0.5"))  # seconds between state write-behind batches
+STATE_BATCH_SIZE = 500  # conversation states per bulk write
+LOGS_CAPPED_MB = int(os.getenv("LOGS_CAPPED_MB", "0"))  # >0: keep logs in a capped collection of this size instead of a TTL
+MIGRATION_BATCH_SIZE = 1000  # documents per batch in one-time data migrations
+SCRIPT_COMPRESSION_LEVEL = int(os.getenv("SCRIPT_COMPRESSION_LEVEL", "6"))  # zlib level for stored script bodies
+SCRIPT_VERSIONS_SHOWN = 5  # script versions listed in bot stats
+BOT_CACHE_SIZE = 1000  # bot documents kept in memory
+BOT_CACHE_TTL = int(os.getenv("BOT_CACHE_TTL", "30"))  # seconds a cached bot document is trusted
+BOT_CACHE_CHANGE_STREAM = os.getenv("BOT_CACHE_CHANGE_STREAM", "true").lower() == "true"  # invalidate on other instances' writes
+STATS_RECONCILE_INTERVAL = int(os.getenv("STATS_RECONCILE_INTERVAL", "300"))  # seconds between full stats recounts
+STATS_ACTIVE_DAYS = 7  # users active within this many days count as active
 
 # Validate required environment variables
 required_vars = {
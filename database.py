@@ -5,27 +5,115 @@ Channel: @zerodevbro
 Version: 2.0
 """
 
+import asyncio
+import hashlib
+import time
+import zlib
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
 from datetime import datetime
-from config import MONGO_URL, DATABASE_NAME
+from config import MONGO_URL, DATABASE_NAME, LOG_RETENTION_DAYS, STATE_TTL_HOURS, LOGS_CAPPED_MB, MIGRATION_BATCH_SIZE, \
+    SCRIPT_COMPRESSION_LEVEL, BOT_CACHE_CHANGE_STREAM, VALIDATION_CACHE_TTL_DAYS
+from logpipeline import LogPipeline
+from botcache import BotCache
+from statestore import StateStore
+from statsservice import StatsService
 import logging
 
 logger = logging.getLogger(__name__)
 
+# List queries never need the source; bots migrated to the scripts collection
+# don't carry it anyway, this keeps not-yet-migrated ones just as lean
+BOT_LIST_PROJECTION = {"script": 0}
+
+# Indexes the queries below rely on, per collection. create_indexes builds the
+# missing ones; TTL and capped-collection indexes are handled separately.
+INDEXES = {
+    "users": [
+        IndexModel("user_id", unique=True),
+        IndexModel("last_active"),                              # active user counts
+    ],
+    "bots": [
+        IndexModel([("user_id", 1), ("created_at", 1)]),        # a user's bots, in creation order
+        IndexModel("status"),                                   # running / crash-looping bots
+        IndexModel("script_hash"),                              # releasing script bodies
+        IndexModel("last_restart"),                             # recently restarted bots
+        IndexModel("updated_at"),                               # recently updated bots
+    ],
+    "script_versions": [
+        IndexModel([("bot_id", 1), ("version", -1)], unique=True),
+        IndexModel("script_hash"),
+    ],
+    "states": [
+        IndexModel("user_id", unique=True),
+    ],
+    "logs": [
+        IndexModel([("bot_id", 1), ("timestamp", -1)]),         # a bot's latest logs
+    ],
+}
+
+# Indexes earlier versions created that no query uses any more (or that a
+# compound index above now covers); dropped once their replacement exists
+RETIRED_INDEXES = {
+    "bots": ["user_id_1", "bot_username_1", "created_at_1"],
+    "logs": ["bot_id_1", "log_type_1"],
+}
+
+
+# Bot documents store BSON dates since schema 2; schema 1 used TIMESTAMP_FORMAT strings
+BOT_SCHEMA_VERSION = 2
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+BOT_TIMESTAMP_FIELDS = ("created_at", "updated_at", "last_restart", "quarantine.since")
+
+
+def as_datetime(value):
+    """A bot timestamp as a datetime, whether stored as a date or as a schema 1 string"""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.strptime(value, TIMESTAMP_FORMAT)
+        except ValueError:
+            return None
+    return None
+
+
+def format_timestamp(value):
+    """A bot timestamp for display"""
+    value = as_datetime(value) or value
+    if isinstance(value, datetime):
+        return value.strftime(TIMESTAMP_FORMAT)
+    return value or "N/A"
+
+
+def script_hash(script: str):
+    return hashlib.sha256(script.encode('utf-8', errors='surrogateescape')).hexdigest()
+
 class Database:
-    def __init__(self):
+    def __init__(self, name: str = DATABASE_NAME):
         self.client = AsyncIOMotorClient(MONGO_URL)
-        self.db = self.client[DATABASE_NAME]
+        self.db = self.client[name]
         self.bots = self.db.bots
         self.users = self.db.users
         self.states = self.db.states
         self.logs = self.db.logs  # New: Bot logs collection
+        self.validation_cache = self.db.validation_cache
+        self.scripts = self.db.scripts  # script bodies keyed by content hash, shared by bots
+        self.script_versions = self.db.script_versions  # append-only history of each bot's script
+        self.migrations = self.db.migrations  # one-time data migrations already applied
+        self.log_pipeline = LogPipeline(self.logs)
+        self.bot_cache = BotCache()
+        self.state_store = StateStore(self.states)
+        self.stats_service = StatsService(self.users, self.bots)
+        self._retention_sample = None  # (time, TTL deletions, logs inserted, logs count) the rate is measured from
+        self._eviction_rate = None     # logs/states evicted per minute
         logger.info("✅ Database connected successfully!")
     
     # User methods
     async def add_user(self, user_id: int, name: str):
         """Add or update user in database"""
-        await self.users.update_one(
+        previous = await self.users.find_one_and_update(
             {"user_id": user_id},
             {
                 "$set": {
@@ -38,8 +126,10 @@ class Database:
                     "total_bots_created": 0
                 }
             },
+            projection={"last_active": 1},
             upsert=True
         )
+        self.stats_service.user_seen(previous)
     
     async def get_all_users(self):
         """Get all users"""
@@ -47,7 +137,7 @@ class Database:
     
     async def get_user_count(self):
         """Get total user count"""
-        return await self.users.count_documents({})
+        return await self.users.estimated_document_count()
     
     async def get_active_users(self, days: int = 7):
         """Get users active in last N days"""
@@ -65,28 +155,37 @@ class Database:
     # Bot methods
     async def add_bot(self, user_id: int, token: str, script: str, bot_info: dict, file_metadata: dict = None):
         """Add a new bot to database with file metadata"""
+        from bson import ObjectId
+        bot_id = ObjectId()
+        version = await self._add_script_version(str(bot_id), script)
+        file_metadata = dict(file_metadata or {
+            "file_name": "script.py",
+            "file_type": "py",
+            "file_size": len(script)
+        })
+        file_metadata["lines"] = version["lines"]
         bot_doc = {
+            "_id": bot_id,
             "user_id": user_id,
             "token": token,
-            "script": script,
+            "script_hash": version["script_hash"],
+            "script_version": version["version"],
             "bot_username": bot_info.get("username", "unknown"),
             "bot_name": bot_info.get("first_name", "Unknown Bot"),
             "bot_id": bot_info.get("id"),
             "status": "stopped",
-            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "created_at": datetime.now(),
+            "updated_at": datetime.now(),
             "last_restart": None,
             "error_count": 0,
             "restart_count": 0,
             "uptime": 0,
             "auto_restart": True,
-            "file_metadata": file_metadata or {
-                "file_name": "script.py",
-                "file_type": "py",
-                "file_size": len(script)
-            }
+            "schema_version": BOT_SCHEMA_VERSION,
+            "file_metadata": file_metadata
         }
         result = await self.bots.insert_one(bot_doc)
+        self.stats_service.bot_added(bot_doc["file_metadata"].get("file_type", "py"))
         logger.info(f"✅ Bot added: {result.inserted_id} by user {user_id}")
         
         # Increment user's bot count
@@ -94,32 +193,311 @@ class Database:
         
         return str(result.inserted_id)
     
-    async def get_bot(self, bot_id: str):
-        """Get bot by ID"""
+    async def get_bot(self, bot_id: str, with_script: bool = False):
+        """Get bot by ID (``with_script`` also loads its source into bot["script"])"""
         from bson import ObjectId
         try:
-            return await self.bots.find_one({"_id": ObjectId(bot_id)})
+            bot = self.bot_cache.get(bot_id)
+            if bot is None:
+                generation = self.bot_cache.generation
+                bot = await self.bots.find_one({"_id": ObjectId(bot_id)})
+                if bot:
+                    self.bot_cache.put(bot_id, bot, generation)
+            if bot and with_script:
+                bot["script"] = await self.get_bot_script(bot)
+            return bot
         except Exception as e:
             logger.error(f"Error getting bot {bot_id}: {e}")
             return None
     
     async def get_user_bots(self, user_id: int):
         """Get all bots owned by a user"""
-        bots = await self.bots.find({"user_id": user_id}).to_list(length=None)
+        bots = await self.bots.find({"user_id": user_id}, BOT_LIST_PROJECTION).sort("created_at", 1).to_list(length=None)
         for bot in bots:
             bot["_id"] = str(bot["_id"])
         return bots
     
     async def get_all_bots(self):
         """Get all bots"""
-        bots = await self.bots.find().to_list(length=None)
+        bots = await self.bots.find({}, BOT_LIST_PROJECTION).to_list(length=None)
         for bot in bots:
             bot["_id"] = str(bot["_id"])
         return bots
     
     async def get_running_bots(self):
         """Get all running bots"""
-        bots = await self.bots.find({"status": "running"}).to_list(length=None)
+        bots = await self.bots.find({"status": "running"}, BOT_LIST_PROJECTION).to_list(length=None)
+        for bot in bots:
+            bot["_id"] = str(bot["_id"])
+        return bots
+    
+    # Script methods
+    async def _store_script(self, script: str):
+        """Store a script body once per content hash, zlib-compressed.
+
+        Returns (hash, size, stored size, whether this call added the body).
+        """
+        encoded = script.encode('utf-8', errors='surrogateescape')
+        digest = hashlib.sha256(encoded).hexdigest()
+        data = zlib.compress(encoded, SCRIPT_COMPRESSION_LEVEL)
+        result = await self.scripts.update_one(
+            {"_id": digest},
+            {"$setOnInsert": {
+                "data": data,
+                "encoding": "zlib",
+                "size": len(encoded),
+                "stored_size": len(data),
+                "created_at": datetime.now()
+            }},
+            upsert=True
+        )
+        return digest, len(encoded), len(data), result.upserted_id is not None
+    
+    async def save_script(self, script: str):
+        """Store a script body once per content hash, returns the hash"""
+        digest, _, _, _ = await self._store_script(script)
+        return digest
+    
+    @staticmethod
+    def _decode_script(doc: dict):
+        """Source held by a scripts document (uncompressed ones predate versioning)"""
+        if doc.get("encoding") == "zlib":
+            return zlib.decompress(doc["data"]).decode('utf-8', errors='surrogateescape')
+        return doc.get("script")
+    
+    async def get_script(self, digest: str):
+        """Source stored under a content hash"""
+        doc = await self.scripts.find_one({"_id": digest})
+        return self._decode_script(doc) if doc else None
+    
+    async def get_bot_script(self, bot: dict):
+        """Source of a bot, from the scripts collection (or inline for unmigrated bots)"""
+        if bot.get("script") is not None:
+            return bot["script"]
+        return await self.get_script(bot.get("script_hash"))
+    
+    async def get_script_lines(self, bot: dict):
+        """Line count of a bot's script, counted once and kept in its file metadata"""
+        from bson import ObjectId
+        lines = bot.get("file_metadata", {}).get("lines")
+        if lines is not None:
+            return lines
+        # Bots saved before the count was recorded
+        script = await self.get_bot_script(bot)
+        lines = (script or "").count("\n") + 1
+        await self.bots.update_one(
+            {"_id": ObjectId(bot["_id"])},
+            {"$set": {"file_metadata.lines": lines}}
+        )
+        self.bot_cache.invalidate(str(bot["_id"]))
+        return lines
+    
+    async def _add_script_version(self, bot_id: str, script: str):
+        """Append the next version of a bot's script, returns the version document"""
+        digest, size, stored_size, added = await self._store_script(script)
+        for _ in range(3):
+            latest = await self.script_versions.find_one(
+                {"bot_id": bot_id}, {"version": 1}, sort=[("version", -1)]
+            )
+            version = {
+                "bot_id": bot_id,
+                "version": (latest["version"] if latest else 0) + 1,
+                "script_hash": digest,
+                "size": size,
+                "lines": script.count("\n") + 1,
+                "stored_size": stored_size,
+                # Bytes this version added; a body already stored for any bot costs nothing
+                "added_bytes": stored_size if added else 0,
+                "created_at": datetime.now()
+            }
+            try:
+                await self.script_versions.insert_one(version)
+                return version
+            except DuplicateKeyError:
+                continue  # a concurrent update took this number
+        raise RuntimeError(f"Could not add a script version for bot {bot_id}")
+    
+    async def get_script_versions(self, bot_id: str, limit: int = 0):
+        """Script versions of a bot, newest first"""
+        cursor = self.script_versions.find({"bot_id": bot_id}, {"_id": 0}).sort("version", -1)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=limit or None)
+    
+    async def get_script_storage(self, bot_id: str):
+        """Number of versions and stored bytes of a bot's script history"""
+        result = await self.script_versions.aggregate([
+            {"$match": {"bot_id": bot_id}},
+            {"$group": {
+                "_id": None,
+                "versions": {"$sum": 1},
+                "size": {"$sum": "$size"},
+                "added_bytes": {"$sum": "$added_bytes"}
+            }}
+        ]).to_list(length=1)
+        if not result:
+            return {"versions": 0, "size": 0, "added_bytes": 0}
+        result[0].pop("_id")
+        return result[0]
+    
+    async def rollback_bot_script(self, bot_id: str, version: int = None):
+        """Point a bot at an earlier script version (the previous one by default).
+
+        Nothing is copied, the version history stays as it is. Returns the
+        version document now current, or None if there is nothing to roll back to.
+        """
+        from bson import ObjectId
+        try:
+            bot = await self.bots.find_one({"_id": ObjectId(bot_id)}, {"script_version": 1})
+            if not bot:
+                return None
+            if version is None:
+                query = {"bot_id": bot_id, "version": {"$lt": bot.get("script_version") or 0}}
+                target = await self.script_versions.find_one(query, sort=[("version", -1)])
+            else:
+                target = await self.script_versions.find_one({"bot_id": bot_id, "version": version})
+            if not target:
+                return None
+            
+            await self.bots.update_one(
+                {"_id": ObjectId(bot_id)},
+                {"$set": {
+                    "script_hash": target["script_hash"],
+                    "script_version": target["version"],
+                    "file_metadata.file_size": target["size"],
+                    "file_metadata.lines": target.get("lines"),
+                    "updated_at": datetime.now()
+                }}
+            )
+            self.bot_cache.invalidate(bot_id)
+            logger.info(f"⏪ Bot {bot_id} rolled back to script v{target['version']}")
+            return target
+        except Exception as e:
+            logger.error(f"Error rolling back bot script: {e}")
+            return None
+    
+    async def _release_script(self, digest: str):
+        """Delete a script body no bot or script version points at any more"""
+        if not digest:
+            return
+        if await self.bots.find_one({"script_hash": digest}, {"_id": 1}):
+            return
+        if await self.script_versions.find_one({"script_hash": digest}, {"_id": 1}):
+            return
+        await self.scripts.delete_one({"_id": digest})
+    
+    async def migrate_inline_scripts(self, batch_size: int = MIGRATION_BATCH_SIZE):
+        """Move scripts stored inline in bot documents into the scripts collection"""
+        moved = 0
+        while True:
+            bots = await self.bots.find(
+                {"script": {"$exists": True}}, {"script": 1}
+            ).limit(batch_size).to_list(length=batch_size)
+            if not bots:
+                break
+            for bot in bots:
+                digest = await self.save_script(bot["script"] or "")
+                await self.bots.update_one(
+                    {"_id": bot["_id"]},
+                    {"$set": {"script_hash": digest}, "$unset": {"script": ""}}
+                )
+                self.bot_cache.invalidate(bot["_id"])
+            moved += len(bots)
+            await asyncio.sleep(0.05)
+        if moved:
+            logger.info(f"✅ Moved {moved} inline scripts to the scripts collection")
+        return moved
+    
+    async def migrate_script_versions(self, batch_size: int = MIGRATION_BATCH_SIZE):
+        """Compress uncompressed script bodies and give unversioned bots a first version"""
+        compressed = 0
+        while True:
+            docs = await self.scripts.find(
+                {"encoding": {"$exists": False}}
+            ).limit(batch_size).to_list(length=batch_size)
+            if not docs:
+                break
+            for doc in docs:
+                encoded = (doc.get("script") or "").encode('utf-8', errors='surrogateescape')
+                data = zlib.compress(encoded, SCRIPT_COMPRESSION_LEVEL)
+                await self.scripts.update_one(
+                    {"_id": doc["_id"]},
+                    {"$set": {"data": data, "encoding": "zlib", "size": len(encoded), "stored_size": len(data)},
+                     "$unset": {"script": ""}}
+                )
+            compressed += len(docs)
+            await asyncio.sleep(0.05)
+        
+        versioned = 0
+        while True:
+            bots = await self.bots.find(
+                {"script_version": {"$exists": False}, "script_hash": {"$exists": True}}, {"script_hash": 1}
+            ).limit(batch_size).to_list(length=batch_size)
+            if not bots:
+                break
+            for bot in bots:
+                script = await self.get_script(bot["script_hash"])
+                version = await self._add_script_version(str(bot["_id"]), script or "")
+                await self.bots.update_one({"_id": bot["_id"]}, {"$set": {"script_version": version["version"]}})
+                self.bot_cache.invalidate(bot["_id"])
+            versioned += len(bots)
+            await asyncio.sleep(0.05)
+        
+        if compressed or versioned:
+            logger.info(f"✅ Compressed {compressed} scripts, started version history for {versioned} bots")
+        return compressed, versioned
+    
+    async def migrate_bot_timestamps(self, batch_size: int = MIGRATION_BATCH_SIZE):
+        """Convert schema 1 string timestamps of bot documents to dates, a batch at a time.
+        
+        Each update only applies if the strings it replaces are still there, so a
+        bot written in the meantime is simply converted again in a later batch.
+        """
+        converted = 0
+        while True:
+            bots = await self.bots.find(
+                {"schema_version": {"$not": {"$gte": BOT_SCHEMA_VERSION}}},
+                {"created_at": 1, "updated_at": 1, "last_restart": 1, "quarantine.since": 1}
+            ).limit(batch_size).to_list(length=batch_size)
+            if not bots:
+                break
+            
+            updates = []
+            for bot in bots:
+                query, changes = {"_id": bot["_id"]}, {"schema_version": BOT_SCHEMA_VERSION}
+                for field in BOT_TIMESTAMP_FIELDS:
+                    value = bot
+                    for part in field.split("."):
+                        value = value.get(part) if isinstance(value, dict) else None
+                    if isinstance(value, str) and as_datetime(value):
+                        query[field] = value  # unparseable strings are left as they are
+                        changes[field] = as_datetime(value)
+                updates.append(UpdateOne(query, {"$set": changes}))
+            
+            result = await self.bots.bulk_write(updates, ordered=False)
+            converted += result.modified_count
+            for bot in bots:
+                self.bot_cache.invalidate(bot["_id"])
+            await asyncio.sleep(0.05)
+        
+        if converted:
+            logger.info(f"✅ Converted timestamps of {converted} bots to dates (schema {BOT_SCHEMA_VERSION})")
+        return converted
+    
+    async def get_bots_restarted_since(self, since: datetime, limit: int = 50):
+        """Bots restarted at or after ``since``, most recent first"""
+        bots = await self.bots.find(
+            {"last_restart": {"$gte": since}}, BOT_LIST_PROJECTION
+        ).sort("last_restart", -1).limit(limit).to_list(length=limit)
+        for bot in bots:
+            bot["_id"] = str(bot["_id"])
+        return bots
+    
+    async def get_bots_updated_since(self, since: datetime, limit: int = 50):
+        """Bots updated at or after ``since``, most recent first"""
+        bots = await self.bots.find(
+            {"updated_at": {"$gte": since}}, BOT_LIST_PROJECTION
+        ).sort("updated_at", -1).limit(limit).to_list(length=limit)
         for bot in bots:
             bot["_id"] = str(bot["_id"])
         return bots
@@ -128,42 +506,101 @@ class Database:
         """Update bot status"""
         from bson import ObjectId
         try:
-            await self.bots.update_one(
+            previous = await self.bots.find_one_and_update(
                 {"_id": ObjectId(bot_id)},
                 {
                     "$set": {
                         "status": status,
-                        "last_restart": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    }
-                }
+                        "last_restart": datetime.now(),
+                        "updated_at": datetime.now()
+                    },
+                    "$unset": {"quarantine": ""}
+                },
+                projection={"status": 1}
             )
+            self.bot_cache.invalidate(bot_id)
+            if previous:
+                self.stats_service.status_changed(previous.get("status"), status)
             logger.info(f"Bot {bot_id} status updated to {status}")
         except Exception as e:
             logger.error(f"Error updating bot status: {e}")
     
+    async def quarantine_bot(self, bot_id: str, reason: str, restarts: int, restart_seconds: float):
+        """Mark a bot as crash-looping so it is no longer auto-restarted"""
+        from bson import ObjectId
+        try:
+            previous = await self.bots.find_one_and_update(
+                {"_id": ObjectId(bot_id)},
+                {
+                    "$set": {
+                        "status": "crash_looping",
+                        "quarantine": {
+                            "reason": reason,
+                            "restarts": restarts,
+                            "restart_seconds": restart_seconds,
+                            "since": datetime.now()
+                        },
+                        "updated_at": datetime.now()
+                    }
+                },
+                projection={"status": 1}
+            )
+            self.bot_cache.invalidate(bot_id)
+            if previous:
+                self.stats_service.status_changed(previous.get("status"), "crash_looping")
+            logger.info(f"Bot {bot_id} quarantined")
+        except Exception as e:
+            logger.error(f"Error quarantining bot: {e}")
+    
+    async def get_quarantined_bots(self):
+        """Get all crash-looping bots"""
+        bots = await self.bots.find({"status": "crash_looping"}, BOT_LIST_PROJECTION).to_list(length=None)
+        for bot in bots:
+            bot["_id"] = str(bot["_id"])
+        return bots
+    
     async def update_bot_script(self, bot_id: str, script: str):
-        """Update bot script"""
+        """Update bot script, keeping the previous one as an earlier version"""
         from bson import ObjectId
         try:
+            version = await self._add_script_version(bot_id, script)
             await self.bots.update_one(
                 {"_id": ObjectId(bot_id)},
                 {
                     "$set": {
-                        "script": script,
-                        "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    }
+                        "script_hash": version["script_hash"],
+                        "script_version": version["version"],
+                        "file_metadata.file_size": len(script),
+                        "file_metadata.lines": version["lines"],
+                        "updated_at": datetime.now()
+                    },
+                    "$unset": {"script": ""}
                 }
             )
-            logger.info(f"Bot {bot_id} script updated")
+            self.bot_cache.invalidate(bot_id)
+            logger.info(f"Bot {bot_id} script updated to v{version['version']}")
+            return version["version"]
         except Exception as e:
             logger.error(f"Error updating bot script: {e}")
+            return None
     
     async def delete_bot(self, bot_id: str):
-        """Delete a bot"""
+        """Delete a bot and its script history"""
         from bson import ObjectId
         try:
-            await self.bots.delete_one({"_id": ObjectId(bot_id)})
+            bot = await self.bots.find_one_and_delete(
+                {"_id": ObjectId(bot_id)},
+                projection={"script_hash": 1, "status": 1, "file_metadata.file_type": 1}
+            )
+            self.bot_cache.invalidate(bot_id)
+            self.log_pipeline.forget(bot_id)
+            if bot:
+                self.stats_service.bot_removed(bot)
+                digests = set(await self.script_versions.distinct("script_hash", {"bot_id": bot_id}))
+                digests.add(bot.get("script_hash"))
+                await self.script_versions.delete_many({"bot_id": bot_id})
+                for digest in digests:
+                    await self._release_script(digest)
             logger.info(f"Bot {bot_id} deleted")
         except Exception as e:
             logger.error(f"Error deleting bot: {e}")
@@ -176,6 +613,7 @@ class Database:
                 {"_id": ObjectId(bot_id)},
                 {"$inc": {"error_count": 1}}
             )
+            self.bot_cache.invalidate(bot_id)
         except Exception as e:
             logger.error(f"Error incrementing error count: {e}")
     
@@ -187,9 +625,10 @@ class Database:
                 {"_id": ObjectId(bot_id)},
                 {
                     "$inc": {"restart_count": 1},
-                    "$set": {"last_restart": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+                    "$set": {"last_restart": datetime.now()}
                 }
             )
+            self.bot_cache.invalidate(bot_id)
         except Exception as e:
             logger.error(f"Error incrementing restart count: {e}")
     
@@ -201,12 +640,13 @@ class Database:
                 {"_id": ObjectId(bot_id)},
                 {"$set": {"uptime": uptime_seconds}}
             )
+            self.bot_cache.invalidate(bot_id)
         except Exception as e:
             logger.error(f"Error updating bot uptime: {e}")
     
     async def get_bot_count(self):
         """Get total bot count"""
-        return await self.bots.count_documents({})
+        return await self.bots.estimated_document_count()
     
     async def get_running_bot_count(self):
         """Get running bot count"""
@@ -231,38 +671,44 @@ class Database:
     
     # State management methods
     async def set_user_state(self, user_id: int, action: str, message_id: int = None, data: dict = None):
-        """Set user state for multi-step operations"""
-        await self.states.update_one(
-            {"user_id": user_id},
-            {
-                "$set": {
-                    "action": action,
-                    "message_id": message_id,
-                    "data": data or {},
-                    "timestamp": datetime.now()
-                }
-            },
-            upsert=True
-        )
+        """Set user state for multi-step operations (persisted in the background)"""
+        self.state_store.set(user_id, action, message_id, data)
     
     async def get_user_state(self, user_id: int):
         """Get user state"""
-        return await self.states.find_one({"user_id": user_id})
+        return await self.state_store.get(user_id)
     
     async def clear_user_state(self, user_id: int):
         """Clear user state"""
-        await self.states.delete_one({"user_id": user_id})
+        self.state_store.clear(user_id)
+    
+    async def flush_states(self):
+        """Write pending user states to the states collection (on shutdown)"""
+        await self.state_store.close()
     
     # Log methods
     async def add_log(self, bot_id: str, log_type: str, message: str):
-        """Add a log entry"""
+        """Queue a log entry for the next batch write (waits briefly if the queue is full)"""
         log_doc = {
             "bot_id": bot_id,
-            "log_type": log_type,  # 'error', 'info', 'warning', 'restart'
+            "log_type": log_type,  # 'error', 'info', 'warning', 'restart', 'stdout', 'stderr'
             "message": message,
             "timestamp": datetime.now()
         }
-        await self.logs.insert_one(log_doc)
+        return await self.log_pipeline.put(log_doc)
+    
+    def add_log_nowait(self, bot_id: str, log_type: str, message: str):
+        """Queue a log entry without waiting, dropping it if the bot or the queue is over budget"""
+        return self.log_pipeline.submit({
+            "bot_id": bot_id,
+            "log_type": log_type,
+            "message": message,
+            "timestamp": datetime.now()
+        })
+    
+    async def flush_logs(self):
+        """Write out all queued log entries"""
+        await self.log_pipeline.close()
     
     async def get_bot_logs(self, bot_id: str, limit: int = 50):
         """Get recent logs for a bot"""
@@ -270,72 +716,39 @@ class Database:
         return logs
     
     async def clear_old_logs(self, days: int = 30):
-        """Clear logs older than N days"""
+        """Clear logs older than N days (the TTL index normally does this)"""
         from datetime import timedelta
         cutoff_date = datetime.now() - timedelta(days=days)
-        result = await self.logs.delete_many({"timestamp": {"$lt": cutoff_date}})
-        logger.info(f"Cleared {result.deleted_count} old logs")
-        return result.deleted_count
+        deleted = await self._delete_in_batches(self.logs, {"timestamp": {"$lt": cutoff_date}})
+        logger.info(f"Cleared {deleted} old logs")
+        return deleted
+    
+    # Validation cache methods
+    async def get_validation_result(self, key: str):
+        """Get a cached validation verdict"""
+        return await self.validation_cache.find_one({"_id": key})
+    
+    async def save_validation_result(self, key: str, is_safe: bool, error: str = None):
+        """Cache a validation verdict"""
+        await self.validation_cache.update_one(
+            {"_id": key},
+            {"$set": {"is_safe": is_safe, "error": error, "created_at": datetime.now()}},
+            upsert=True
+        )
     
     # Statistics methods
     async def get_stats(self):
-        """Get system statistics"""
-        total_users = await self.get_user_count()
-        total_bots = await self.get_bot_count()
-        running_bots = await self.get_running_bot_count()
-        active_users = await self.get_active_users(7)
-        bots_by_type = await self.get_bots_by_type()
-        
-        return {
-            "total_users": total_users,
-            "active_users": active_users,
-            "total_bots": total_bots,
-            "running_bots": running_bots,
-            "stopped_bots": total_bots - running_bots,
-            "bots_by_type": bots_by_type
-        }
+        """Get system statistics (from the stats snapshot)"""
+        return await self.stats_service.get()
     
     async def get_detailed_stats(self):
-        """Get detailed system statistics"""
-        stats = await self.get_stats()
-        
-        # Get top users
-        pipeline = [
-            {
-                "$group": {
-                    "_id": "$user_id",
-                    "bot_count": {"$sum": 1}
-                }
-            },
-            {"$sort": {"bot_count": -1}},
-            {"$limit": 10}
-        ]
-        top_users = await self.bots.aggregate(pipeline).to_list(length=10)
-        
-        # Get bots with most errors
-        pipeline = [
-            {"$sort": {"error_count": -1}},
-            {"$limit": 10}
-        ]
-        error_prone_bots = await self.bots.aggregate(pipeline).to_list(length=10)
-        
-        # Get bots with most restarts
-        pipeline = [
-            {"$sort": {"restart_count": -1}},
-            {"$limit": 10}
-        ]
-        restart_prone_bots = await self.bots.aggregate(pipeline).to_list(length=10)
-        
-        stats["top_users"] = top_users
-        stats["error_prone_bots"] = error_prone_bots
-        stats["restart_prone_bots"] = restart_prone_bots
-        
-        return stats
+        """Get detailed system statistics, with top users and error/restart-prone bots"""
+        return await self.stats_service.get(detailed=True)
     
     # Backup methods
     async def export_bot_data(self, bot_id: str):
         """Export all data for a specific bot"""
-        bot = await self.get_bot(bot_id)
+        bot = await self.get_bot(bot_id, with_script=True)
         if not bot:
             return None
         
@@ -343,6 +756,7 @@ class Database:
         
         return {
             "bot": bot,
+            "script_versions": await self.get_script_versions(bot_id),
             "logs": logs,
             "export_date": datetime.now().isoformat()
         }
@@ -360,50 +774,216 @@ class Database:
     
     # Maintenance methods
     async def cleanup_orphaned_states(self, hours: int = 24):
-        """Clean up old user states"""
+        """Clean up old user states (the TTL index normally does this)"""
         from datetime import timedelta
         cutoff_date = datetime.now() - timedelta(hours=hours)
-        result = await self.states.delete_many({"timestamp": {"$lt": cutoff_date}})
-        logger.info(f"Cleaned up {result.deleted_count} orphaned states")
-        return result.deleted_count
+        deleted = await self._delete_in_batches(self.states, {"timestamp": {"$lt": cutoff_date}})
+        logger.info(f"Cleaned up {deleted} orphaned states")
+        return deleted
     
     async def get_database_stats(self):
         """Get database statistics"""
         return {
-            "users_count": await self.users.count_documents({}),
-            "bots_count": await self.bots.count_documents({}),
-            "states_count": await self.states.count_documents({}),
-            "logs_count": await self.logs.count_documents({})
+            "users_count": await self.users.estimated_document_count(),
+            "bots_count": await self.bots.estimated_document_count(),
+            "states_count": await self.states.estimated_document_count(),
+            "logs_count": await self.logs.estimated_document_count()
         }
     
     async def create_indexes(self):
-        """Create database indexes for better performance"""
+        """Bring the indexes in line with INDEXES: build missing ones, drop retired ones"""
         try:
-            # Users indexes
-            await self.users.create_index("user_id", unique=True)
-            await self.users.create_index("last_active")
+            # States: abandoned conversations expire on their own
+            await self._ensure_ttl_index(self.states, "timestamp", STATE_TTL_HOURS * 3600)
             
-            # Bots indexes
-            await self.bots.create_index("user_id")
-            await self.bots.create_index("status")
-            await self.bots.create_index("bot_username")
-            await self.bots.create_index("created_at")
+            # Persisted validation verdicts: entries of older rulesets are never read again
+            await self._ensure_ttl_index(self.validation_cache, "created_at", VALIDATION_CACHE_TTL_DAYS * 86400)
             
-            # States indexes
-            await self.states.create_index("user_id", unique=True)
-            await self.states.create_index("timestamp")
+            # Logs: a capped collection evicts by size, otherwise a TTL index by age.
+            # convertToCapped drops every secondary index, so this runs before INDEXES.
+            if LOGS_CAPPED_MB:
+                await self._ensure_capped_logs(LOGS_CAPPED_MB * 1024 * 1024)
+                await self.logs.create_index("timestamp")
+            else:
+                await self._ensure_ttl_index(self.logs, "timestamp", LOG_RETENTION_DAYS * 86400)
             
-            # Logs indexes
-            await self.logs.create_index("bot_id")
-            await self.logs.create_index("timestamp")
-            await self.logs.create_index("log_type")
+            created, dropped = [], []
+            for name, models in INDEXES.items():
+                result = await self._reconcile_indexes(self.db[name], models, RETIRED_INDEXES.get(name, []))
+                created += result[0]
+                dropped += result[1]
             
-            logger.info("✅ Database indexes created successfully")
+            if created or dropped:
+                logger.info(f"✅ Database indexes reconciled: created {created or 'none'}, dropped {dropped or 'none'}")
+            else:
+                logger.info("✅ Database indexes up to date")
+            return created, dropped
         except Exception as e:
             logger.error(f"Error creating indexes: {e}")
+            return [], []
+    
+    async def _reconcile_indexes(self, collection, models: list, retired: list):
+        """Create the missing ``models`` on a collection, then drop the ``retired`` index names"""
+        existing = await collection.index_information()
+        missing = []
+        for model in models:
+            spec = model.document
+            index = existing.get(spec["name"])
+            if index is not None and bool(index.get("unique")) == bool(spec.get("unique")):
+                continue
+            if index is not None:
+                await collection.drop_index(spec["name"])  # same keys, different options
+            missing.append(model)
+        
+        created = await collection.create_indexes(missing) if missing else []
+        dropped = []
+        for name in retired:
+            if name in existing:
+                await collection.drop_index(name)
+                dropped.append(name)
+        return [f"{collection.name}.{name}" for name in created], [f"{collection.name}.{name}" for name in dropped]
+    
+    async def _ensure_ttl_index(self, collection, field: str, expire_after: int):
+        """Make ``field`` a TTL index, migrating existing documents and indexes once"""
+        await self._migrate_ttl(collection, field, expire_after)
+        
+        index = (await collection.index_information()).get(f"{field}_1")
+        if index is None:
+            await collection.create_index(field, expireAfterSeconds=expire_after)
+        elif index.get("expireAfterSeconds") != expire_after:
+            # Turn the plain index into a TTL index (or change its TTL) without a rebuild
+            try:
+                await self.db.command(
+                    "collMod", collection.name,
+                    index={"keyPattern": {field: 1}, "expireAfterSeconds": expire_after}
+                )
+            except OperationFailure:
+                await collection.drop_index(f"{field}_1")
+                await collection.create_index(field, expireAfterSeconds=expire_after)
+            logger.info(f"⏳ {collection.name}.{field} now expires after {expire_after}s")
+    
+    async def _migrate_ttl(self, collection, field: str, expire_after: int):
+        """One-time cleanup before a TTL index takes over a collection.
+        
+        Documents whose ``field`` is not a date would never expire, so they get
+        the current time. The backlog that is already past the TTL is deleted
+        in small batches, instead of the TTL monitor removing it in one go.
+        """
+        migration_id = f"{collection.name}_{field}_ttl_v1"
+        if await self.migrations.find_one({"_id": migration_id}):
+            return
+        
+        logger.info(f"🔧 Migrating {collection.name} to TTL retention...")
+        result = await collection.update_many(
+            {field: {"$not": {"$type": "date"}}},
+            {"$currentDate": {field: True}}
+        )
+        
+        from datetime import timedelta
+        cutoff = datetime.now() - timedelta(seconds=expire_after)
+        deleted = await self._delete_in_batches(collection, {field: {"$lt": cutoff}})
+        
+        await self.migrations.insert_one({"_id": migration_id, "applied_at": datetime.now()})
+        logger.info(
+            f"✅ {collection.name}: {result.modified_count} documents stamped, "
+            f"{deleted} expired documents removed"
+        )
+    
+    async def _delete_in_batches(self, collection, query: dict, batch_size: int = MIGRATION_BATCH_SIZE):
+        """delete_many in _id batches, yielding between them"""
+        deleted = 0
+        while True:
+            ids = [doc["_id"] async for doc in collection.find(query, {"_id": 1}).limit(batch_size)]
+            if not ids:
+                return deleted
+            result = await collection.delete_many({"_id": {"$in": ids}})
+            deleted += result.deleted_count
+            await asyncio.sleep(0.05)
+    
+    async def _ensure_capped_logs(self, size: int):
+        """Convert the logs collection to a capped collection of ``size`` bytes"""
+        names = await self.db.list_collection_names(filter={"name": "logs"})
+        if not names:
+            await self.db.create_collection("logs", capped=True, size=size)
+            logger.info(f"✅ Created capped logs collection ({size // (1024 * 1024)}MB)")
+            return
+        
+        options = await self.logs.options()
+        if options.get("capped") and options.get("size") == size:
+            return
+        
+        # A capped collection can't keep a TTL index
+        index = (await self.logs.index_information()).get("timestamp_1")
+        if index and index.get("expireAfterSeconds") is not None:
+            await self.logs.drop_index("timestamp_1")
+        
+        if options.get("capped"):
+            await self.db.command("collMod", "logs", cappedSize=size)
+        else:
+            # Rewrites the collection under an exclusive lock, so it only runs once
+            logger.info("🔧 Converting logs to a capped collection...")
+            await self.db.command("convertToCapped", "logs", size=size)
+        logger.info(f"✅ Logs collection capped at {size // (1024 * 1024)}MB")
+    
+    async def _collection_stats(self, collection):
+        cursor = collection.aggregate([{"$collStats": {"storageStats": {}, "count": {}}}])
+        stats = (await cursor.to_list(length=1) or [{}])[0].get("storageStats", {})
+        return {
+            "count": stats.get("count", 0),
+            "size_mb": round(stats.get("size", 0) / (1024 * 1024), 2),
+            "storage_mb": round(stats.get("storageSize", 0) / (1024 * 1024), 2),
+            "capped": stats.get("capped", False),
+        }
+    
+    async def get_retention_stats(self):
+        """Size of logs/states and how fast old entries are being evicted"""
+        logs = await self._collection_stats(self.logs)
+        states = await self._collection_stats(self.states)
+        
+        try:
+            status = await self.client.admin.command("serverStatus")
+            ttl_deleted = status.get("metrics", {}).get("ttl", {}).get("deletedDocuments", 0)
+        except OperationFailure:
+            ttl_deleted = None  # serverStatus needs the clusterMonitor role
+        
+        inserted = self.log_pipeline.stats['inserted']
+        sample = (time.time(), ttl_deleted, inserted, logs["count"])
+        if self._retention_sample is None:
+            self._retention_sample = sample
+        elif sample[0] - self._retention_sample[0] >= 60:
+            # Rates over less than a minute are mostly noise, keep the last one until then
+            then, then_ttl, then_inserted, then_count = self._retention_sample
+            if logs["capped"]:
+                # Whatever was written but didn't grow the collection was pushed out
+                evicted = (inserted - then_inserted) - (logs["count"] - then_count)
+            elif ttl_deleted is not None and then_ttl is not None:
+                evicted = ttl_deleted - then_ttl
+            else:
+                evicted = None
+            if evicted is not None:
+                self._eviction_rate = round(max(evicted, 0) / ((sample[0] - then) / 60), 1)
+            self._retention_sample = sample
+        
+        return {
+            "logs": logs,
+            "states": states,
+            "ttl_deleted_total": ttl_deleted,
+            "evictions_per_min": self._eviction_rate,
+        }
+    
+    def start_stats_reconcile(self):
+        """Recount the platform statistics now and every STATS_RECONCILE_INTERVAL seconds"""
+        self.stats_service.start()
+    
+    def watch_bot_changes(self):
+        """Invalidate cached bots on writes by other hoster instances (needs a replica set)"""
+        if BOT_CACHE_CHANGE_STREAM:
+            self.bot_cache.watch(self.bots)
     
     async def close(self):
         """Close database connection"""
+        await self.bot_cache.close()
+        await self.stats_service.close()
         self.client.close()
         logger.info("Database connection closed")
     
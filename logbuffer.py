@@ -0,0 +1,189 @@
+"""
+Log Buffer - Continuous stdout/stderr capture for subprocess bots
+Developer: @Zeroboy216
+Channel: @zerodevbro
+
+Subprocess bots write into plain OS pipes whose read ends are all registered
+with the event loop, so one reader callback drains every bot as soon as data
+arrives and a chatty bot can never block on a full pipe. Output is copied
+straight from the read buffer into a fixed-size ring per stream; lines are
+only split when the logs are read. An optional ``sink`` also receives every
+chunk read, e.g. to forward bot output to the log pipeline.
+"""
+
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from config import LOG_BUFFER_SIZE, LOG_BUFFER_MAX_MB
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK = 64 * 1024
+STREAMS = ('stdout', 'stderr')
+
+
+class RingBuffer:
+    """Keeps the last ``capacity`` bytes written to it"""
+
+    def __init__(self, capacity: int = LOG_BUFFER_SIZE):
+        self.capacity = capacity
+        self.buffer = bytearray(capacity)
+        self.pos = 0     # next write offset
+        self.size = 0    # bytes held
+        self.total = 0   # bytes ever written
+
+    def write(self, data):
+        n = len(data)
+        self.total += n
+        if n >= self.capacity:
+            self.buffer[:] = data[n - self.capacity:]
+            self.pos, self.size = 0, self.capacity
+            return
+
+        first = min(n, self.capacity - self.pos)
+        self.buffer[self.pos:self.pos + first] = data[:first]
+        if first < n:
+            self.buffer[:n - first] = data[first:]
+        self.pos = (self.pos + n) % self.capacity
+        self.size = min(self.capacity, self.size + n)
+
+    def contents(self):
+        """Buffered bytes, oldest first"""
+        if self.size < self.capacity:
+            return bytes(self.buffer[:self.size])
+        return bytes(self.buffer[self.pos:]) + bytes(self.buffer[:self.pos])
+
+    def tail(self, lines: int):
+        """The last ``lines`` lines as text"""
+        data = self.contents()
+        if self.size == self.capacity:
+            # The oldest line was probably cut by the wrap-around
+            data = data[data.find(b"\n") + 1:]
+
+        end = len(data) - 1 if data.endswith(b"\n") else len(data)
+        start = end
+        for _ in range(lines):
+            start = data.rfind(b"\n", 0, start)
+            if start < 0:
+                break
+        return data[start + 1:end].decode('utf-8', errors='replace')
+
+    @property
+    def dropped(self):
+        return self.total - self.size
+
+
+class OutputCollector:
+    """Drains the output pipes of every subprocess bot into per-bot ring buffers"""
+
+    def __init__(self, buffer_size: int = LOG_BUFFER_SIZE, max_bytes: int = LOG_BUFFER_MAX_MB * 1024 * 1024,
+                 sink=None):
+        self.buffer_size = buffer_size
+        self.sink = sink              # sink(bot_id, stream, data) per chunk read, data=b"" at end of stream
+        self.max_bytes = max_bytes
+        self.buffers = OrderedDict()  # bot_id -> {'stdout': RingBuffer, 'stderr': RingBuffer}
+        self.readers = {}             # read fd -> (bot_id, stream name, RingBuffer)
+        self.chunk = memoryview(bytearray(READ_CHUNK))
+        self.stats = {'bytes': 0, 'evicted': 0}
+
+    def _live_bots(self):
+        return {bot_id for bot_id, _, _ in self.readers.values()}
+
+    def _buffers(self, bot_id: str):
+        buffers = self.buffers.get(bot_id)
+        if buffers is None:
+            buffers = self.buffers[bot_id] = {name: RingBuffer(self.buffer_size) for name in STREAMS}
+            self._evict()
+        self.buffers.move_to_end(bot_id)
+        return buffers
+
+    def _evict(self):
+        """Forget the output of stopped bots, oldest first, while over the memory budget"""
+        live = self._live_bots()
+        for bot_id in list(self.buffers):
+            if len(self.buffers) * len(STREAMS) * self.buffer_size <= self.max_bytes:
+                break
+            if bot_id not in live:
+                del self.buffers[bot_id]
+                self.stats['evicted'] += 1
+
+    @contextmanager
+    def capture(self, bot_id: str):
+        """Yields the (stdout, stderr) fds to hand to a new subprocess of ``bot_id``"""
+        buffers = self._buffers(bot_id)
+        read_fds, write_fds = [], []
+        try:
+            for name in STREAMS:
+                read_fd, write_fd = os.pipe()
+                read_fds.append(read_fd)
+                write_fds.append(write_fd)
+                os.set_blocking(read_fd, False)
+                self.readers[read_fd] = (bot_id, name, buffers[name])
+                asyncio.get_running_loop().add_reader(read_fd, self._on_readable, read_fd)
+            yield tuple(write_fds)
+        except BaseException:
+            for read_fd in read_fds:
+                self._close_reader(read_fd)
+            raise
+        finally:
+            # The child holds its own copies; ours would keep EOF from ever arriving
+            for write_fd in write_fds:
+                os.close(write_fd)
+
+    def _on_readable(self, fd: int):
+        try:
+            n = os.readv(fd, [self.chunk])
+        except BlockingIOError:
+            return
+        except OSError:
+            n = 0
+
+        if n == 0:
+            self._close_reader(fd)
+            return
+        bot_id, name, buffer = self.readers[fd]
+        buffer.write(self.chunk[:n])
+        self.stats['bytes'] += n
+        if self.sink:
+            try:
+                self.sink(bot_id, name, bytes(self.chunk[:n]))
+            except Exception as e:
+                logger.error(f"Output sink failed for bot {bot_id}: {e}")
+
+    def _close_reader(self, fd: int):
+        reader = self.readers.pop(fd, None)
+        if reader is None:
+            return
+        if self.sink:
+            try:
+                self.sink(reader[0], reader[1], b"")  # end of stream
+            except Exception as e:
+                logger.error(f"Output sink failed for bot {reader[0]}: {e}")
+        asyncio.get_running_loop().remove_reader(fd)
+        os.close(fd)
+
+    def has_output(self, bot_id: str):
+        return bot_id in self.buffers
+
+    def tail(self, bot_id: str, lines: int = 50):
+        """{'stdout': text, 'stderr': text} with the last lines of each stream"""
+        buffers = self.buffers.get(bot_id)
+        if buffers is None:
+            return {}
+        return {name: buffer.tail(lines) for name, buffer in buffers.items()}
+
+    def close(self):
+        for fd in list(self.readers):
+            self._close_reader(fd)
+
+    def get_stats(self):
+        return {
+            **self.stats,
+            'bots': len(self.buffers),
+            'open_pipes': len(self.readers),
+            'dropped_bytes': sum(buffer.dropped for buffers in self.buffers.values() for buffer in buffers.values()),
+            'memory_mb': round(len(self.buffers) * len(STREAMS) * self.buffer_size / (1024 * 1024), 1),
+        }
@@ -0,0 +1,173 @@
+"""
+Log Pipeline - Batched, rate-limited log ingestion into MongoDB
+Developer: @Zeroboy216
+Channel: @zerodevbro
+
+Log documents are queued in memory and written with insert_many(ordered=False)
+once LOG_BATCH_SIZE documents are waiting or LOG_FLUSH_INTERVAL seconds have
+passed, so a burst of log lines costs one round trip instead of one each.
+Every bot gets a token bucket; documents over a bot's budget, or arriving
+while the queue is full because MongoDB is slow, are dropped and counted.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+from pymongo.errors import BulkWriteError
+
+from config import (
+    LOG_BATCH_SIZE, LOG_FLUSH_INTERVAL, LOG_QUEUE_LIMIT,
+    LOG_RATE_PER_BOT, LOG_BURST_PER_BOT, LOG_ENQUEUE_TIMEOUT
+)
+
+logger = logging.getLogger(__name__)
+
+
+class LogPipeline:
+    """In-memory queue flushed to a collection in batches"""
+
+    def __init__(self, collection, batch_size: int = LOG_BATCH_SIZE, flush_interval: float = LOG_FLUSH_INTERVAL,
+                 queue_limit: int = LOG_QUEUE_LIMIT, rate: float = LOG_RATE_PER_BOT, burst: int = LOG_BURST_PER_BOT):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_limit = queue_limit
+        self.rate = rate
+        self.burst = burst
+        self.queue = deque()
+        self.buckets = {}      # bot_id -> [tokens, last refill]
+        self.dropped = {}      # bot_id -> documents dropped
+        self.task = None
+        self.closing = False
+        self.pending = None    # set while documents are queued
+        self.full = None       # set once a whole batch is queued
+        self.space = None      # set while the queue has room
+        self.stats = {
+            'queued': 0, 'inserted': 0, 'batches': 0, 'failed': 0,
+            'rate_limited': 0, 'queue_full': 0, 'waits': 0,
+        }
+
+    def _start(self):
+        if self.task is None:
+            self.pending = asyncio.Event()
+            self.full = asyncio.Event()
+            self.space = asyncio.Event()
+            self.space.set()
+            self.task = asyncio.get_running_loop().create_task(self._run())
+
+    def _allow(self, bot_id: str):
+        """Take a token from the bot's bucket"""
+        now = time.monotonic()
+        bucket = self.buckets.setdefault(bot_id, [self.burst, now])
+        bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if bucket[0] < 1:
+            return False
+        bucket[0] -= 1
+        return True
+
+    def _drop(self, bot_id: str, reason: str):
+        self.stats[reason] += 1
+        self.dropped[bot_id] = self.dropped.get(bot_id, 0) + 1
+        return False
+
+    def forget(self, bot_id: str):
+        """Drop a stopped or deleted bot's rate limit bucket and drop counter"""
+        self.buckets.pop(bot_id, None)
+        self.dropped.pop(bot_id, None)
+
+    def _enqueue(self, doc: dict):
+        self.queue.append(doc)
+        self.stats['queued'] += 1
+        self.pending.set()
+        if len(self.queue) >= self.batch_size:
+            self.full.set()
+        if len(self.queue) >= self.queue_limit:
+            self.space.clear()
+        return True
+
+    def submit(self, doc: dict):
+        """Queue a document without waiting; returns False if it was dropped"""
+        self._start()
+        if not self._allow(doc['bot_id']):
+            return self._drop(doc['bot_id'], 'rate_limited')
+        if len(self.queue) >= self.queue_limit:
+            return self._drop(doc['bot_id'], 'queue_full')
+        return self._enqueue(doc)
+
+    async def put(self, doc: dict, timeout: float = LOG_ENQUEUE_TIMEOUT):
+        """Queue a document, waiting up to ``timeout`` seconds for room in the queue"""
+        self._start()
+        if not self._allow(doc['bot_id']):
+            return self._drop(doc['bot_id'], 'rate_limited')
+
+        if len(self.queue) >= self.queue_limit:
+            self.stats['waits'] += 1
+            try:
+                await asyncio.wait_for(self._wait_for_space(), timeout)
+            except asyncio.TimeoutError:
+                return self._drop(doc['bot_id'], 'queue_full')
+        return self._enqueue(doc)
+
+    async def _wait_for_space(self):
+        while len(self.queue) >= self.queue_limit:
+            await self.space.wait()
+
+    async def _run(self):
+        while not (self.closing and not self.queue):
+            await self.pending.wait()
+            if len(self.queue) < self.batch_size and not self.closing:
+                try:
+                    await asyncio.wait_for(self.full.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            await self._flush_batch()
+
+    async def _flush_batch(self):
+        batch = [self.queue.popleft() for _ in range(min(self.batch_size, len(self.queue)))]
+        if len(self.queue) < self.batch_size:
+            self.full.clear()
+        if not self.queue:
+            self.pending.clear()
+        if not batch:
+            return
+
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+            self.stats['inserted'] += len(batch)
+        except BulkWriteError as e:
+            # With ordered=False the rest of the batch is still written
+            written = e.details.get('nInserted', 0)
+            self.stats['inserted'] += written
+            self.stats['failed'] += len(batch) - written
+            logger.error(f"❌ Failed to write {len(batch) - written} log entries: {e}")
+        except Exception as e:
+            self.stats['failed'] += len(batch)
+            logger.error(f"❌ Failed to write {len(batch)} log entries: {e}")
+        finally:
+            self.stats['batches'] += 1
+            if len(self.queue) < self.queue_limit:
+                self.space.set()
+
+    async def close(self):
+        """Flush everything still queued and stop the flush task"""
+        if self.task is None:
+            return
+        self.closing = True
+        self.pending.set()
+        self.full.set()
+        await self.task
+        self.task = None
+        self.closing = False
+        logger.info("✅ Log pipeline flushed")
+
+    def get_stats(self):
+        return {
+            **self.stats,
+            'backlog': len(self.queue),
+            'avg_batch': round(self.stats['inserted'] / self.stats['batches'], 1) if self.stats['batches'] else 0.0,
+            'tracked_bots': len(self.buckets),
+            'top_dropped': sorted(self.dropped.items(), key=lambda item: item[1], reverse=True)[:5],
+        }
@@ -0,0 +1,416 @@
+"""
+Log Store - Rotating per-bot log segments in LOG_DIR
+Developer: @Zeroboy216
+Channel: @zerodevbro
+
+Each bot's output is appended to segment files under LOG_DIR/bots/<bot_id>/,
+one ``<timestamp> <stream> <text>`` line per output line. A segment is closed
+once it reaches LOG_SEGMENT_MB or LOG_SEGMENT_SECONDS and then compressed.
+Next to each segment a sparse index records the first timestamp and the
+offset of every LOG_INDEX_INTERVAL-byte block. Closed segments are gzipped
+one block per gzip member, so the index still points at places a reader can
+seek to. "Last N lines" and "lines since T" only read the blocks they need.
+Retention deletes whole segments.
+
+Appends, rotation, compression and retention all run on one writer thread,
+so the event loop only queues output chunks and the open segments and bot
+directories are only ever changed by that thread. Readers just read files.
+"""
+
+import asyncio
+import bisect
+import gzip
+import logging
+import os
+import queue
+import shutil
+import struct
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from config import (
+    LOG_DIR, LOG_SEGMENT_MB, LOG_SEGMENT_SECONDS, LOG_INDEX_INTERVAL,
+    LOG_MAX_OPEN_SEGMENTS, LOG_RETENTION_DAYS, LOG_WRITE_QUEUE
+)
+
+logger = logging.getLogger(__name__)
+
+# First timestamp of a block and the block's offset in the segment file
+INDEX_RECORD = struct.Struct("!dQ")
+
+# An unterminated line is written out once it grows past this
+PARTIAL_LINE_LIMIT = 16 * 1024
+
+
+def _parse_line(line: bytes):
+    """(timestamp, stream, text) of a stored line"""
+    ts, stream, text = line.split(b" ", 2)
+    return float(ts), stream.decode(), text.decode('utf-8', errors='replace')
+
+
+class LogSegmentStore:
+    """Append-only, indexed, rotating log segments per bot"""
+
+    def __init__(self, root: str = LOG_DIR, segment_bytes: int = LOG_SEGMENT_MB * 1024 * 1024,
+                 segment_seconds: int = LOG_SEGMENT_SECONDS, index_interval: int = LOG_INDEX_INTERVAL,
+                 retention_days: int = LOG_RETENTION_DAYS, max_open: int = LOG_MAX_OPEN_SEGMENTS,
+                 queue_size: int = LOG_WRITE_QUEUE):
+        self.root = os.path.join(os.path.abspath(root), "bots")
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.index_interval = index_interval
+        self.retention_days = retention_days
+        self.max_open = max_open
+        self.active = OrderedDict()  # bot_id -> open segment being appended to (writer thread only)
+        self.partial = {}            # (bot_id, stream) -> unterminated line (writer thread only)
+        self.stats = {
+            'lines': 0, 'bytes': 0, 'rotations': 0, 'compressed': 0,
+            'deleted_segments': 0, 'deleted_bytes': 0, 'dropped': 0,
+        }
+
+        os.makedirs(self.root, exist_ok=True)
+        self.segments, self.disk_bytes = self._scan()  # kept up to date by the writer thread
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.writer = threading.Thread(target=self._write_loop, name="log-store", daemon=True)
+        self.writer.start()
+
+    def _dir(self, bot_id: str):
+        return os.path.join(self.root, os.path.basename(bot_id))
+
+    def _scan(self):
+        """(segments, bytes) on disk, counted once at startup"""
+        segments, size = 0, 0
+        for dirpath, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith((".log", ".log.gz")):
+                    segments += 1
+                try:
+                    size += os.path.getsize(os.path.join(dirpath, name))
+                except FileNotFoundError:
+                    pass
+        return segments, size
+
+    @staticmethod
+    def _size(*paths):
+        size = 0
+        for path in paths:
+            try:
+                size += os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+        return size
+
+    # Writer thread
+
+    def _write_loop(self):
+        while True:
+            future, func, args = self.queue.get()
+            if func is None:
+                return
+            try:
+                result = func(*args)
+                if future is not None:
+                    future.set_result(result)
+            except Exception as e:
+                if future is not None:
+                    future.set_exception(e)
+                else:
+                    logger.error(f"❌ Log store write failed: {e}")
+
+    def _submit(self, func, *args):
+        """Run ``func`` on the writer thread (inline once it is stopped), returns a Future.
+
+        Raises queue.Full rather than block the caller when the writer is behind.
+        """
+        future = Future()
+        if not self.writer.is_alive():
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        self.queue.put_nowait((future, func, args))
+        return future
+
+    # Writing
+
+    def append(self, bot_id: str, stream: str, data: bytes):
+        """Queue a chunk of output; empty ``data`` writes out a pending unterminated line"""
+        if not self.writer.is_alive():
+            self._append(bot_id, stream, data)
+            return
+        try:
+            self.queue.put_nowait((None, self._append, (bot_id, stream, data)))
+        except queue.Full:
+            self.stats['dropped'] += 1
+
+    def _append(self, bot_id: str, stream: str, data: bytes):
+        key = (bot_id, stream)
+        data = self.partial.pop(key, b"") + (data or b"\n")
+        lines = data.split(b"\n")
+        rest = lines.pop()
+        if len(rest) > PARTIAL_LINE_LIMIT:
+            lines.append(rest)
+        elif rest:
+            self.partial[key] = rest
+        lines = [line for line in lines if line]
+        if not lines:
+            return
+
+        segment = self._segment(bot_id)
+        prefix = f"{time.time():.3f} {stream} ".encode()
+        for line in lines:
+            if segment['indexed_at'] is None or segment['size'] - segment['indexed_at'] >= self.index_interval:
+                self._index(segment, time.time(), segment['size'])
+            record = prefix + line.rstrip(b"\r") + b"\n"
+            segment['file'].write(record)
+            segment['size'] += len(record)
+            self.stats['bytes'] += len(record)
+            self.disk_bytes += len(record)
+        segment['file'].flush()
+        self.stats['lines'] += len(lines)
+
+    def _index(self, segment: dict, ts: float, offset: int):
+        with open(segment['index_path'], 'ab') as f:
+            f.write(INDEX_RECORD.pack(ts, offset))
+        segment['indexed_at'] = offset
+        self.disk_bytes += INDEX_RECORD.size
+
+    def _segment(self, bot_id: str):
+        """The bot's open segment, rotating it first if it is full or too old"""
+        segment = self.active.get(bot_id)
+        if segment is not None:
+            self.active.move_to_end(bot_id)
+            if not self._expired(segment['start'], segment['size']):
+                return segment
+            self._close(bot_id, compress=True)
+
+        directory = self._dir(bot_id)
+        os.makedirs(directory, exist_ok=True)
+
+        # Keep appending to the latest segment of a previous run if it still has room
+        latest = next((s for s in reversed(self._segments(bot_id)) if not s['compressed']), None)
+        if latest and not self._expired(latest['start'], os.path.getsize(latest['path'])):
+            start = latest['start']
+            index = self._read_index(latest['index_path'])
+            indexed_at = index[-1][1] if index else None
+        else:
+            start, indexed_at = int(time.time() * 1000), None
+
+        path = os.path.join(directory, f"{start}.log")
+        if not os.path.exists(path):
+            self.segments += 1
+        segment = {
+            'start': start,
+            'path': path,
+            'index_path': os.path.join(directory, f"{start}.idx"),
+            'file': open(path, 'ab'),
+            'indexed_at': indexed_at,
+        }
+        segment['size'] = segment['file'].tell()
+        self.active[bot_id] = segment
+
+        while len(self.active) > self.max_open:
+            self._close(next(iter(self.active)))
+        return segment
+
+    def _expired(self, start: int, size: int):
+        return size >= self.segment_bytes or time.time() - start / 1000 >= self.segment_seconds
+
+    def _close(self, bot_id: str, compress: bool = False):
+        segment = self.active.pop(bot_id)
+        segment['file'].close()
+        if compress:
+            self.stats['rotations'] += 1
+            self._compress(segment['path'], segment['index_path'])
+
+    def _compress(self, path: str, index_path: str):
+        """Gzip a closed segment one indexed block per member and re-point its index"""
+        gz_path, gz_index_path = f"{path}.gz", index_path[:-len(".idx")] + ".gz.idx"
+        try:
+            index = self._read_index(index_path)
+            offsets = [offset for _, offset in index] + [os.path.getsize(path)]
+            new_index = []
+            with open(path, 'rb') as src, open(f"{gz_path}.tmp", 'wb') as dst:
+                for (ts, offset), end in zip(index, offsets[1:]):
+                    src.seek(offset)
+                    new_index.append(INDEX_RECORD.pack(ts, dst.tell()))
+                    dst.write(gzip.compress(src.read(end - offset), mtime=0))
+            with open(f"{gz_index_path}.tmp", 'wb') as f:
+                f.write(b"".join(new_index))
+            os.replace(f"{gz_path}.tmp", gz_path)
+            # The compressed segment only counts once its index is in place
+            os.replace(f"{gz_index_path}.tmp", gz_index_path)
+            self.disk_bytes -= self._size(path, index_path)
+            for leftover in (path, index_path):
+                os.remove(leftover)
+            self.disk_bytes += self._size(gz_path, gz_index_path)
+            self.stats['compressed'] += 1
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"❌ Failed to compress log segment {path}: {e}")
+
+    def _close_all(self):
+        for bot_id, stream in list(self.partial):
+            self._append(bot_id, stream, b"")
+        while self.active:
+            self._close(next(iter(self.active)))
+
+    def close(self):
+        """Write out queued output and pending partial lines, close open segments and stop the writer"""
+        if self.writer.is_alive():
+            self.queue.put((None, self._close_all, ()))
+            self.queue.put((None, None, ()))
+            self.writer.join()
+        else:
+            self._close_all()
+
+    # Reading
+
+    def _segments(self, bot_id: str):
+        """Segments of a bot, oldest first"""
+        directory = self._dir(bot_id)
+        try:
+            names = set(os.listdir(directory))
+        except FileNotFoundError:
+            return []
+
+        segments = []
+        for name in names:
+            if not name.endswith(".log"):
+                continue
+            start = name[:-len(".log")]
+            if f"{start}.gz.idx" in names:
+                continue  # compressed copy is complete, the raw file is about to go
+            segments.append({'start': int(start), 'compressed': False, 'path': os.path.join(directory, name),
+                             'index_path': os.path.join(directory, f"{start}.idx")})
+        for name in names:
+            if name.endswith(".gz.idx"):
+                start = name[:-len(".gz.idx")]
+                segments.append({'start': int(start), 'compressed': True,
+                                 'path': os.path.join(directory, f"{start}.log.gz"),
+                                 'index_path': os.path.join(directory, name)})
+        return sorted(segments, key=lambda segment: segment['start'])
+
+    @staticmethod
+    def _read_index(index_path: str):
+        try:
+            with open(index_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        usable = len(data) - len(data) % INDEX_RECORD.size
+        return [INDEX_RECORD.unpack_from(data, offset) for offset in range(0, usable, INDEX_RECORD.size)]
+
+    def _block_reader(self, segment: dict):
+        """(index, read_block) for a segment; read_block(i) returns the lines of block i"""
+        index = self._read_index(segment['index_path'])
+        try:
+            end = os.path.getsize(segment['path'])
+        except FileNotFoundError:
+            return [], None
+        offsets = [offset for _, offset in index] + [end]
+
+        def read_block(i):
+            with open(segment['path'], 'rb') as f:
+                f.seek(offsets[i])
+                data = f.read(offsets[i + 1] - offsets[i])
+            if segment['compressed']:
+                data = gzip.decompress(data)
+            return [line for line in data.split(b"\n") if line]
+
+        return index, read_block
+
+    def tail(self, bot_id: str, lines: int = 50, stream: str = None):
+        """Last ``lines`` lines as (timestamp, stream, text), oldest first"""
+        collected = []
+        for segment in reversed(self._segments(bot_id)):
+            index, read_block = self._block_reader(segment)
+            for i in reversed(range(len(index))):
+                try:
+                    block = [_parse_line(line) for line in read_block(i)]
+                except (OSError, ValueError):
+                    continue
+                if stream:
+                    block = [entry for entry in block if entry[1] == stream]
+                collected[:0] = block
+                if len(collected) >= lines:
+                    return collected[-lines:]
+        return collected
+
+    def since(self, bot_id: str, since: float, limit: int = 1000, stream: str = None):
+        """Up to ``limit`` lines logged at or after the epoch time ``since``, oldest first"""
+        segments = self._segments(bot_id)
+        collected = []
+        for position, segment in enumerate(segments):
+            following = segments[position + 1:position + 2]
+            if following and following[0]['start'] / 1000 < since:
+                continue  # this segment was closed before ``since``
+
+            index, read_block = self._block_reader(segment)
+            first = max(0, bisect.bisect_right([ts for ts, _ in index], since) - 1)
+            for i in range(first, len(index)):
+                try:
+                    block = [_parse_line(line) for line in read_block(i)]
+                except (OSError, ValueError):
+                    continue
+                collected.extend(
+                    entry for entry in block if entry[0] >= since and (not stream or entry[1] == stream)
+                )
+                if len(collected) >= limit:
+                    return collected[:limit]
+        return collected
+
+    # Retention
+
+    async def enforce_retention(self):
+        """Compress leftover closed segments and delete those past LOG_RETENTION_DAYS"""
+        try:
+            future = self._submit(self._enforce_retention)
+        except queue.Full:
+            return 0  # the writer is behind, retention waits for the next round
+        return await asyncio.wrap_future(future)
+
+    def _enforce_retention(self):
+        cutoff = time.time() - self.retention_days * 86400
+        deleted = 0
+        for bot_id in os.listdir(self.root):
+            active = self.active.get(bot_id)
+            for segment in self._segments(bot_id):
+                if active and active['start'] == segment['start']:
+                    continue
+                try:
+                    mtime = os.path.getmtime(segment['path'])
+                except FileNotFoundError:
+                    continue
+                if mtime < cutoff:
+                    size = self._size(segment['path'])
+                    self.disk_bytes -= size + self._size(segment['index_path'])
+                    for path in (segment['path'], segment['index_path']):
+                        try:
+                            os.remove(path)
+                        except FileNotFoundError:
+                            pass
+                    deleted += 1
+                    self.segments -= 1
+                    self.stats['deleted_segments'] += 1
+                    self.stats['deleted_bytes'] += size
+                elif not segment['compressed'] and self._expired(segment['start'], 0):
+                    self._compress(segment['path'], segment['index_path'])
+
+            directory = self._dir(bot_id)
+            if not active and not os.listdir(directory):
+                shutil.rmtree(directory, ignore_errors=True)
+        return deleted
+
+    def get_stats(self):
+        return {
+            **self.stats,
+            'open_segments': len(self.active),
+            'queued': self.queue.qsize(),
+            'segments': self.segments,
+            'size_mb': round(self.disk_bytes / (1024 * 1024), 2),
+        }
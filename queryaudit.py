@@ -0,0 +1,188 @@
+"""
+Query plan audit for the Database layer
+Developer: @Zeroboy216
+Channel: @zerodevbro
+
+Seeds a scratch database on MONGO_URL (point it at a local mongod), builds the
+indexes with Database.create_indexes, then calls each read method of Database
+while recording the commands it sends. Every recorded query is explained and
+the audit fails if one scans a collection (COLLSCAN) and examines more
+documents than --max-scanned. Methods that read whole collections by design
+are listed in FULL_SCANS and only reported.
+
+Usage:
+    python3 queryaudit.py --bots 2000 --users 200 --logs 20 --max-scanned 100
+"""
+
+import argparse
+import asyncio
+import copy
+import sys
+import time
+from datetime import datetime, timedelta
+
+from pymongo import monitoring
+
+from config import DATABASE_NAME
+from database import Database
+
+# Commands that read documents; writes go through the same indexes via their filters
+AUDITED_COMMANDS = ("find", "aggregate", "count", "distinct")
+
+# Methods that list or summarise every document of a collection on purpose
+FULL_SCANS = {
+    "get_all_users": "broadcast to every user",
+    "get_all_bots": "lists every bot",
+    "get_bots_by_type": "groups every bot",
+    "stats_reconcile": "periodic recount of users and bots",
+}
+
+# Command fields that belong to the session, not to the query
+SESSION_FIELDS = ("lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "readConcern")
+
+
+class CommandRecorder(monitoring.CommandListener):
+    """Keeps the audited commands sent to one database"""
+
+    def __init__(self, database: str):
+        self.database = database
+        self.commands = []
+
+    def started(self, event):
+        if event.database_name == self.database and event.command_name in AUDITED_COMMANDS:
+            command = copy.deepcopy(dict(event.command))
+            for field in SESSION_FIELDS:
+                command.pop(field, None)
+            self.commands.append(command)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def _plan_summary(explain):
+    """(stages used, max documents examined) anywhere in an explain result"""
+    stages, examined = set(), 0
+    pending = [explain]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, dict):
+            if isinstance(node.get("stage"), str):
+                stages.add(node["stage"])
+            for key in ("totalDocsExamined", "docsExamined"):
+                if isinstance(node.get(key), int):
+                    examined = max(examined, node[key])
+            pending.extend(node.values())
+        elif isinstance(node, list):
+            pending.extend(node)
+    return stages, examined
+
+
+async def _seed(db: Database, users: int, bots: int, logs: int):
+    """Fill the scratch database through the Database write methods"""
+    for user_id in range(users):
+        await db.add_user(user_id, f"user {user_id}")
+    bot_ids = []
+    for i in range(bots):
+        file_type = ("py", "js", "sh", "go")[i % 4]
+        bot_id = await db.add_bot(
+            i % users, f"{i}:audit", f"print({i})\n", {"username": f"audit_{i}_bot", "id": i},
+            {"file_name": f"bot.{file_type}", "file_type": file_type, "file_size": 12}
+        )
+        bot_ids.append(bot_id)
+        if i % 3 == 0:
+            await db.update_bot_status(bot_id, "running")
+        if i % 10 == 0:
+            await db.update_bot_script(bot_id, f"print({i}, 'v2')\n")
+    now = datetime.now()
+    await db.logs.insert_many([
+        {"bot_id": bot_id, "log_type": "stdout", "message": f"line {n}", "timestamp": now - timedelta(seconds=n)}
+        for bot_id in bot_ids for n in range(logs)
+    ])
+    return bot_ids
+
+
+def _queries(db: Database, bot_id: str, user_id: int):
+    """(name, coroutine factory) for every read path of Database"""
+    return [
+        ("get_bot", lambda: db.get_bot(bot_id)),
+        ("get_bot_script", lambda: db.get_bot(bot_id, with_script=True)),
+        ("get_user_bots", lambda: db.get_user_bots(user_id)),
+        ("get_all_bots", db.get_all_bots),
+        ("get_running_bots", db.get_running_bots),
+        ("get_quarantined_bots", db.get_quarantined_bots),
+        ("get_user_bot_count", lambda: db.get_user_bot_count(user_id)),
+        ("get_running_bot_count", db.get_running_bot_count),
+        ("get_bot_count", db.get_bot_count),
+        ("get_bots_by_type", db.get_bots_by_type),
+        ("get_user_count", db.get_user_count),
+        ("get_active_users", db.get_active_users),
+        ("get_all_users", db.get_all_users),
+        ("get_user_state", lambda: db.get_user_state(user_id)),
+        ("get_bot_logs", lambda: db.get_bot_logs(bot_id)),
+        ("get_script_versions", lambda: db.get_script_versions(bot_id)),
+        ("get_script_storage", lambda: db.get_script_storage(bot_id)),
+        ("release_script", lambda: db._release_script("0" * 64)),
+        ("export_user_data", lambda: db.export_user_data(user_id)),
+        ("get_validation_result", lambda: db.get_validation_result("py:audit")),
+        ("get_bots_restarted_since", lambda: db.get_bots_restarted_since(datetime.now() - timedelta(hours=1))),
+        ("get_bots_updated_since", lambda: db.get_bots_updated_since(datetime.now() - timedelta(hours=1))),
+        ("stats_reconcile", db.stats_service.reconcile),
+    ]
+
+
+async def audit(users: int, bots: int, logs: int, max_scanned: int):
+    name = f"{DATABASE_NAME}_audit"
+    recorder = CommandRecorder(name)
+    monitoring.register(recorder)
+    db = Database(name=name)
+    await db.client.drop_database(name)
+    failures = 0
+    try:
+        started = time.perf_counter()
+        bot_ids = await _seed(db, users, bots, logs)
+        await db.create_indexes()
+        print(f"Seeded {users} users, {bots} bots, {bots * logs} logs in {time.perf_counter() - started:.1f}s\n")
+
+        print(f"{'method':<24}{'collection':<18}{'plan':<34}{'examined':>10}  result")
+        for method, query in _queries(db, bot_ids[-1], (bots - 1) % users):
+            recorder.commands.clear()
+            db.bot_cache.invalidate()
+            await query()
+            for command in list(recorder.commands):
+                explain = await db.db.command({"explain": command, "verbosity": "executionStats"})
+                stages, examined = _plan_summary(explain)
+                collection = next(iter(command.values()))
+                plan = "+".join(sorted(stage for stage in stages if stage.endswith("SCAN"))) or "+".join(sorted(stages))
+                if "COLLSCAN" not in stages or examined <= max_scanned:
+                    result = "ok"
+                elif method in FULL_SCANS:
+                    result = f"expected ({FULL_SCANS[method]})"
+                else:
+                    result = "FAIL"
+                    failures += 1
+                print(f"{method:<24}{collection:<18}{plan[:33]:<34}{examined:>10}  {result}")
+    finally:
+        await db.flush_states()
+        await db.client.drop_database(name)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Explain every Database query and fail on collection scans")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--bots", type=int, default=2000)
+    parser.add_argument("--logs", type=int, default=20, help="Log entries per bot")
+    parser.add_argument("--max-scanned", type=int, default=100,
+                        help="Documents a COLLSCAN may examine before the audit fails")
+    args = parser.parse_args()
+
+    failures = asyncio.run(audit(args.users, args.bots, args.logs, args.max_scanned))
+    print(f"\n{'❌' if failures else '✅'} {failures} queries scan more than {args.max_scanned} documents")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
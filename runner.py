@@ -7,29 +7,300 @@ Version: 2.0 - Now supports Python, JavaScript, Shell, Ruby, PHP, Go
 
 import asyncio
 import os
+import random
 import sys
-import tempfile
 import logging
 import subprocess
 import time
+from collections import deque
 from datetime import datetime
+from functools import partial
 from pyrogram import Client, filters
+from pyrogram.handlers import DisconnectHandler
 from pyrogram.types import Message
-from config import BLOCKED_IMPORTS, BOT_FOOTER, AUTO_RESTART, API_ID, API_HASH
+from config import (
+    BLOCKED_IMPORTS, BOT_FOOTER, AUTO_RESTART, API_ID, API_HASH,
+    AUTO_RESTART_DELAY, MAX_AUTO_RESTARTS, RESTART_WINDOW, MAX_RESTART_BACKOFF,
+    DISCONNECT_GRACE_PERIOD, WARM_BOOT_CONCURRENCY, WARM_BOOT_JITTER,
+    WORKER_POOL_ENABLED, WORKER_POOL_SIZE, CLEANUP_INTERVAL, BOT_OUTPUT_LOGGING
+)
+from analyzer import ScriptAnalyzer
+from buildcache import GoBuildCache, GoBuildError
+from codecache import CodeCache
+from database import as_datetime
+from logbuffer import OutputCollector
+from logstore import LogSegmentStore
+from scanner import get_scanner, first_hit, describe_hit
+from sessions import SessionStore
+from validator import ScriptValidator, ValidationBusy, ValidationCache, mark_uncacheable
+from verifier import TokenVerifier
+from workers import WorkerPool
+from workspace import ScriptWorkspace
 
 logger = logging.getLogger(__name__)
 
+session_store = SessionStore()
+code_cache = CodeCache()
+script_analyzer = ScriptAnalyzer(BLOCKED_IMPORTS, code_cache=code_cache)
+
+
+async def launch_python_bot(bot_id: str, token: str, script: str):
+    """Start a Pyrogram client and run the user script on it.
+
+    Shared by the in-process runner and the worker processes. Returns the
+    started client; raises if the client can't connect or the script fails.
+    """
+    # Start the bot client, reusing its cached session if there is one
+    bot_client = await session_store.start_client(token)
+    logger.info(f"✅ Python bot client {bot_id} connected")
+    
+    # Import required modules for the script
+    from pyrogram.types import (
+        InlineKeyboardMarkup, InlineKeyboardButton,
+        ReplyKeyboardMarkup, KeyboardButton
+    )
+    
+    # Create a safe namespace for script execution
+    namespace = {
+        'bot': bot_client,
+        'app': bot_client,  # Support both @bot and @app decorators
+        'Client': Client,
+        'filters': filters,
+        'InlineKeyboardMarkup': InlineKeyboardMarkup,
+        'InlineKeyboardButton': InlineKeyboardButton,
+        'ReplyKeyboardMarkup': ReplyKeyboardMarkup,
+        'KeyboardButton': KeyboardButton,
+        'Message': Message,
+        'asyncio': asyncio,
+        'logger': logger,
+        'BOT_FOOTER': BOT_FOOTER,
+        '__builtins__': __builtins__,
+    }
+    
+    # Execute the user script (compiled during validation or loaded from the code cache)
+    try:
+        exec(code_cache.load(script, bot_id), namespace)
+        logger.info(f"✅ Python script executed for bot {bot_id}")
+    except Exception as e:
+        logger.error(f"❌ Script execution error for bot {bot_id}: {e}")
+        await bot_client.stop()
+        raise
+    
+    return bot_client
+
+
+class BotSupervisor:
+    """Central, event-driven watcher for hosted bots.
+
+    Python clients are watched through Pyrogram's disconnect callback and
+    subprocesses through their exit future, so an idle bot costs no timer
+    wakeups at all. When a bot is considered dead, ``on_crash(bot_id, reason)``
+    is scheduled on the event loop.
+    """
+
+    def __init__(self, on_crash, disconnect_grace: float = DISCONNECT_GRACE_PERIOD):
+        self.on_crash = on_crash
+        self.disconnect_grace = disconnect_grace
+        self.watched = {}         # bot_id -> watch entry
+        self.pending = set()      # crash handler tasks in flight
+        self.crash_count = 0
+        self.disconnect_count = 0
+
+    def watch_client(self, bot_id: str, client: Client):
+        """Watch a Pyrogram client for lost connections"""
+        self.unwatch(bot_id)
+
+        # Keep any disconnect handler registered by the user script working
+        previous = client.disconnect_handler
+        client.add_handler(DisconnectHandler(partial(self._on_disconnect, bot_id, previous)))
+
+        self.watched[bot_id] = {
+            'kind': 'client',
+            'target': client,
+            'previous': previous,
+            'timer': None,
+        }
+
+    def watch_process(self, bot_id: str, process):
+        """Watch a subprocess for exit"""
+        self.unwatch(bot_id)
+
+        waiter = asyncio.ensure_future(process.wait())
+        waiter.add_done_callback(partial(self._on_process_exit, bot_id, process))
+
+        self.watched[bot_id] = {
+            'kind': 'process',
+            'target': process,
+            'waiter': waiter,
+        }
+
+    def unwatch(self, bot_id: str):
+        """Stop watching a bot (call before stopping it deliberately)"""
+        entry = self.watched.pop(bot_id, None)
+        if not entry:
+            return
+
+        if entry['kind'] == 'client':
+            if entry['timer']:
+                entry['timer'].cancel()
+            entry['target'].disconnect_handler = entry['previous']
+        else:
+            entry['waiter'].cancel()
+
+    def is_watched(self, bot_id: str):
+        """Check if a bot is currently supervised"""
+        return bot_id in self.watched
+
+    async def _on_disconnect(self, bot_id: str, previous, client: Client):
+        """Pyrogram disconnect callback: give the session a grace period to reconnect"""
+        if previous:
+            try:
+                await previous(client)
+            except Exception as e:
+                logger.error(f"Disconnect handler of bot {bot_id} failed: {e}")
+
+        entry = self.watched.get(bot_id)
+        if not entry or entry['target'] is not client or entry['timer']:
+            return
+
+        self.disconnect_count += 1
+        logger.warning(f"⚠️ Bot {bot_id} lost connection, checking again in {self.disconnect_grace}s")
+        entry['timer'] = asyncio.get_running_loop().call_later(
+            self.disconnect_grace, self._check_client, bot_id, client
+        )
+
+    def _check_client(self, bot_id: str, client: Client):
+        """Decide whether a disconnected client recovered on its own"""
+        entry = self.watched.get(bot_id)
+        if not entry or entry['target'] is not client:
+            return
+        entry['timer'] = None
+
+        session = getattr(client, 'session', None)
+        if client.is_connected and session and session.is_started.is_set():
+            logger.info(f"✅ Bot {bot_id} reconnected")
+            return
+
+        self._crashed(bot_id, "client connection lost")
+
+    def _on_process_exit(self, bot_id: str, process, waiter):
+        """Exit callback for subprocess bots"""
+        if waiter.cancelled():
+            return
+
+        entry = self.watched.get(bot_id)
+        if not entry or entry['target'] is not process:
+            return
+
+        self._crashed(bot_id, f"process exited with code {process.returncode}")
+
+    def _crashed(self, bot_id: str, reason: str):
+        """Hand a dead bot over to the crash handler"""
+        self.unwatch(bot_id)
+        self.crash_count += 1
+        logger.warning(f"⚠️ Bot {bot_id} crashed: {reason}")
+
+        task = asyncio.ensure_future(self.on_crash(bot_id, reason))
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+    def get_stats(self):
+        """Get supervisor counters"""
+        return {
+            'watched': len(self.watched),
+            'crashes': self.crash_count,
+            'disconnects': self.disconnect_count,
+            'pending_restarts': len(self.pending),
+        }
+
+
+class RestartPolicy:
+    """Crash-loop guard for auto-restarts.
+
+    Keeps a sliding window of restart timestamps per bot. Each restart inside
+    the window doubles the delay (with jitter, capped at ``max_delay``); once
+    ``max_restarts`` restarts happened within ``window`` seconds the bot has to
+    be quarantined instead of restarted.
+    """
+
+    def __init__(self, base_delay: float = AUTO_RESTART_DELAY, max_restarts: int = MAX_AUTO_RESTARTS,
+                 window: float = RESTART_WINDOW, max_delay: float = MAX_RESTART_BACKOFF):
+        self.base_delay = base_delay
+        self.max_restarts = max_restarts
+        self.window = window
+        self.max_delay = max_delay
+        self.history = {}        # bot_id -> deque of restart timestamps
+        self.restart_cost = {}   # bot_id -> seconds spent in auto-restart attempts
+
+    def _recent(self, bot_id: str, now: float):
+        """Drop restarts that fell out of the window and return the rest"""
+        history = self.history.setdefault(bot_id, deque())
+        while history and history[0] <= now - self.window:
+            history.popleft()
+        return history
+
+    def next_delay(self, bot_id: str):
+        """Register a restart and return its delay, or None if the bot is crash-looping"""
+        now = time.time()
+        history = self._recent(bot_id, now)
+
+        if len(history) >= self.max_restarts:
+            return None
+
+        delay = min(self.base_delay * (2 ** len(history)), self.max_delay)
+        history.append(now)
+        return random.uniform(delay / 2, delay)
+
+    def add_cost(self, bot_id: str, seconds: float):
+        """Account time spent restarting a bot"""
+        self.restart_cost[bot_id] = self.restart_cost.get(bot_id, 0.0) + seconds
+
+    def get_bot_stats(self, bot_id: str):
+        """Get restart counters for a bot"""
+        return {
+            'restarts_in_window': len(self._recent(bot_id, time.time())),
+            'restart_seconds': round(self.restart_cost.get(bot_id, 0.0), 2),
+        }
+
+    def reset(self, bot_id: str):
+        """Forget restart history (manual start, release or delete)"""
+        self.history.pop(bot_id, None)
+        self.restart_cost.pop(bot_id, None)
+
+
 class BotRunner:
     def __init__(self, db):
         self.db = db
         self.running_bots = {}  # bot_id -> process info
         self.bot_clients = {}   # bot_id -> Client (for Python bots)
-        self.bot_tasks = {}     # bot_id -> asyncio.Task
         self.bot_processes = {} # bot_id -> subprocess.Process (for non-Python bots)
         self.bot_start_times = {} # bot_id -> start timestamp
+        self.supervisor = BotSupervisor(self._handle_crash)
+        self.session_store = session_store
+        self.token_verifier = TokenVerifier(fallback=self._verify_token_mtproto)
+        self.go_build_cache = GoBuildCache()
+        self.code_cache = code_cache
+        self.workspace = ScriptWorkspace()
+        self.log_store = LogSegmentStore()
+        self.output = OutputCollector(sink=self._log_output)
+        self.validator = ScriptValidator()
+        self.validation_cache = ValidationCache(db)
+        self.restart_policy = RestartPolicy()
+        self.pending_restarts = {} # bot_id -> bot info of crashed bots awaiting restart
+        self.warm_boot_stats = {}  # metrics of the last restart_all_bots run
+        self.rollbacks = {}        # bot_id -> metrics of the last script rollback
+        self.worker_pool = WorkerPool(WORKER_POOL_SIZE, self._handle_crash) if WORKER_POOL_ENABLED else None
         
     async def verify_token(self, token: str):
         """Verify if bot token is valid"""
+        try:
+            return await self.token_verifier.verify(token)
+        except Exception as e:
+            logger.error(f"❌ Token verification failed: {e}")
+            return False, None
+    
+    async def _verify_token_mtproto(self, token: str):
+        """Verify a token with a full MTProto login (fallback when the Bot API is unreachable)"""
         try:
             # Create temporary client
             temp_client = Client(
@@ -57,27 +328,29 @@ class BotRunner:
     
     async def validate_script(self, script: str, file_type: str = "py"):
         """Validate script for security issues based on file type"""
+        started = time.perf_counter()
+        try:
+            return await self.validation_cache.get_or_validate(script, file_type, self._validate_script)
+        finally:
+            self.validator.observe(file_type, time.perf_counter() - started)
+    
+    async def _validate_script(self, script: str, file_type: str):
         try:
-            # Common security checks for all file types
-            dangerous_patterns = [
-                'rm -rf /', 'format c:', 'del /f /s /q',  # Destructive commands
-                '__import__("os").system', 'eval(', 'exec(',  # Dangerous functions
-                'subprocess.call', 'os.system',  # System access
-            ]
-            
-            # Check for dangerous patterns
-            script_lower = script.lower()
-            for pattern in dangerous_patterns:
-                if pattern.lower() in script_lower:
-                    return False, f"Security violation: Dangerous pattern detected: {pattern}"
+            # One pass over the script collects hits for every rule list of this file type
+            hits = await get_scanner(file_type).scan_async(script)
+            
+            # Check for dangerous patterns (common to all file types)
+            hit = first_hit(hits, "dangerous")
+            if hit:
+                return False, f"Security violation: Dangerous pattern detected: {hit.pattern} {describe_hit(hit)}"
             
             # File type specific validation
             if file_type == "py":
-                return await self._validate_python(script)
+                return await self._validate_python(script, hits)
             elif file_type == "js":
-                return await self._validate_javascript(script)
+                return await self._validate_javascript(script, hits)
             elif file_type == "sh":
-                return await self._validate_shell(script)
+                return await self._validate_shell(script, hits)
             elif file_type == "rb":
                 return await self._validate_ruby(script)
             elif file_type == "php":
@@ -89,76 +362,63 @@ class BotRunner:
                 
         except Exception as e:
             logger.error(f"Validation error: {e}")
+            mark_uncacheable()
             return False, f"Validation error: {str(e)}"
     
-    async def _validate_python(self, script: str):
+    async def _validate_python(self, script: str, hits):
         """Validate Python script"""
-        # Check for blocked imports
-        for blocked in BLOCKED_IMPORTS:
-            if blocked in script:
-                return False, f"Blocked import/function: {blocked}"
+        # Parse once (off the event loop): syntax, imports, blocked calls and handlers
+        try:
+            analysis = await self.validator.analyze_python(script, script_analyzer)
+        except asyncio.TimeoutError:
+            return False, "Python syntax check timed out, the script is too large"
         
-        # Check if script has message handlers (recommended but not required)
-        has_handlers = any(pattern in script for pattern in [
-            "@bot.on_message", "@app.on_message",
-            "filters.command", "on_message"
-        ])
+        if analysis['syntax_error']:
+            return False, f"Python syntax error: {analysis['syntax_error']}"
+        
+        # Check for blocked imports and functions (aliases included)
+        if analysis['blocked']:
+            blocked = analysis['blocked'][0]
+            return False, f"Blocked import/function: {blocked['name']} (line {blocked['line']}, column {blocked['column']})"
         
-        if not has_handlers:
+        # Check if script has message handlers (recommended but not required)
+        if not analysis['handlers']:
             logger.warning("Script has no obvious message handlers")
         
-        # Try to compile the script
-        try:
-            compile(script, "<string>", "exec")
-            return True, None
-        except SyntaxError as e:
-            return False, f"Python syntax error: {str(e)}"
+        return True, None
     
-    async def _validate_javascript(self, script: str):
+    async def _validate_javascript(self, script: str, hits):
         """Validate JavaScript/Node.js script"""
         # Check for required bot library
-        required_patterns = ['require(', 'import ', 'bot.on', '.sendMessage']
-        
-        has_bot_code = any(pattern in script for pattern in required_patterns)
-        if not has_bot_code:
+        if not first_hit(hits, "js_required"):
             return False, "JavaScript script must include bot library (telegraf, node-telegram-bot-api, etc.)"
         
         # Basic syntax check (if node is available)
         try:
-            result = subprocess.run(
-                ['node', '--check', '-'],
-                input=script.encode(),
-                capture_output=True,
-                timeout=5
-            )
-            if result.returncode != 0:
-                error_msg = result.stderr.decode()
+            error_msg = await self.validator.check_syntax('js', script)
+            if error_msg:
                 return False, f"JavaScript syntax error: {error_msg[:200]}"
         except FileNotFoundError:
             logger.warning("Node.js not found, skipping syntax check")
+        except asyncio.TimeoutError:
+            logger.warning("Node.js syntax check timed out, skipping")
+        except ValidationBusy:
+            raise
         except Exception as e:
             logger.warning(f"JS validation warning: {e}")
         
         return True, None
     
-    async def _validate_shell(self, script: str):
+    async def _validate_shell(self, script: str, hits):
         """Validate Shell script"""
         # Check for shebang
         if not script.strip().startswith('#!'):
             logger.info("Adding default shebang to shell script")
         
         # Check for extremely dangerous commands
-        extremely_dangerous = [
-            'rm -rf /',
-            'mkfs.',
-            'dd if=/dev/zero',
-            '> /dev/sda',
-            'chmod 777 /',
-        ]
-        
-        for cmd in extremely_dangerous:
-            if cmd in script:
-                return False, f"Extremely dangerous command blocked: {cmd}"
+        hit = first_hit(hits, "shell")
+        if hit:
+            return False, f"Extremely dangerous command blocked: {hit.pattern} {describe_hit(hit)}"
         
         return True, None
     
@@ -173,17 +433,15 @@ class BotRunner:
         
         # Basic syntax check (if ruby is available)
         try:
-            result = subprocess.run(
-                ['ruby', '-c', '-'],
-                input=script.encode(),
-                capture_output=True,
-                timeout=5
-            )
-            if result.returncode != 0:
-                error_msg = result.stderr.decode()
+            error_msg = await self.validator.check_syntax('rb', script)
+            if error_msg:
                 return False, f"Ruby syntax error: {error_msg[:200]}"
         except FileNotFoundError:
             logger.warning("Ruby not found, skipping syntax check")
+        except asyncio.TimeoutError:
+            logger.warning("Ruby syntax check timed out, skipping")
+        except ValidationBusy:
+            raise
         except Exception as e:
             logger.warning(f"Ruby validation warning: {e}")
         
@@ -197,17 +455,15 @@ class BotRunner:
         
         # Basic syntax check (if php is available)
         try:
-            result = subprocess.run(
-                ['php', '-l', '-'],
-                input=script.encode(),
-                capture_output=True,
-                timeout=5
-            )
-            if result.returncode != 0:
-                error_msg = result.stderr.decode()
+            error_msg = await self.validator.check_syntax('php', script)
+            if error_msg:
                 return False, f"PHP syntax error: {error_msg[:200]}"
         except FileNotFoundError:
             logger.warning("PHP not found, skipping syntax check")
+        except asyncio.TimeoutError:
+            logger.warning("PHP syntax check timed out, skipping")
+        except ValidationBusy:
+            raise
         except Exception as e:
             logger.warning(f"PHP validation warning: {e}")
         
@@ -262,68 +518,33 @@ class BotRunner:
             return False
     
     async def _start_python_bot(self, bot_id: str, token: str, script: str):
-        """Start a Python bot using Pyrogram"""
+        """Start a Python bot using Pyrogram (in-process or in a worker)"""
         try:
-            # Create bot client
-            session_name = f"bot_{bot_id}"
-            bot_client = Client(
-                session_name,
-                api_id=API_ID,
-                api_hash=API_HASH,
-                bot_token=token,
-                in_memory=True
-            )
-            
-            # Start the bot client
-            await bot_client.start()
-            logger.info(f"✅ Python bot client {bot_id} connected")
-            
-            # Import required modules for the script
-            from pyrogram import filters
-            from pyrogram.types import (
-                InlineKeyboardMarkup, InlineKeyboardButton,
-                ReplyKeyboardMarkup, KeyboardButton
-            )
-            
-            # Create a safe namespace for script execution
-            namespace = {
-                'bot': bot_client,
-                'app': bot_client,  # Support both @bot and @app decorators
-                'Client': Client,
-                'filters': filters,
-                'InlineKeyboardMarkup': InlineKeyboardMarkup,
-                'InlineKeyboardButton': InlineKeyboardButton,
-                'ReplyKeyboardMarkup': ReplyKeyboardMarkup,
-                'KeyboardButton': KeyboardButton,
-                'Message': Message,
-                'asyncio': asyncio,
-                'logger': logger,
-                'BOT_FOOTER': BOT_FOOTER,
-                '__builtins__': __builtins__,
-            }
-            
-            # Execute the user script
-            try:
-                exec(script, namespace)
-                logger.info(f"✅ Python script executed for bot {bot_id}")
-            except Exception as e:
-                logger.error(f"❌ Script execution error for bot {bot_id}: {e}")
-                await bot_client.stop()
-                return False
+            launch_start = time.perf_counter()
+            if self.worker_pool:
+                bot_client = await self.worker_pool.start_bot(bot_id, token, script)
+                code_stats = bot_client.code_stats
+            else:
+                bot_client = await launch_python_bot(bot_id, token, script)
+                code_stats = code_cache.get_bot_stats(bot_id)
+            start_latency = time.perf_counter() - launch_start
             
             # Store the client
             self.bot_clients[bot_id] = bot_client
             self.running_bots[bot_id] = {
                 'type': 'python',
                 'client': bot_client,
+                'token': token,
+                'script': script,
+                'file_type': 'py',
+                'start_latency': round(start_latency, 3),
+                'code_cache': code_stats,
                 'start_time': time.time()
             }
             
-            # Create a task to keep bot running
-            task = asyncio.create_task(
-                self._keep_bot_alive(bot_id, bot_client, token, script, 'py')
-            )
-            self.bot_tasks[bot_id] = task
+            # Hand the client to the supervisor (workers supervise their own clients)
+            if not self.worker_pool:
+                self.supervisor.watch_client(bot_id, bot_client)
             
             logger.info(f"✅ Python bot {bot_id} started successfully")
             return True
@@ -335,43 +556,39 @@ class BotRunner:
     async def _start_javascript_bot(self, bot_id: str, token: str, script: str):
         """Start a JavaScript/Node.js bot"""
         try:
-            # Create temporary file for the script
-            temp_dir = tempfile.mkdtemp()
-            script_path = os.path.join(temp_dir, f"bot_{bot_id}.js")
-            
-            # Add token as environment variable in script
+            # The token comes from the environment so the file holds no secret
             full_script = f"""
-// Bot Token (injected)
-const BOT_TOKEN = '{token}';
+// Bot Token (from the environment)
+const BOT_TOKEN = process.env.BOT_TOKEN;
 
 {script}
 """
             
-            with open(script_path, 'w', encoding='utf-8') as f:
-                f.write(full_script)
+            script_path = self.workspace.write_script(full_script, 'js', secret=token)
             
             # Start Node.js process
-            process = await asyncio.create_subprocess_exec(
-                'node', script_path,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                env={**os.environ, 'BOT_TOKEN': token}
-            )
+            with self.output.capture(bot_id) as (stdout, stderr):
+                process = await asyncio.create_subprocess_exec(
+                    'node', script_path,
+                    stdout=stdout,
+                    stderr=stderr,
+                    env={**os.environ, 'BOT_TOKEN': token}
+                )
             
             self.bot_processes[bot_id] = process
             self.running_bots[bot_id] = {
                 'type': 'javascript',
                 'process': process,
+                'token': token,
+                'script': script,
+                'file_type': 'js',
                 'script_path': script_path,
-                'temp_dir': temp_dir,
                 'start_time': time.time()
             }
+            self.workspace.acquire(bot_id, script_path)
             
-            # Monitor process
-            task = asyncio.create_task(
-                self._monitor_process(bot_id, process, token, script, 'js')
-            )
-            self.bot_tasks[bot_id] = task
+            # Hand the process to the supervisor
+            self.supervisor.watch_process(bot_id, process)
             
             logger.info(f"✅ JavaScript bot {bot_id} started")
             return True
@@ -386,41 +603,34 @@ const BOT_TOKEN = '{token}';
     async def _start_shell_bot(self, bot_id: str, token: str, script: str):
         """Start a Shell script bot"""
         try:
-            # Create temporary file
-            temp_dir = tempfile.mkdtemp()
-            script_path = os.path.join(temp_dir, f"bot_{bot_id}.sh")
-            
             # Ensure shebang
             if not script.strip().startswith('#!'):
                 script = '#!/bin/bash\n\n' + script
             
-            with open(script_path, 'w', encoding='utf-8') as f:
-                f.write(script)
-            
-            # Make executable
-            os.chmod(script_path, 0o755)
+            script_path = self.workspace.write_script(script, 'sh', mode=0o700, secret=token)
             
             # Start process
-            process = await asyncio.create_subprocess_exec(
-                'bash', script_path,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                env={**os.environ, 'BOT_TOKEN': token}
-            )
+            with self.output.capture(bot_id) as (stdout, stderr):
+                process = await asyncio.create_subprocess_exec(
+                    'bash', script_path,
+                    stdout=stdout,
+                    stderr=stderr,
+                    env={**os.environ, 'BOT_TOKEN': token}
+                )
             
             self.bot_processes[bot_id] = process
             self.running_bots[bot_id] = {
                 'type': 'shell',
                 'process': process,
+                'token': token,
+                'script': script,
+                'file_type': 'sh',
                 'script_path': script_path,
-                'temp_dir': temp_dir,
                 'start_time': time.time()
             }
+            self.workspace.acquire(bot_id, script_path)
             
-            task = asyncio.create_task(
-                self._monitor_process(bot_id, process, token, script, 'sh')
-            )
-            self.bot_tasks[bot_id] = task
+            self.supervisor.watch_process(bot_id, process)
             
             logger.info(f"✅ Shell bot {bot_id} started")
             return True
@@ -432,32 +642,29 @@ const BOT_TOKEN = '{token}';
     async def _start_ruby_bot(self, bot_id: str, token: str, script: str):
         """Start a Ruby bot"""
         try:
-            temp_dir = tempfile.mkdtemp()
-            script_path = os.path.join(temp_dir, f"bot_{bot_id}.rb")
-            
-            with open(script_path, 'w', encoding='utf-8') as f:
-                f.write(script)
+            script_path = self.workspace.write_script(script, 'rb', secret=token)
             
-            process = await asyncio.create_subprocess_exec(
-                'ruby', script_path,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                env={**os.environ, 'BOT_TOKEN': token}
-            )
+            with self.output.capture(bot_id) as (stdout, stderr):
+                process = await asyncio.create_subprocess_exec(
+                    'ruby', script_path,
+                    stdout=stdout,
+                    stderr=stderr,
+                    env={**os.environ, 'BOT_TOKEN': token}
+                )
             
             self.bot_processes[bot_id] = process
             self.running_bots[bot_id] = {
                 'type': 'ruby',
                 'process': process,
+                'token': token,
+                'script': script,
+                'file_type': 'rb',
                 'script_path': script_path,
-                'temp_dir': temp_dir,
                 'start_time': time.time()
             }
+            self.workspace.acquire(bot_id, script_path)
             
-            task = asyncio.create_task(
-                self._monitor_process(bot_id, process, token, script, 'rb')
-            )
-            self.bot_tasks[bot_id] = task
+            self.supervisor.watch_process(bot_id, process)
             
             logger.info(f"✅ Ruby bot {bot_id} started")
             return True
@@ -472,32 +679,29 @@ const BOT_TOKEN = '{token}';
     async def _start_php_bot(self, bot_id: str, token: str, script: str):
         """Start a PHP bot"""
         try:
-            temp_dir = tempfile.mkdtemp()
-            script_path = os.path.join(temp_dir, f"bot_{bot_id}.php")
-            
-            with open(script_path, 'w', encoding='utf-8') as f:
-                f.write(script)
+            script_path = self.workspace.write_script(script, 'php', secret=token)
             
-            process = await asyncio.create_subprocess_exec(
-                'php', script_path,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                env={**os.environ, 'BOT_TOKEN': token}
-            )
+            with self.output.capture(bot_id) as (stdout, stderr):
+                process = await asyncio.create_subprocess_exec(
+                    'php', script_path,
+                    stdout=stdout,
+                    stderr=stderr,
+                    env={**os.environ, 'BOT_TOKEN': token}
+                )
             
             self.bot_processes[bot_id] = process
             self.running_bots[bot_id] = {
                 'type': 'php',
                 'process': process,
+                'token': token,
+                'script': script,
+                'file_type': 'php',
                 'script_path': script_path,
-                'temp_dir': temp_dir,
                 'start_time': time.time()
             }
+            self.workspace.acquire(bot_id, script_path)
             
-            task = asyncio.create_task(
-                self._monitor_process(bot_id, process, token, script, 'php')
-            )
-            self.bot_tasks[bot_id] = task
+            self.supervisor.watch_process(bot_id, process)
             
             logger.info(f"✅ PHP bot {bot_id} started")
             return True
@@ -512,119 +716,108 @@ const BOT_TOKEN = '{token}';
     async def _start_go_bot(self, bot_id: str, token: str, script: str):
         """Start a Go bot"""
         try:
-            temp_dir = tempfile.mkdtemp()
-            script_path = os.path.join(temp_dir, f"bot_{bot_id}.go")
-            binary_path = os.path.join(temp_dir, f"bot_{bot_id}")
-            
-            with open(script_path, 'w', encoding='utf-8') as f:
-                f.write(script)
-            
-            # Compile Go program
-            compile_result = await asyncio.create_subprocess_exec(
-                'go', 'build', '-o', binary_path, script_path,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            await compile_result.wait()
-            
-            if compile_result.returncode != 0:
-                stderr = await compile_result.stderr.read()
-                logger.error(f"Go compilation failed: {stderr.decode()}")
-                return False
+            # Compiled binaries are cached by content hash, restarts skip go build
+            binary_path = await self.go_build_cache.get_binary(script)
             
             # Run compiled binary
-            process = await asyncio.create_subprocess_exec(
-                binary_path,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                env={**os.environ, 'BOT_TOKEN': token}
-            )
+            with self.output.capture(bot_id) as (stdout, stderr):
+                process = await asyncio.create_subprocess_exec(
+                    binary_path,
+                    stdout=stdout,
+                    stderr=stderr,
+                    env={**os.environ, 'BOT_TOKEN': token}
+                )
             
             self.bot_processes[bot_id] = process
             self.running_bots[bot_id] = {
                 'type': 'go',
                 'process': process,
-                'script_path': script_path,
+                'token': token,
+                'script': script,
+                'file_type': 'go',
                 'binary_path': binary_path,
-                'temp_dir': temp_dir,
                 'start_time': time.time()
             }
             
-            task = asyncio.create_task(
-                self._monitor_process(bot_id, process, token, script, 'go')
-            )
-            self.bot_tasks[bot_id] = task
+            self.supervisor.watch_process(bot_id, process)
             
             logger.info(f"✅ Go bot {bot_id} started")
             return True
             
+        except GoBuildError as e:
+            logger.error(f"Go compilation failed: {e}")
+            return False
         except FileNotFoundError:
             logger.error("Go not installed on server")
             return False
         except Exception as e:
             logger.error(f"❌ Failed to start Go bot {bot_id}: {e}")
             return False
-    
-    async def _keep_bot_alive(self, bot_id: str, bot_client: Client, token: str, script: str, file_type: str):
-        """Keep Python bot alive and handle auto-restart"""
+
+    async def _handle_crash(self, bot_id: str, reason: str):
+        """Auto-restart a bot reported dead by the supervisor, with backoff"""
+        bot_info = self.running_bots.get(bot_id)
+        if not bot_info:
+            return
+        
         try:
-            # Keep the bot running indefinitely
-            while bot_id in self.bot_clients:
-                await asyncio.sleep(1)
-                
-        except asyncio.CancelledError:
-            logger.info(f"⏹️ Bot {bot_id} task cancelled")
+            await self.db.add_log(bot_id, 'error', f"Bot crashed: {reason}")
+        except:
+            pass
+        
+        if not AUTO_RESTART:
+            await self.stop_bot(bot_id)
+            return
+        
+        while True:
+            delay = self.restart_policy.next_delay(bot_id)
+            if delay is None:
+                await self.stop_bot(bot_id)
+                await self._quarantine_bot(bot_id, reason)
+                return
             
-        except Exception as e:
-            logger.error(f"❌ Error in bot {bot_id}: {e}")
+            logger.info(f"🔄 Auto-restarting bot {bot_id} in {delay:.1f}s")
+            try:
+                await self.db.increment_restart_count(bot_id)
+            except:
+                pass
             
-            # Auto-restart if enabled
-            if AUTO_RESTART and bot_id in self.bot_clients:
-                logger.info(f"🔄 Auto-restarting bot {bot_id}")
-                try:
-                    await self.db.increment_restart_count(bot_id)
-                except:
-                    pass
-                await asyncio.sleep(5)
-                await self.start_bot(bot_id, token, script, file_type)
-    
-    async def _monitor_process(self, bot_id: str, process, token: str, script: str, file_type: str):
-        """Monitor subprocess-based bots"""
-        try:
-            # Wait for process to complete
-            returncode = await process.wait()
+            self.pending_restarts[bot_id] = bot_info
+            await asyncio.sleep(delay)
             
-            logger.warning(f"⚠️ Bot {bot_id} process exited with code {returncode}")
+            # Bot was stopped or started by its owner in the meantime
+            if self.pending_restarts.get(bot_id) is not bot_info:
+                return
             
-            # Auto-restart if enabled and bot still registered
-            if AUTO_RESTART and bot_id in self.bot_processes:
-                logger.info(f"🔄 Auto-restarting bot {bot_id}")
-                try:
-                    await self.db.increment_restart_count(bot_id)
-                except:
-                    pass
-                await asyncio.sleep(5)
-                await self.start_bot(bot_id, token, script, file_type)
-                
-        except asyncio.CancelledError:
-            logger.info(f"⏹️ Bot {bot_id} monitor cancelled")
+            attempt_start = time.time()
+            success = await self.start_bot(bot_id, bot_info['token'], bot_info['script'], bot_info['file_type'])
+            self.restart_policy.add_cost(bot_id, time.time() - attempt_start)
+            
+            if success:
+                return
+            reason = "restart failed"
+    
+    async def _quarantine_bot(self, bot_id: str, reason: str):
+        """Stop auto-restarting a crash-looping bot"""
+        stats = self.restart_policy.get_bot_stats(bot_id)
+        logger.warning(
+            f"🚫 Bot {bot_id} quarantined: {stats['restarts_in_window']} restarts "
+            f"in {self.restart_policy.window}s ({reason})"
+        )
+        try:
+            await self.db.quarantine_bot(bot_id, reason, stats['restarts_in_window'], stats['restart_seconds'])
+            await self.db.add_log(bot_id, 'error', f"Bot quarantined after repeated crashes: {reason}")
         except Exception as e:
-            logger.error(f"❌ Monitor error for bot {bot_id}: {e}")
+            logger.error(f"Error quarantining bot {bot_id}: {e}")
     
     async def stop_bot(self, bot_id: str):
         """Stop a hosted bot (any language)"""
         try:
             logger.info(f"⏹️ Stopping bot {bot_id}")
             
-            # Cancel the task
-            if bot_id in self.bot_tasks:
-                task = self.bot_tasks[bot_id]
-                task.cancel()
-                try:
-                    await task
-                except asyncio.CancelledError:
-                    pass
-                del self.bot_tasks[bot_id]
+            # Stop supervising before tearing the bot down
+            self.supervisor.unwatch(bot_id)
+            self.pending_restarts.pop(bot_id, None)
             
             # Stop Python client
             if bot_id in self.bot_clients:
@@ -647,17 +840,15 @@ const BOT_TOKEN = '{token}';
                     pass
                 del self.bot_processes[bot_id]
             
-            # Clean up running bots info and temp files
+            # Clean up running bots info
             if bot_id in self.running_bots:
                 bot_info = self.running_bots[bot_id]
-                if 'temp_dir' in bot_info:
-                    try:
-                        import shutil
-                        shutil.rmtree(bot_info['temp_dir'], ignore_errors=True)
-                    except:
-                        pass
                 del self.running_bots[bot_id]
             
+            # The script file stays in the workspace for a quick restart, unless it holds the token
+            self.workspace.release(bot_id)
+            self.db.log_pipeline.forget(bot_id)
+            
             # Remove start time
             if bot_id in self.bot_start_times:
                 del self.bot_start_times[bot_id]
@@ -672,7 +863,7 @@ const BOT_TOKEN = '{token}';
     async def restart_bot(self, bot_id: str):
         """Restart a hosted bot"""
         try:
-            bot = await self.db.get_bot(bot_id)
+            bot = await self.db.get_bot(bot_id, with_script=True)
             if not bot:
                 logger.error(f"Bot {bot_id} not found in database")
                 return False
@@ -700,6 +891,35 @@ const BOT_TOKEN = '{token}';
             logger.error(f"❌ Error restarting bot {bot_id}: {e}")
             return False
     
+    async def rollback_bot(self, bot_id: str, version: int = None):
+        """Switch a bot to an earlier script version and restart it if it is running.
+
+        The switch only moves the bot's version pointer. The restart skips the
+        usual pause: the old script's hash still has its compiled code, Go
+        binary and workspace file cached, so starting it again is cheap.
+        Returns the version document rolled back to, or None.
+        """
+        started = time.perf_counter()
+        target = await self.db.rollback_bot_script(bot_id, version)
+        if not target:
+            return None
+        
+        was_running = self.is_bot_running(bot_id)
+        if was_running:
+            bot = await self.db.get_bot(bot_id)
+            script = await self.db.get_script(target["script_hash"])
+            file_type = bot.get('file_metadata', {}).get('file_type', 'py')
+            if not await self.start_bot(bot_id, bot["token"], script, file_type):
+                logger.error(f"❌ Bot {bot_id} did not start after rolling back to v{target['version']}")
+        
+        self.rollbacks[bot_id] = {
+            'restored_version': target['version'],
+            'restore_latency': round(time.perf_counter() - started, 3),
+            'restore_restarted': was_running,
+        }
+        logger.info(f"⏪ Bot {bot_id} restored to v{target['version']} in {self.rollbacks[bot_id]['restore_latency']}s")
+        return target
+    
     async def stop_all_bots(self):
         """Stop all running bots"""
         logger.info("🛑 Stopping all bots...")
@@ -753,42 +973,81 @@ const BOT_TOKEN = '{token}';
             "uptime": uptime_seconds,
             "uptime_readable": uptime_readable,
             "bot_type": bot_type,
-            "client_status": "connected"
+            "client_status": "connected",
+            "start_latency": self.running_bots.get(bot_id, {}).get('start_latency'),
+            **(script_analyzer.metrics(self.running_bots[bot_id]['script']) if bot_type == 'python' else {}),
+            **self.running_bots.get(bot_id, {}).get('code_cache', {}),
+            **self.rollbacks.get(bot_id, {}),
+            **self.restart_policy.get_bot_stats(bot_id)
         }
     
-    async def restart_all_bots(self):
-        """Restart all bots from database"""
+    @staticmethod
+    def _boot_priority(bot: dict):
+        """Sort key for warm boot: most recently active bots first"""
+        return max(as_datetime(bot.get("last_restart")) or datetime.min,
+                   as_datetime(bot.get("updated_at")) or datetime.min)
+    
+    async def restart_all_bots(self, concurrency: int = WARM_BOOT_CONCURRENCY,
+                               jitter: float = WARM_BOOT_JITTER, progress_callback=None):
+        """Restore all bots marked as running, in parallel with bounded concurrency"""
         try:
-            logger.info("🔄 Restarting all bots from database...")
+            logger.info("🔄 Restoring running bots from database...")
+            boot_start = time.time()
             
-            # Get all bots with running status
-            all_bots = await self.db.get_all_bots()
+            bots = await self.db.get_running_bots()
+            bots.sort(key=self._boot_priority, reverse=True)
             
-            started_count = 0
-            failed_count = 0
+            total = len(bots)
+            progress = {'total': total, 'done': 0, 'started': 0, 'failed': 0}
+            report_every = max(1, total // 10)
+            semaphore = asyncio.Semaphore(max(1, concurrency))
             
-            for bot in all_bots:
-                if bot.get("status") == "running":
-                    bot_id = str(bot["_id"])
-                    file_type = bot.get('file_metadata', {}).get('file_type', 'py')
-                    
+            async def boot(bot):
+                bot_id = str(bot["_id"])
+                file_type = bot.get('file_metadata', {}).get('file_type', 'py')
+                
+                async with semaphore:
+                    # Spread MTProto handshakes so a full restore doesn't arrive as one burst
+                    if jitter > 0:
+                        await asyncio.sleep(random.uniform(0, jitter))
                     try:
-                        success = await self.start_bot(
-                            bot_id, 
-                            bot["token"], 
-                            bot["script"],
-                            file_type
-                        )
-                        if success:
-                            started_count += 1
-                        else:
-                            failed_count += 1
+                        script = await self.db.get_bot_script(bot)
+                        success = await self.start_bot(bot_id, bot["token"], script, file_type)
                     except Exception as e:
                         logger.error(f"Failed to restart bot {bot_id}: {e}")
-                        failed_count += 1
+                        success = False
+                
+                progress['done'] += 1
+                progress['started' if success else 'failed'] += 1
+                
+                if progress['done'] % report_every == 0 or progress['done'] == total:
+                    logger.info(
+                        f"⏳ Warm boot: {progress['done']}/{total} "
+                        f"({progress['started']} started, {progress['failed']} failed)"
+                    )
+                    if progress_callback:
+                        try:
+                            await progress_callback(dict(progress))
+                        except Exception as e:
+                            logger.error(f"Warm boot progress callback failed: {e}")
+            
+            await asyncio.gather(*(boot(bot) for bot in bots))
+            
+            elapsed = time.time() - boot_start
+            self.warm_boot_stats = {
+                'total': total,
+                'started': progress['started'],
+                'failed': progress['failed'],
+                'concurrency': concurrency,
+                'time_to_restore': round(elapsed, 2),
+                'finished_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            }
             
-            logger.info(f"✅ Restarted {started_count} bots, {failed_count} failed")
-            return started_count, failed_count
+            logger.info(
+                f"✅ Restarted {progress['started']} bots, {progress['failed']} failed "
+                f"in {elapsed:.2f}s"
+            )
+            return progress['started'], progress['failed']
             
         except Exception as e:
             logger.error(f"❌ Error restarting all bots: {e}")
@@ -814,49 +1073,41 @@ const BOT_TOKEN = '{token}';
             type_counts[bot_type] = type_counts.get(bot_type, 0) + 1
         return type_counts
     
+    def _log_output(self, bot_id: str, stream: str, data: bytes):
+        """Persist a chunk of subprocess output (empty at end of stream)"""
+        self.log_store.append(bot_id, stream, data)
+        if BOT_OUTPUT_LOGGING and data:
+            self.db.add_log_nowait(bot_id, stream, data.decode('utf-8', errors='replace').rstrip("\n"))
+    
     async def get_bot_logs(self, bot_id: str, lines: int = 50):
         """Get recent logs for a bot (for subprocess bots)"""
-        if bot_id not in self.bot_processes:
-            return "Bot not running or no logs available"
-        
         try:
-            process = self.bot_processes[bot_id]
-            # Get stdout and stderr
-            stdout_data = ""
-            stderr_data = ""
-            
-            if process.stdout:
-                try:
-                    stdout_data = await asyncio.wait_for(
-                        process.stdout.read(4096),
-                        timeout=1.0
-                    )
-                    stdout_data = stdout_data.decode('utf-8', errors='ignore')
-                except asyncio.TimeoutError:
-                    pass
-            
-            if process.stderr:
-                try:
-                    stderr_data = await asyncio.wait_for(
-                        process.stderr.read(4096),
-                        timeout=1.0
-                    )
-                    stderr_data = stderr_data.decode('utf-8', errors='ignore')
-                except asyncio.TimeoutError:
-                    pass
+            if self.output.has_output(bot_id):
+                output = self.output.tail(bot_id, lines)
+            else:
+                # Older output only survives in the log segments on disk
+                entries = self.log_store.tail(bot_id, lines)
+                output = {
+                    stream: "\n".join(text for _, name, text in entries if name == stream)
+                    for stream in ('stdout', 'stderr')
+                }
             
             logs = ""
-            if stdout_data:
-                logs += f"STDOUT:\n{stdout_data}\n"
-            if stderr_data:
-                logs += f"STDERR:\n{stderr_data}\n"
+            if output['stdout']:
+                logs += f"STDOUT:\n{output['stdout']}\n"
+            if output['stderr']:
+                logs += f"STDERR:\n{output['stderr']}\n"
             
-            return logs if logs else "No recent logs"
+            return logs if logs else "Bot not running or no logs available"
             
         except Exception as e:
             logger.error(f"Error getting logs for bot {bot_id}: {e}")
             return f"Error retrieving logs: {str(e)}"
     
+    def get_bot_logs_since(self, bot_id: str, since: float, limit: int = 1000):
+        """(timestamp, stream, text) output lines of a bot since an epoch time"""
+        return self.log_store.since(bot_id, since, limit)
+    
     async def health_check(self):
         """Perform health check on all running bots"""
         results = {
@@ -902,13 +1153,13 @@ const BOT_TOKEN = '{token}';
         return results
     
     async def cleanup_temp_files(self):
-        """Clean up temporary files from stopped bots"""
+        """Clean up unused workspace scripts and temp dirs leaked by crashed runs"""
         try:
             logger.info("🧹 Cleaning up temporary files...")
-            cleaned = 0
-            
-            # This would be called periodically
-            # For now, it's a placeholder for future implementation
+            cleaned = self.workspace.collect()
+            await asyncio.get_running_loop().run_in_executor(None, self.code_cache.evict)
+            cleaned += await self.log_store.enforce_retention()
+            await self.go_build_cache.trim_toolchain_caches()
             
             logger.info(f"✅ Cleaned {cleaned} temporary files")
             return cleaned
@@ -917,6 +1168,12 @@ const BOT_TOKEN = '{token}';
             logger.error(f"Error during cleanup: {e}")
             return 0
     
+    async def run_maintenance(self, interval: int = CLEANUP_INTERVAL):
+        """Garbage-collect the workspace at startup and then every ``interval`` seconds"""
+        while True:
+            await self.cleanup_temp_files()
+            await asyncio.sleep(interval)
+    
     def get_system_stats(self):
         """Get system statistics for the bot runner"""
         try:
@@ -927,13 +1184,45 @@ const BOT_TOKEN = '{token}';
                 'memory_percent': psutil.virtual_memory().percent,
                 'disk_percent': psutil.disk_usage('/').percent,
                 'running_bots': self.get_running_bots_count(),
-                'bots_by_type': self.get_bots_by_type()
+                'bots_by_type': self.get_bots_by_type(),
+                'supervisor': self.supervisor.get_stats(),
+                'sessions': self.session_store.get_stats(),
+                'token_verifier': self.token_verifier.get_stats(),
+                'go_build_cache': self.go_build_cache.get_stats(),
+                'workspace': self.workspace.get_stats(),
+                'output': self.output.get_stats(),
+                'log_store': self.log_store.get_stats(),
+                'log_pipeline': self.db.log_pipeline.get_stats(),
+                'bot_cache': self.db.bot_cache.get_stats(),
+                'state_store': self.db.state_store.get_stats(),
+                'stats_service': self.db.stats_service.get_stats(),
+                'validator': self.validator.get_stats(),
+                'validation_cache': self.validation_cache.get_stats(),
+                'script_analyzer': script_analyzer.get_stats(),
+                'code_cache': self.code_cache.get_stats(),
+                'workers': self.worker_pool.get_load() if self.worker_pool else []
             }
         except ImportError:
             # psutil not installed
             return {
                 'running_bots': self.get_running_bots_count(),
-                'bots_by_type': self.get_bots_by_type()
+                'bots_by_type': self.get_bots_by_type(),
+                'supervisor': self.supervisor.get_stats(),
+                'sessions': self.session_store.get_stats(),
+                'token_verifier': self.token_verifier.get_stats(),
+                'go_build_cache': self.go_build_cache.get_stats(),
+                'workspace': self.workspace.get_stats(),
+                'output': self.output.get_stats(),
+                'log_store': self.log_store.get_stats(),
+                'log_pipeline': self.db.log_pipeline.get_stats(),
+                'bot_cache': self.db.bot_cache.get_stats(),
+                'state_store': self.db.state_store.get_stats(),
+                'stats_service': self.db.stats_service.get_stats(),
+                'validator': self.validator.get_stats(),
+                'validation_cache': self.validation_cache.get_stats(),
+                'script_analyzer': script_analyzer.get_stats(),
+                'code_cache': self.code_cache.get_stats(),
+                'workers': self.worker_pool.get_load() if self.worker_pool else []
             }
         except Exception as e:
             logger.error(f"Error getting system stats: {e}")
@@ -947,9 +1236,29 @@ const BOT_TOKEN = '{token}';
             # Stop all bots
             await self.stop_all_bots()
             
+            # Stop worker processes
+            if self.worker_pool:
+                await self.worker_pool.shutdown()
+            
+            # Close pooled HTTP connections
+            await self.token_verifier.close()
+            
+            # Stop syntax-check daemons
+            await self.validator.close()
+            
+            # Stop draining bot output
+            self.output.close()
+            self.log_store.close()
+            
             # Clean up temp files
             await self.cleanup_temp_files()
             
+            # Write out queued log entries and conversation states
+            await self.db.flush_logs()
+            await self.db.flush_states()
+            await self.db.bot_cache.close()
+            await self.db.stats_service.close()
+            
             logger.info("✅ Graceful shutdown complete")
             
         except Exception as e:
@@ -978,6 +1287,8 @@ const BOT_TOKEN = '{token}';
                     if client:
                         info['is_connected'] = client.is_connected
                         info['client_type'] = 'Pyrogram'
+                        if self.worker_pool:
+                            info['worker'] = client.worker_index
                 elif info['type'] in ['javascript', 'shell', 'ruby', 'php', 'go']:
                     process = self.bot_processes.get(bot_id)
                     if process:
@@ -1047,7 +1358,7 @@ const BOT_TOKEN = '{token}';
     async def export_bot_config(self, bot_id: str):
         """Export bot configuration for backup"""
         try:
-            bot = await self.db.get_bot(bot_id)
+            bot = await self.db.get_bot(bot_id, with_script=True)
             if not bot:
                 return None
             
@@ -0,0 +1,147 @@
+"""
+Pattern Scanner - Single-pass multi-pattern security scanner
+Developer: @Zeroboy216
+Channel: @zerodevbro
+
+Every rule list a language is checked against (DANGEROUS_PATTERNS,
+SHELL_BLOCKED_COMMANDS, ...) is compiled once into a single
+alternation, so a script is scanned in one pass instead of once per pattern.
+The text is processed in chunks, lowercased a chunk at a time, and every hit
+is reported with its line and column.
+"""
+
+import asyncio
+import re
+from collections import namedtuple
+
+from config import DANGEROUS_PATTERNS, JS_REQUIRED_PATTERNS, SHELL_BLOCKED_COMMANDS
+
+CHUNK_SIZE = 64 * 1024
+
+Hit = namedtuple("Hit", ["category", "pattern", "line", "column"])
+
+# (category, patterns, ignore_case) checked for each file type
+COMMON_RULES = [("dangerous", DANGEROUS_PATTERNS, True)]
+# Python's BLOCKED_IMPORTS are checked on the AST instead (see analyzer.py)
+LANGUAGE_RULES = {
+    "js": [("js_required", JS_REQUIRED_PATTERNS, False)],
+    "sh": [("shell", SHELL_BLOCKED_COMMANDS, False)],
+}
+
+
+def _trie_pattern(words):
+    """Regex matching any of ``words``, with shared prefixes factored out (greedy: longest wins)"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class PatternScanner:
+    """Finds every occurrence of a fixed set of literal patterns in one pass"""
+
+    def __init__(self, rules, chunk_size: int = CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.rules = {}  # lowercased pattern -> [(category, pattern, ignore_case)]
+        for category, patterns, ignore_case in rules:
+            for pattern in patterns:
+                self.rules.setdefault(pattern.lower(), []).append((category, pattern, ignore_case))
+
+        # The patterns are merged into a trie-shaped regex, so each position costs one
+        # character dispatch instead of a try per pattern. It reports the longest pattern
+        # at a position; shorter ones starting at the same offset come from ``prefixes``
+        keys = sorted(self.rules, key=len, reverse=True)
+        self.regex = re.compile(_trie_pattern(keys))
+        self.regex_ignore_case = re.compile(self.regex.pattern, re.IGNORECASE)
+        self.prefixes = {key: [other for other in keys if other != key and key.startswith(other)] for key in keys}
+        self.overlap = max((len(key) for key in keys), default=1) - 1
+
+    def _chunk_matches(self, text: str, start: int):
+        """Offsets and lowercased keys of the matches starting in one chunk"""
+        end = min(start + self.chunk_size, len(text))
+        window = text[start:end + self.overlap]
+        lowered = window.lower()
+
+        if len(lowered) == len(window):
+            regex, haystack = self.regex, lowered
+        else:
+            # Some characters change length when lowercased, offsets would drift
+            regex, haystack = self.regex_ignore_case, window
+
+        match = regex.search(haystack)
+        while match and match.start() < end - start:
+            key = match.group().lower()
+            if key in self.rules:  # a Unicode case fold may not lower back to the pattern
+                for candidate in [key] + self.prefixes[key]:
+                    yield start + match.start(), candidate
+            # Restart right after the match start so overlapping patterns are found too
+            match = regex.search(haystack, match.start() + 1)
+
+    def _hits(self, text: str, offset: int, key: str):
+        for category, pattern, ignore_case in self.rules[key]:
+            if ignore_case or text.startswith(pattern, offset):
+                yield category, pattern, offset
+
+    def _locate(self, text: str, found, position):
+        """Turn (category, pattern, offset) into hits with 1-based line and column"""
+        for category, pattern, offset in found:
+            position['line'] += text.count("\n", position['offset'], offset)
+            position['offset'] = offset
+            column = offset - text.rfind("\n", 0, offset)
+            yield Hit(category, pattern, position['line'], column)
+
+    def _scan_chunk(self, text: str, start: int, position):
+        found = []
+        for offset, key in self._chunk_matches(text, start):
+            found.extend(self._hits(text, offset, key))
+        found.sort(key=lambda item: item[2])
+        return list(self._locate(text, found, position))
+
+    def scan(self, text: str):
+        """All hits in ``text``, in order of appearance"""
+        position = {'line': 1, 'offset': 0}
+        hits = []
+        for start in range(0, len(text), self.chunk_size):
+            hits.extend(self._scan_chunk(text, start, position))
+        return hits
+
+    async def scan_async(self, text: str, chunks_per_yield: int = 4):
+        """Like scan(), but lets the event loop run between chunks"""
+        position = {'line': 1, 'offset': 0}
+        hits = []
+        for index, start in enumerate(range(0, len(text), self.chunk_size)):
+            hits.extend(self._scan_chunk(text, start, position))
+            if index % chunks_per_yield == chunks_per_yield - 1:
+                await asyncio.sleep(0)
+        return hits
+
+
+def first_hit(hits, category: str):
+    """Earliest hit of a category, or None"""
+    return next((hit for hit in hits if hit.category == category), None)
+
+
+def describe_hit(hit: Hit):
+    return f"(line {hit.line}, column {hit.column})"
+
+
+_scanners = {}
+
+
+def get_scanner(file_type: str):
+    """Scanner for a file type's ruleset, built once"""
+    scanner = _scanners.get(file_type)
+    if scanner is None:
+        scanner = _scanners[file_type] = PatternScanner(COMMON_RULES + LANGUAGE_RULES.get(file_type, []))
+    return scanner
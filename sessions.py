@@ -0,0 +1,142 @@
+"""
+Session Store - Persistent Pyrogram sessions for hosted bots
+Developer: @Zeroboy216
+Channel: @zerodevbro
+
+Hosted bots keep their MTProto auth key in SESSION_DIR, keyed by a hash of
+the bot token, so restarts skip auth.importBotAuthorization and the key
+exchange. Sessions are invalidated when Telegram rejects them (e.g. the
+token was revoked) or when the bot is deleted.
+"""
+
+import asyncio
+import fcntl
+import hashlib
+import logging
+import os
+from contextlib import asynccontextmanager
+
+from pyrogram import Client
+from pyrogram.errors import Unauthorized
+
+from config import API_ID, API_HASH, SESSION_DIR, SESSION_CACHE_ENABLED
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore:
+    """Per-token session files with in-process and cross-process locking"""
+
+    def __init__(self, root: str = os.path.join(SESSION_DIR, "hosted"), enabled: bool = SESSION_CACHE_ENABLED):
+        self.root = root
+        self.enabled = enabled
+        self.locks = {}  # key -> asyncio.Lock
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+        if self.enabled:
+            os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def key(token: str):
+        """Session key for a token (the token itself never touches the disk name)"""
+        return hashlib.sha256(token.encode()).hexdigest()[:32]
+
+    def path(self, token: str):
+        """Path of the session file for a token"""
+        return os.path.join(self.root, f"bot_{self.key(token)}.session")
+
+    def has_session(self, token: str):
+        return self.enabled and os.path.exists(self.path(token))
+
+    @asynccontextmanager
+    async def lock(self, token: str):
+        """Exclusive access to a token's session, across tasks and worker processes"""
+        key = self.key(token)
+        async with self.locks.setdefault(key, asyncio.Lock()):
+            if not self.enabled:
+                yield
+                return
+
+            with open(os.path.join(self.root, f"bot_{key}.lock"), "w") as lock_file:
+                while True:
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        await asyncio.sleep(0.05)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def invalidate(self, token: str):
+        """Drop the cached session of a token"""
+        if not self.enabled:
+            return
+
+        removed = False
+        base = self.path(token)
+        for path in (base, f"{base}-journal"):
+            try:
+                os.remove(path)
+                removed = True
+            except FileNotFoundError:
+                pass
+
+        if removed:
+            self.invalidations += 1
+            logger.info(f"🗑️ Session {self.key(token)[:8]} invalidated")
+
+    def _new_client(self, token: str):
+        if not self.enabled:
+            return Client(
+                f"bot_{self.key(token)}",
+                api_id=API_ID,
+                api_hash=API_HASH,
+                bot_token=token,
+                in_memory=True
+            )
+
+        return Client(
+            f"bot_{self.key(token)}",
+            api_id=API_ID,
+            api_hash=API_HASH,
+            bot_token=token,
+            workdir=self.root
+        )
+
+    async def start_client(self, token: str):
+        """Create and start a client, reusing the cached session when possible"""
+        async with self.lock(token):
+            cached = self.has_session(token)
+            client = self._new_client(token)
+
+            try:
+                await client.start()
+            except Unauthorized as e:
+                if not cached:
+                    raise
+                # Stale auth key (token revoked or regenerated): retry with a fresh login
+                logger.warning(f"Cached session rejected ({e}), re-authorizing")
+                self.invalidate(token)
+                cached = False
+                client = self._new_client(token)
+                await client.start()
+
+            if cached:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+            return client
+
+    def get_stats(self):
+        """Get session cache counters"""
+        return {
+            'enabled': self.enabled,
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+        }
@@ -0,0 +1,175 @@
+"""
+State Store - In-memory conversation states with write-behind persistence
+Developer: @Zeroboy216
+Channel: @zerodevbro
+
+The add/edit flows read a user's state on every private message and write it
+at every step. States are served from memory; writes only mark the user
+dirty, and a background task persists dirty users to the states collection
+every STATE_FLUSH_INTERVAL seconds with one unordered bulk write, so a user
+who changes state several times in between costs a single write. The
+collection is only read for users not in memory, i.e. to recover states
+after a restart. States expire in memory after STATE_TTL_HOURS like the TTL
+index expires them in MongoDB. Only one control bot may poll Telegram, so
+this process is the only writer of the collection.
+"""
+
+import asyncio
+import copy
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from pymongo import DeleteOne, ReplaceOne
+from pymongo.errors import BulkWriteError
+
+from config import STATE_TTL_HOURS, STATE_CACHE_SIZE, STATE_FLUSH_INTERVAL, STATE_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class StateStore:
+    """Per-user conversation states kept in memory and persisted in batches"""
+
+    def __init__(self, collection, ttl: float = STATE_TTL_HOURS * 3600, max_entries: int = STATE_CACHE_SIZE,
+                 flush_interval: float = STATE_FLUSH_INTERVAL, batch_size: int = STATE_BATCH_SIZE):
+        self.collection = collection
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.entries = OrderedDict()  # user_id -> (expires at, state or None when the user has none)
+        self.dirty = {}               # user_id -> state to persist, None to delete
+        self.task = None
+        self.closing = False
+        self.pending = None           # set while users are dirty
+        self.closed = None            # set by close(), cuts the flush interval short
+        self.stats = {
+            'hits': 0, 'loads': 0, 'expired': 0, 'writes': 0, 'coalesced': 0,
+            'persisted': 0, 'flushes': 0, 'failed': 0,
+        }
+
+    def _remember(self, user_id: int, state):
+        expires = time.monotonic() + self.ttl
+        if state is not None and isinstance(state.get('timestamp'), datetime):
+            expires -= (datetime.now() - state['timestamp']).total_seconds()
+        self.entries[user_id] = (expires, state)
+        self.entries.move_to_end(user_id)
+        # Dirty users stay in memory until they are written
+        while len(self.entries) > self.max_entries:
+            oldest = next(iter(self.entries))
+            if oldest in self.dirty:
+                break
+            del self.entries[oldest]
+
+    async def get(self, user_id: int):
+        """The user's state, loading it from the collection if it isn't in memory"""
+        entry = self.entries.get(user_id)
+        if entry is not None and entry[0] < time.monotonic():
+            # Expired like the document will be; the TTL index removes it from MongoDB
+            self.stats['expired'] += 1
+            self._remember(user_id, None)
+            return None
+
+        if entry is None:
+            self.stats['loads'] += 1
+            state = await self.collection.find_one({"user_id": user_id})
+            if user_id in self.entries:
+                entry = self.entries[user_id]  # written while we were reading
+            else:
+                self._remember(user_id, state)
+                entry = self.entries[user_id]
+        else:
+            self.stats['hits'] += 1
+            self.entries.move_to_end(user_id)
+        return copy.deepcopy(entry[1])
+
+    def set(self, user_id: int, action: str, message_id: int = None, data: dict = None):
+        state = {
+            "user_id": user_id,
+            "action": action,
+            "message_id": message_id,
+            "data": copy.deepcopy(data) if data else {},
+            "timestamp": datetime.now()
+        }
+        self._remember(user_id, state)
+        self._mark(user_id, state)
+
+    def clear(self, user_id: int):
+        self._remember(user_id, None)
+        self._mark(user_id, None)
+
+    def _mark(self, user_id: int, state):
+        self._start()
+        self.stats['writes'] += 1
+        if user_id in self.dirty:
+            self.stats['coalesced'] += 1
+        self.dirty[user_id] = state
+        self.pending.set()
+
+    def _start(self):
+        if self.task is None:
+            self.pending = asyncio.Event()
+            self.closed = asyncio.Event()
+            self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while not (self.closing and not self.dirty):
+            await self.pending.wait()
+            if not self.closing:
+                try:
+                    await asyncio.wait_for(self.closed.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            if not await self.flush() and self.closing:
+                logger.error(f"❌ Gave up persisting {len(self.dirty)} conversation states")
+                break
+
+    async def flush(self):
+        """Persist every dirty user now; False if a write failed"""
+        while self.dirty:
+            users = list(self.dirty)[:self.batch_size]
+            batch = {user_id: self.dirty.pop(user_id) for user_id in users}
+            operations = [
+                ReplaceOne({"user_id": user_id}, state, upsert=True) if state is not None
+                else DeleteOne({"user_id": user_id})
+                for user_id, state in batch.items()
+            ]
+            self.stats['flushes'] += 1
+            try:
+                await self.collection.bulk_write(operations, ordered=False)
+                self.stats['persisted'] += len(operations)
+            except Exception as e:
+                failed = len(operations)
+                if isinstance(e, BulkWriteError):
+                    failed = len(e.details.get('writeErrors', [])) or failed
+                self.stats['failed'] += failed
+                logger.error(f"❌ Failed to persist {failed} conversation states: {e}")
+                # Retry on the next round unless the user moved on meanwhile
+                for user_id, state in batch.items():
+                    self.dirty.setdefault(user_id, state)
+                return False
+        self.pending.clear()
+        return True
+
+    async def close(self):
+        """Persist pending states and stop the flush task"""
+        if self.task is None:
+            return
+        self.closing = True
+        self.pending.set()
+        self.closed.set()
+        await self.task
+        self.task = None
+        self.closing = False
+        logger.info("✅ Conversation states persisted")
+
+    def get_stats(self):
+        lookups = self.stats['hits'] + self.stats['loads']
+        return {
+            **self.stats,
+            'entries': len(self.entries),
+            'dirty': len(self.dirty),
+            'hit_rate': round(self.stats['hits'] / lookups * 100, 1) if lookups else 0.0,
+        }
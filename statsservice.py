@@ -0,0 +1,189 @@
+"""
+Stats Service - Platform statistics served from an in-memory snapshot
+Developer: @Zeroboy216
+Channel: @zerodevbro
+
+Counts of users, bots, running bots and bots per type are kept in memory and
+adjusted by Database on every write that changes them, so the statistics
+screens read a dict instead of querying MongoDB. Every STATS_RECONCILE_INTERVAL
+seconds one aggregation over users and bots ($unionWith + $facet) recomputes
+everything, including the active-user count and the top-N lists that can't be
+maintained incrementally, and corrects any drift, e.g. from writes made by
+another hoster instance.
+"""
+
+import asyncio
+import copy
+import logging
+import time
+from datetime import datetime, timedelta
+
+from config import STATS_RECONCILE_INTERVAL, STATS_ACTIVE_DAYS
+
+logger = logging.getLogger(__name__)
+
+# Bot fields the top-N lists show
+BOT_SUMMARY = {"_id": 1, "user_id": 1, "bot_username": 1, "status": 1, "error_count": 1, "restart_count": 1}
+
+COUNTERS = ("total_users", "active_users", "total_bots", "running_bots")
+
+
+class StatsService:
+    """Incrementally maintained platform counters, reconciled with one aggregation"""
+
+    def __init__(self, users, bots, interval: float = STATS_RECONCILE_INTERVAL, active_days: int = STATS_ACTIVE_DAYS):
+        self.users = users
+        self.bots = bots
+        self.interval = interval
+        self.active_days = active_days
+        self.snapshot = None   # counters and lists served to readers
+        self.reconciled_at = None
+        self.task = None
+        self.lock = asyncio.Lock()
+        self.stats = {'reads': 0, 'updates': 0, 'reconciles': 0, 'drift': 0, 'reconcile_seconds': 0.0}
+
+    # Incremental updates
+
+    def _adjust(self, key: str, delta: int):
+        if self.snapshot is not None:
+            self.snapshot[key] = max(0, self.snapshot[key] + delta)
+
+    def user_seen(self, previous: dict):
+        """A user was active; ``previous`` is their document before add_user (None if new)"""
+        self.stats['updates'] += 1
+        if previous is None:
+            self._adjust('total_users', 1)
+        cutoff = datetime.now() - timedelta(days=self.active_days)
+        last_active = (previous or {}).get('last_active')
+        if not isinstance(last_active, datetime) or last_active < cutoff:
+            self._adjust('active_users', 1)
+
+    def bot_added(self, file_type: str, status: str = "stopped"):
+        self.stats['updates'] += 1
+        self._adjust('total_bots', 1)
+        self._adjust('running_bots', status == "running")
+        if self.snapshot is not None:
+            by_type = self.snapshot['bots_by_type']
+            by_type[file_type] = by_type.get(file_type, 0) + 1
+
+    def bot_removed(self, bot: dict):
+        """``bot`` is the deleted document (status and file type are enough)"""
+        self.stats['updates'] += 1
+        self._adjust('total_bots', -1)
+        self._adjust('running_bots', -(bot.get('status') == "running"))
+        file_type = bot.get('file_metadata', {}).get('file_type')
+        if self.snapshot is not None and self.snapshot['bots_by_type'].get(file_type):
+            self.snapshot['bots_by_type'][file_type] -= 1
+
+    def status_changed(self, old: str, new: str):
+        self.stats['updates'] += 1
+        self._adjust('running_bots', (new == "running") - (old == "running"))
+
+    # Reconciliation
+
+    def _pipeline(self):
+        cutoff = datetime.now() - timedelta(days=self.active_days)
+        bots = {"$match": {"kind": "bot"}}
+        return [
+            {"$project": {"_id": 0, "kind": {"$literal": "user"}, "last_active": 1}},
+            {"$unionWith": {"coll": self.bots.name, "pipeline": [
+                {"$project": {**BOT_SUMMARY, "kind": {"$literal": "bot"}, "file_type": "$file_metadata.file_type"}}
+            ]}},
+            {"$facet": {
+                "users": [
+                    {"$match": {"kind": "user"}},
+                    {"$group": {
+                        "_id": None,
+                        "total": {"$sum": 1},
+                        "active": {"$sum": {"$cond": [{"$gte": ["$last_active", cutoff]}, 1, 0]}}
+                    }}
+                ],
+                "bots": [
+                    bots,
+                    {"$group": {
+                        "_id": None,
+                        "total": {"$sum": 1},
+                        "running": {"$sum": {"$cond": [{"$eq": ["$status", "running"]}, 1, 0]}}
+                    }}
+                ],
+                "by_type": [bots, {"$group": {"_id": "$file_type", "count": {"$sum": 1}}}],
+                "top_users": [
+                    bots,
+                    {"$group": {"_id": "$user_id", "bot_count": {"$sum": 1}}},
+                    {"$sort": {"bot_count": -1}},
+                    {"$limit": 10}
+                ],
+                "error_prone_bots": [bots, {"$sort": {"error_count": -1}}, {"$limit": 10}, {"$project": {"kind": 0}}],
+                "restart_prone_bots": [bots, {"$sort": {"restart_count": -1}}, {"$limit": 10}, {"$project": {"kind": 0}}],
+            }}
+        ]
+
+    async def reconcile(self):
+        """Recompute the snapshot from the collections"""
+        async with self.lock:
+            started = time.perf_counter()
+            result = (await self.users.aggregate(self._pipeline(), allowDiskUse=True).to_list(length=1))[0]
+            users = result['users'][0] if result['users'] else {'total': 0, 'active': 0}
+            bots = result['bots'][0] if result['bots'] else {'total': 0, 'running': 0}
+            snapshot = {
+                'total_users': users['total'],
+                'active_users': users['active'],
+                'total_bots': bots['total'],
+                'running_bots': bots['running'],
+                'bots_by_type': {item['_id']: item['count'] for item in result['by_type']},
+                'top_users': result['top_users'],
+                'error_prone_bots': result['error_prone_bots'],
+                'restart_prone_bots': result['restart_prone_bots'],
+            }
+            if self.snapshot is not None:
+                self.stats['drift'] = sum(abs(snapshot[key] - self.snapshot[key]) for key in COUNTERS)
+                if self.stats['drift']:
+                    logger.info(f"📊 Stats counters corrected by {self.stats['drift']}")
+            self.snapshot = snapshot
+            self.reconciled_at = time.time()
+            self.stats['reconciles'] += 1
+            self.stats['reconcile_seconds'] = round(time.perf_counter() - started, 3)
+
+    def start(self):
+        """Reconcile now and then every ``interval`` seconds"""
+        if self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logger.error(f"❌ Stats reconcile failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def close(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    # Reads
+
+    async def get(self, detailed: bool = False):
+        """Snapshot of the platform statistics (the top-N lists only if ``detailed``)"""
+        if self.snapshot is None:
+            await self.reconcile()
+        self.stats['reads'] += 1
+        snapshot = self.snapshot
+        stats = {key: snapshot[key] for key in COUNTERS}
+        stats['stopped_bots'] = snapshot['total_bots'] - snapshot['running_bots']
+        stats['bots_by_type'] = {file_type: count for file_type, count in snapshot['bots_by_type'].items() if count}
+        if detailed:
+            for key in ('top_users', 'error_prone_bots', 'restart_prone_bots'):
+                stats[key] = copy.deepcopy(snapshot[key])
+        return stats
+
+    def get_stats(self):
+        return {
+            **self.stats,
+            'age_seconds': round(time.time() - self.reconciled_at, 1) if self.reconciled_at else None,
+        }
@@ -0,0 +1,18 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+# config.py exits without credentials and creates its directories on import
+os.environ.setdefault("API_ID", "12345")
+os.environ.setdefault("API_HASH", "0123456789abcdef")
+os.environ.setdefault("BOT_TOKEN", "12345:test")
+os.environ.setdefault("OWNER_ID", "1")
+_scratch = tempfile.mkdtemp(prefix="bothoster-tests-")
+atexit.register(shutil.rmtree, _scratch, ignore_errors=True)
+for _name in ("SESSION_DIR", "DOWNLOAD_DIR", "LOG_DIR", "WORKSPACE_DIR", "GO_BUILD_CACHE_DIR", "CODE_CACHE_DIR"):
+    os.environ.setdefault(_name, os.path.join(_scratch, _name.lower()))
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
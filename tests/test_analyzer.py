@@ -0,0 +1,82 @@
+import pytest
+
+from analyzer import analyze_source
+from config import BLOCKED_IMPORTS
+
+
+def blocked_names(script: str):
+    analysis, _ = analyze_source(script, BLOCKED_IMPORTS, compile_code=False)
+    return [hit['name'] for hit in analysis['blocked']]
+
+
+@pytest.mark.parametrize("script", [
+    "open('/etc/passwd').read()",
+    "import io\nio.open('/etc/passwd').read()",
+    "import os\nos.open('/x', 0)",
+    "import builtins\nbuiltins.open('x')",
+    "import builtins\nbuiltins.eval('1')",
+    "__builtins__.exec('1')",
+    "import builtins\nbuiltins.compile('1', 'x', 'exec')",
+    "import builtins\ngetattr(builtins, 'open')('x')",
+    "import io as stream\nstream.open('x')",
+    "from io import open as load\nload('x')",
+    "import os\nos.system('id')",
+    "from subprocess import Popen as P\nP(['id'])",
+    # Bindings that don't shadow the builtin where it is used
+    "open('x')\nopen = print",
+    "if False:\n    open = print\nopen('x')",
+    "for open in []:\n    pass\nopen('x')",
+    "open = print\ndel open\nopen('x')",
+    "def read(open=open):\n    return open('x')",
+    "[open('x') for open in [open]]",
+    "def read():\n    return open('x')\nopen = print",
+    "class Reader:\n    open = print\n    def read(self):\n        return open('x')",
+    "def read():\n    global open\n    if False:\n        open = print\n    return open('x')",
+])
+def test_blocked(script):
+    assert blocked_names(script)
+
+
+@pytest.mark.parametrize("script", [
+    "import re\npattern = re.compile('a+')",
+    "print('open(')",
+    "from pyrogram import filters\nfilters.command('start')",
+    "import json\njson.loads('{}')",
+    "file = 1\nprint(file)",
+    "for file in ['a']:\n    print(file)",
+    "files = [m.file for m in []]",
+    "def handle(message):\n    f = message.file\n    f.open()\n    return message.document.file_id",
+    "async def handle(client, message):\n    file = await message.download()\n    print(file)",
+    "class Bot:\n    file = None\n    print(file)",
+    "with ctx() as file:\n    print(file.name)",
+    "try:\n    pass\nexcept Exception as file:\n    print(file)",
+    "handler = lambda file: file.read()",
+    "from pathlib import Path\nPath('x').open()",
+    "exec_count = 0\nprint(exec_count)",
+    "f = message.file\nf.open()",
+    "m = get_message()\nprint(m.document.file, m.document.file_id)",
+])
+def test_allowed(script):
+    assert blocked_names(script) == []
+
+
+def test_hit_position():
+    analysis, _ = analyze_source("x = 1\nimport io\ny = io.open('f')\n", BLOCKED_IMPORTS, compile_code=False)
+    assert analysis['blocked'] == [{'name': 'io.open', 'line': 3, 'column': 5}]
+
+
+def test_store_fills_both_caches(tmp_path):
+    from analyzer import ScriptAnalyzer
+    from codecache import CodeCache
+
+    code_cache = CodeCache(root=str(tmp_path), disk=True)
+    analyzer = ScriptAnalyzer(BLOCKED_IMPORTS, code_cache=code_cache)
+    script = "x = 1\n"
+
+    # What the validator does: parse in a thread, store on the loop
+    analysis, code = analyze_source(script, analyzer.blocked)
+    analyzer.store(script, analysis, code)
+
+    assert analyzer.cached(script) is analysis
+    assert code_cache.load(script) is code
+    assert (analyzer.stats['misses'], code_cache.get_stats()['files']) == (1, 1)
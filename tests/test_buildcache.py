@@ -0,0 +1,46 @@
+import asyncio
+import os
+import time
+
+from buildcache import GoBuildCache, EVICTION_GRACE
+
+
+def add_binary(cache, name, size, age):
+    path = os.path.join(cache.bin_dir, name)
+    with open(path, 'wb') as f:
+        f.write(b"\0" * size)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+def test_evict_oldest_first(tmp_path):
+    cache = GoBuildCache(root=str(tmp_path), max_bytes=250)
+    oldest = add_binary(cache, "a", 100, EVICTION_GRACE + 300)
+    older = add_binary(cache, "b", 100, EVICTION_GRACE + 200)
+    old = add_binary(cache, "c", 100, EVICTION_GRACE + 100)
+
+    assert cache.evict() == 200
+    assert not os.path.exists(oldest)
+    assert os.path.exists(older) and os.path.exists(old)
+
+
+def test_evict_spares_recent_binaries(tmp_path):
+    """A binary another build just produced must survive until it is executed"""
+    cache = GoBuildCache(root=str(tmp_path), max_bytes=50)
+    old = add_binary(cache, "old", 100, EVICTION_GRACE + 100)
+    fresh = add_binary(cache, "fresh", 100, 0)
+
+    assert cache.evict() == 100
+    assert not os.path.exists(old)
+    assert os.path.exists(fresh)
+
+
+def test_toolchain_caches_within_budget_are_kept(tmp_path):
+    cache = GoBuildCache(root=str(tmp_path), max_bytes=1024 * 1024)
+    os.makedirs(cache.toolchain_dirs[0])
+    with open(os.path.join(cache.toolchain_dirs[0], "entry"), 'wb') as f:
+        f.write(b"\0" * 1024)
+
+    assert asyncio.run(cache.trim_toolchain_caches()) is False
+    assert cache._toolchain_bytes() == 1024
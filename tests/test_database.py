@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("motor.motor_asyncio", exc_type=ImportError)
+# A test dependency (requirements-dev.txt), a missing one must fail, not skip
+import mongomock_motor
+
+import database
+from database import Database, INDEXES
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(database, "AsyncIOMotorClient", lambda url: mongomock_motor.AsyncMongoMockClient())
+    return Database(name="bothoster_test")
+
+
+def index_names(db, collection):
+    return set(asyncio.run(db.db[collection].index_information()))
+
+
+def expected_names(collection):
+    return {model.document["name"] for model in INDEXES[collection]}
+
+
+def test_create_indexes(db):
+    created, dropped = asyncio.run(db.create_indexes())
+
+    for collection in INDEXES:
+        assert expected_names(collection) <= index_names(db, collection)
+    assert "logs.bot_id_1_timestamp_-1" in created
+    assert dropped == []
+
+    # A second start finds everything in place
+    assert asyncio.run(db.create_indexes()) == ([], [])
+
+
+def test_create_indexes_drops_retired(db):
+    asyncio.run(db.logs.create_index("log_type"))
+    _, dropped = asyncio.run(db.create_indexes())
+
+    assert dropped == ["logs.log_type_1"]
+    assert "log_type_1" not in index_names(db, "logs")
+
+
+def test_create_indexes_with_capped_logs(db, monkeypatch):
+    """convertToCapped drops the secondary indexes, INDEXES must be built after it"""
+    converted = []
+
+    async def convert_to_capped(size):
+        # What convertToCapped does to the indexes (mongomock can't convert)
+        for name in await db.logs.index_information():
+            if name != "_id_":
+                await db.logs.drop_index(name)
+        converted.append(size)
+
+    monkeypatch.setattr(database, "LOGS_CAPPED_MB", 64)
+    monkeypatch.setattr(db, "_ensure_capped_logs", convert_to_capped)
+    asyncio.run(db.logs.insert_one({"bot_id": "b", "message": "x"}))
+
+    asyncio.run(db.create_indexes())
+
+    assert converted == [64 * 1024 * 1024]
+    assert expected_names("logs") <= index_names(db, "logs")
+    assert "timestamp_1" in index_names(db, "logs")
+
+
+def test_migrate_bot_timestamps(db):
+    from datetime import datetime, timedelta
+    from database import BOT_SCHEMA_VERSION
+
+    asyncio.run(db.bots.insert_many([
+        {"name": "old", "created_at": "2024-01-02 03:04:05", "last_restart": "2024-01-03 00:00:00",
+         "quarantine": {"since": "2024-01-04 12:00:00"}},
+        {"name": "broken", "created_at": "yesterday", "updated_at": "2024-02-01 00:00:00"},
+        {"name": "current", "created_at": datetime(2024, 5, 1), "schema_version": BOT_SCHEMA_VERSION},
+    ]))
+
+    assert asyncio.run(db.migrate_bot_timestamps(batch_size=1)) == 2
+    bots = {bot["name"]: bot for bot in asyncio.run(db.bots.find().to_list(length=None))}
+
+    assert bots["old"]["created_at"] == datetime(2024, 1, 2, 3, 4, 5)
+    assert bots["old"]["last_restart"] == datetime(2024, 1, 3)
+    assert bots["old"]["quarantine"]["since"] == datetime(2024, 1, 4, 12)
+    assert bots["broken"]["created_at"] == "yesterday"  # unparseable strings are kept
+    assert bots["broken"]["updated_at"] == datetime(2024, 2, 1)
+    assert all(bot["schema_version"] == BOT_SCHEMA_VERSION for bot in bots.values())
+
+    # Converted documents are found by date range queries and not migrated twice
+    restarted = asyncio.run(db.get_bots_restarted_since(datetime(2024, 1, 1)))
+    assert [bot["name"] for bot in restarted] == ["old"]
+    assert asyncio.run(db.migrate_bot_timestamps()) == 0
+    assert asyncio.run(db.get_bots_restarted_since(datetime.now() - timedelta(days=1))) == []
+
+
+def test_script_lines_in_metadata(db):
+    async def scenario():
+        bot_id = await db.add_bot(1, "token", "a\nb\nc", {"username": "x"})
+        assert (await db.get_bot(bot_id))["file_metadata"]["lines"] == 3
+
+        await db.update_bot_script(bot_id, "a\nb")
+        bot = await db.get_bot(bot_id)
+        assert "script" not in bot
+        assert await db.get_script_lines(bot) == 2
+
+        # Bots saved before the count was recorded get it once
+        await db.bots.update_one({"_id": bot["_id"]}, {"$unset": {"file_metadata.lines": ""}})
+        db.bot_cache.invalidate(bot_id)
+        assert await db.get_script_lines(await db.get_bot(bot_id)) == 2
+        assert (await db.get_bot(bot_id))["file_metadata"]["lines"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_validation_cache_expires(db):
+    from datetime import datetime, timedelta
+
+    asyncio.run(db.validation_cache.insert_many([
+        {"_id": "py:old:x", "is_safe": True, "created_at": datetime.now() - timedelta(days=365)},
+        {"_id": "py:new:x", "is_safe": True, "created_at": datetime.now()},
+    ]))
+    asyncio.run(db.create_indexes())
+
+    index = asyncio.run(db.validation_cache.index_information())["created_at_1"]
+    assert index["expireAfterSeconds"] == database.VALIDATION_CACHE_TTL_DAYS * 86400
+    # The backlog already past the TTL goes right away
+    assert asyncio.run(db.validation_cache.distinct("_id")) == ["py:new:x"]
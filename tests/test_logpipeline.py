@@ -0,0 +1,29 @@
+import asyncio
+
+from logpipeline import LogPipeline
+
+
+class Collection:
+    def __init__(self):
+        self.documents = []
+
+    async def insert_many(self, documents, ordered=False):
+        self.documents.extend(documents)
+
+
+def test_forget_drops_bot_state():
+    async def scenario():
+        pipeline = LogPipeline(Collection(), rate=0, burst=1)
+        for bot_id in ("a", "a", "b"):
+            pipeline.submit({"bot_id": bot_id, "message": "x"})
+        assert set(pipeline.buckets) == {"a", "b"}
+        assert pipeline.dropped == {"a": 1}
+
+        pipeline.forget("a")
+        assert set(pipeline.buckets) == {"b"}
+        assert pipeline.dropped == {}
+        await pipeline.close()
+        return pipeline.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats['inserted'], stats['tracked_bots']) == (2, 1)
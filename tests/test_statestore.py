@@ -0,0 +1,167 @@
+import asyncio
+
+import pytest
+from pymongo import DeleteOne, ReplaceOne
+
+from statestore import StateStore
+
+
+class Collection:
+    """The part of a states collection StateStore uses"""
+
+    def __init__(self):
+        self.documents = {}
+        self.batches = []
+        self.fail = False
+        self.gate = None  # when set, bulk_write waits for it
+
+    async def find_one(self, query):
+        return self.documents.get(query["user_id"])
+
+    async def bulk_write(self, operations, ordered=True):
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.fail:
+            raise ConnectionError("MongoDB unavailable")
+        self.batches.append(operations)
+        for operation in operations:
+            user_id = operation._filter["user_id"]
+            if isinstance(operation, ReplaceOne):
+                self.documents[user_id] = operation._doc
+            elif isinstance(operation, DeleteOne):
+                self.documents.pop(user_id, None)
+
+
+def run(scenario):
+    return asyncio.run(asyncio.wait_for(scenario(), 5))
+
+
+def test_states_served_from_memory():
+    collection = Collection()
+
+    async def scenario():
+        store = StateStore(collection, flush_interval=60)
+        store.set(1, "add_bot", data={"step": 1})
+        state = await store.get(1)
+        await store.close()
+        return store, state
+
+    store, state = run(scenario)
+    assert (state["action"], state["data"]) == ("add_bot", {"step": 1})
+    assert store.stats['loads'] == 0 and store.stats['hits'] == 1
+
+
+def test_writes_coalesce_into_one_batch():
+    collection = Collection()
+
+    async def scenario():
+        store = StateStore(collection, flush_interval=0.01)
+        store.set(1, "step1")
+        store.set(1, "step2")
+        store.set(2, "edit")
+        store.clear(2)
+        await asyncio.sleep(0.1)
+        await store.close()
+        return store
+
+    store = run(scenario)
+    assert len(collection.batches) == 1
+    assert len(collection.batches[0]) == 2
+    assert collection.documents[1]["action"] == "step2"
+    assert 2 not in collection.documents
+    assert store.stats['coalesced'] == 2
+
+
+def test_close_persists_pending_states():
+    collection = Collection()
+
+    async def scenario():
+        store = StateStore(collection, flush_interval=3600)
+        store.set(1, "add_bot")
+        store.set(2, "edit")
+        await store.close()
+        return store
+
+    store = run(scenario)
+    assert set(collection.documents) == {1, 2}
+    assert store.task is None and not store.dirty
+
+
+def test_state_recovered_after_restart():
+    collection = Collection()
+
+    async def scenario():
+        store = StateStore(collection)
+        store.set(1, "add_bot", message_id=7)
+        await store.close()
+        return await StateStore(collection).get(1)
+
+    assert run(scenario)["message_id"] == 7
+
+
+def test_newer_state_survives_failed_write():
+    """A state set while its previous write is failing must not be overwritten by the retry"""
+    collection = Collection()
+
+    async def scenario():
+        store = StateStore(collection, flush_interval=3600)
+        store.set(1, "old")
+        collection.fail = True
+        collection.gate = asyncio.Event()
+        flush = asyncio.create_task(store.flush())
+        await asyncio.sleep(0)
+        store.set(1, "new")
+        collection.gate.set()
+        assert await flush is False
+
+        collection.fail = False
+        collection.gate = None
+        await store.close()
+        return store
+
+    store = run(scenario)
+    assert collection.documents[1]["action"] == "new"
+    assert store.stats['failed'] == 1
+
+
+def test_close_gives_up_when_writes_keep_failing():
+    collection = Collection()
+    collection.fail = True
+
+    async def scenario():
+        store = StateStore(collection, flush_interval=3600)
+        store.set(1, "add_bot")
+        await store.close()
+        return store
+
+    store = run(scenario)
+    assert store.task is None
+    assert 1 in store.dirty  # still in memory, nothing was silently dropped
+
+
+@pytest.mark.parametrize("ttl, expected", [(3600, "add_bot"), (-1, None)])
+def test_expired_states(ttl, expected):
+    collection = Collection()
+
+    async def scenario():
+        store = StateStore(collection, ttl=ttl)
+        store.set(1, "add_bot")
+        state = await store.get(1)
+        await store.close()
+        return state
+
+    state = run(scenario)
+    assert (state or {}).get("action") == expected
+
+
+def test_close_does_not_wait_out_the_flush_interval():
+    collection = Collection()
+
+    async def scenario():
+        store = StateStore(collection, flush_interval=3600)
+        store.set(1, "add_bot")
+        await asyncio.sleep(0.01)  # the flush task is now waiting for the interval
+        await asyncio.wait_for(store.close(), 1)
+
+    run(scenario)
+    assert collection.documents[1]["action"] == "add_bot"
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+import verifier
+from verifier import TokenVerifier
+
+
+def make_verifier(monkeypatch, **kwargs):
+    tv = TokenVerifier(**kwargs)
+    calls = []
+
+    async def verify_uncached(token):
+        calls.append(token)
+        return (True, {"username": token}), True
+
+    monkeypatch.setattr(tv, "_verify_uncached", verify_uncached)
+    return tv, calls
+
+
+def test_cache_is_bounded_lru(monkeypatch):
+    tv, calls = make_verifier(monkeypatch, cache_size=2)
+
+    async def scenario():
+        await tv.verify("a")
+        await tv.verify("b")
+        await tv.verify("a")  # hit, "b" is now the least recently used
+        await tv.verify("c")
+        await tv.verify("a")
+        await tv.verify("b")
+
+    asyncio.run(scenario())
+    assert calls == ["a", "b", "c", "b"]
+    assert len(tv.cache) == 2
+    assert "a" not in tv.cache  # keyed by hash, not the raw token
+
+
+def test_expired_entries_pruned_on_insert(monkeypatch):
+    tv, calls = make_verifier(monkeypatch, cache_ttl=10)
+    now = [1000.0]
+    monkeypatch.setattr(verifier.time, "monotonic", lambda: now[0])
+
+    asyncio.run(tv.verify("a"))
+    asyncio.run(tv.verify("b"))
+    now[0] += 20
+    asyncio.run(tv.verify("c"))
+
+    assert list(tv.cache) == [tv._key("c")]
+    assert calls == ["a", "b", "c"]
@@ -0,0 +1,90 @@
+import os
+import stat
+
+from workspace import ScriptWorkspace, LEGACY_TOKEN_HEADER
+
+TOKEN = "12345:secret-token"
+
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_permissions(tmp_path):
+    workspace = ScriptWorkspace(root=str(tmp_path / "workspace"))
+    script = workspace.write_script("console.log(1)", "js")
+    shell = workspace.write_script("echo 1", "sh", mode=0o700)
+
+    assert mode(workspace.root) == 0o700
+    assert mode(workspace.scripts_dir) == 0o700
+    assert mode(script) == 0o600
+    assert mode(shell) == 0o700
+
+
+def test_existing_directories_are_restricted(tmp_path):
+    root = tmp_path / "workspace"
+    os.makedirs(root / "scripts", mode=0o755)
+    os.chmod(root, 0o755)
+
+    workspace = ScriptWorkspace(root=str(root))
+    assert mode(workspace.root) == 0o700
+    assert mode(workspace.scripts_dir) == 0o700
+
+
+def test_bots_share_one_entry(tmp_path):
+    workspace = ScriptWorkspace(root=str(tmp_path))
+    first = workspace.write_script("puts 1", "rb", secret="1:a")
+    second = workspace.write_script("puts 1", "rb", secret="2:b")
+    workspace.acquire("bot1", first)
+    workspace.acquire("bot2", second)
+
+    assert first == second
+    assert (workspace.stats['writes'], workspace.stats['reuses']) == (1, 1)
+
+
+def test_script_without_secret_outlives_stop(tmp_path):
+    workspace = ScriptWorkspace(root=str(tmp_path), grace=3600)
+    path = workspace.write_script("puts 1", "rb", secret=TOKEN)
+    workspace.acquire("bot1", path)
+    workspace.release("bot1")
+
+    assert os.path.exists(path)
+    assert workspace.collect() == 0
+
+
+def test_script_with_secret_purged_on_stop(tmp_path):
+    workspace = ScriptWorkspace(root=str(tmp_path), grace=3600)
+    path = workspace.write_script(f"TOKEN = '{TOKEN}'", "rb", secret=TOKEN)
+    workspace.acquire("bot1", path)
+    workspace.acquire("bot2", path)
+
+    workspace.release("bot1")
+    assert os.path.exists(path)  # still used by bot2
+    workspace.release("bot2")
+    assert not os.path.exists(path)
+    assert workspace.stats['purged'] == 1
+
+
+def test_unused_scripts_collected_after_grace(tmp_path):
+    workspace = ScriptWorkspace(root=str(tmp_path), grace=0)
+    used = workspace.write_script("echo used", "sh")
+    unused = workspace.write_script("echo unused", "sh")
+    workspace.acquire("bot1", used)
+    os.utime(unused, (0, 0))
+
+    assert workspace.collect() == 1
+    assert os.path.exists(used)
+    assert not os.path.exists(unused)
+
+
+def test_legacy_token_scripts_purged(tmp_path):
+    scripts = tmp_path / "scripts"
+    os.makedirs(scripts)
+    legacy = scripts / "legacy.js"
+    legacy.write_bytes(LEGACY_TOKEN_HEADER + TOKEN.encode() + b"';\n\nconsole.log(1)\n")
+    plain = scripts / "plain.js"
+    plain.write_bytes(b"console.log(1)\n")
+
+    ScriptWorkspace(root=str(tmp_path))
+    assert not legacy.exists()
+    assert plain.exists()
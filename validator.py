@@ -0,0 +1,312 @@
+"""
+Script Validator - Off-loop syntax checking for uploaded scripts
+Developer: @Zeroboy216
+Channel: @zerodevbro
+
+Syntax checkers run as async subprocesses and Python sources are analyzed in
+an executor (or a separate interpreter for large files), so an upload never
+stalls the event loop that hosts the Python bots. Checks wait in a bounded
+per-language queue and share a global concurrency cap; latency is recorded
+per language in a histogram.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sys
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+from analyzer import analyze_source
+from checkers import CheckerPool
+from config import (
+    RUNTIME_CHECK_TIMEOUT, VALIDATION_CONCURRENCY, VALIDATION_LANGUAGE_CONCURRENCY,
+    VALIDATION_QUEUE_LIMIT, CHECKER_DAEMONS_ENABLED, VALIDATION_CACHE_SIZE, VALIDATION_CACHE_PERSIST,
+    BLOCKED_IMPORTS, DANGEROUS_PATTERNS, JS_REQUIRED_PATTERNS, SHELL_BLOCKED_COMMANDS
+)
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+# Sources up to this size are analyzed in a thread, larger ones in a child
+# interpreter: parsing holds the GIL, so a thread alone would still stall the loop
+INLINE_COMPILE_LIMIT = 64 * 1024
+
+ANALYZER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "analyzer.py")
+
+# One-shot checkers, used when the checker daemons are disabled or crash mid-check
+SPAWN_COMMANDS = {
+    'js': ['node', '--check', '-'],
+    'rb': ['ruby', '-c', '-'],
+    'php': ['php', '-l', '-'],
+}
+
+
+# Bump when validation logic changes in a way the rule lists below don't show
+VALIDATION_RULES_REVISION = 5
+
+RULESET_VERSION = hashlib.sha256(json.dumps([
+    VALIDATION_RULES_REVISION, BLOCKED_IMPORTS, DANGEROUS_PATTERNS,
+    JS_REQUIRED_PATTERNS, SHELL_BLOCKED_COMMANDS
+]).encode()).hexdigest()[:16]
+
+# Set when a check was skipped or failed for reasons unrelated to the script
+# (checker missing, timeout, queue full), so the verdict isn't cached
+_uncacheable = ContextVar("validation_uncacheable", default=False)
+
+
+def mark_uncacheable():
+    """Keep the current validation's verdict out of the cache"""
+    _uncacheable.set(True)
+
+
+class ValidationBusy(Exception):
+    """Raised when a language's validation queue is full"""
+
+    def __init__(self, file_type: str):
+        super().__init__(f"Too many {file_type} scripts are being checked, please try again in a moment")
+
+
+class ScriptValidator:
+    """Bounded, non-blocking pipeline for syntax checks"""
+
+    def __init__(self, concurrency: int = VALIDATION_CONCURRENCY,
+                 language_concurrency: int = VALIDATION_LANGUAGE_CONCURRENCY,
+                 queue_limit: int = VALIDATION_QUEUE_LIMIT, timeout: float = RUNTIME_CHECK_TIMEOUT,
+                 use_daemons: bool = CHECKER_DAEMONS_ENABLED):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.language_concurrency = language_concurrency
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self.queues = {}     # file_type -> asyncio.Semaphore
+        self.waiting = {}    # file_type -> checks waiting for a slot
+        self.histograms = {} # file_type -> latency histogram
+        self.use_daemons = use_daemons
+        self.pools = {}      # file_type -> CheckerPool
+        self.stats = {'checks': 0, 'timeouts': 0, 'rejected': 0}
+
+    @asynccontextmanager
+    async def slot(self, file_type: str):
+        """Wait for a per-language slot, then a global one"""
+        if self.waiting.get(file_type, 0) >= self.queue_limit:
+            self.stats['rejected'] += 1
+            raise ValidationBusy(file_type)
+
+        queue = self.queues.setdefault(file_type, asyncio.Semaphore(self.language_concurrency))
+        self.waiting[file_type] = self.waiting.get(file_type, 0) + 1
+        try:
+            await queue.acquire()
+            try:
+                await self.semaphore.acquire()
+            except BaseException:
+                queue.release()
+                raise
+        finally:
+            self.waiting[file_type] -= 1
+
+        try:
+            self.stats['checks'] += 1
+            yield
+        finally:
+            self.semaphore.release()
+            queue.release()
+
+    async def _communicate(self, argv, data: bytes, capture_stdout: bool = False):
+        process = await asyncio.create_subprocess_exec(
+            *argv,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(data), self.timeout)
+        except asyncio.TimeoutError:
+            self.stats['timeouts'] += 1
+            process.kill()
+            await process.wait()
+            raise
+        if capture_stdout:
+            return process.returncode, stdout.decode(errors='ignore'), stderr.decode(errors='ignore')
+        return process.returncode, stderr.decode(errors='ignore')
+
+    async def _spawn_check(self, file_type: str, script: str):
+        returncode, stderr = await self._communicate(SPAWN_COMMANDS[file_type], script.encode())
+        return (stderr or "syntax error") if returncode != 0 else None
+
+    async def check_syntax(self, file_type: str, script: str):
+        """Syntax-check a js/rb/php script, returns the error message or None"""
+        try:
+            return await self._check_syntax(file_type, script)
+        except BaseException:
+            mark_uncacheable()
+            raise
+
+    async def _check_syntax(self, file_type: str, script: str):
+        async with self.slot(file_type):
+            if not self.use_daemons:
+                return await self._spawn_check(file_type, script)
+
+            pool = self.pools.get(file_type)
+            if pool is None:
+                pool = self.pools[file_type] = CheckerPool(file_type, self.language_concurrency, timeout=self.timeout)
+            try:
+                return await pool.check(script)
+            except asyncio.TimeoutError:
+                self.stats['timeouts'] += 1
+                raise
+            except (asyncio.IncompleteReadError, ConnectionError, ValueError) as e:
+                logger.warning(f"{file_type} checker crashed ({e!r}), checking with a one-shot process")
+                return await self._spawn_check(file_type, script)
+
+    async def analyze_python(self, script: str, analyzer):
+        """Analyze a Python source off the loop (see analyzer.ScriptAnalyzer)"""
+        analysis = analyzer.cached(script)
+        if analysis is not None:
+            return analysis
+
+        try:
+            return await self._analyze_python(script, analyzer)
+        except BaseException:
+            mark_uncacheable()
+            raise
+
+    async def _analyze_python(self, script: str, analyzer):
+        async with self.slot('py'):
+            if len(script) <= INLINE_COMPILE_LIMIT:
+                # Only the parse runs in the thread, the caches are updated back on the loop
+                analysis, code = await asyncio.get_running_loop().run_in_executor(
+                    None, analyze_source, script, analyzer.blocked
+                )
+                analyzer.store(script, analysis, code)
+                return analysis
+
+            request = json.dumps({'source': script, 'blocked': analyzer.blocked})
+            returncode, stdout, stderr = await self._communicate(
+                [sys.executable, '-I', ANALYZER_SCRIPT], request.encode('utf-8', errors='surrogateescape'),
+                capture_stdout=True
+            )
+            if returncode != 0:
+                raise RuntimeError(f"Python analyzer failed: {stderr[-200:]}")
+            analysis = json.loads(stdout)
+            analyzer.store(script, analysis)
+            return analysis
+
+    def observe(self, file_type: str, seconds: float):
+        """Record the latency of one validation"""
+        histogram = self.histograms.setdefault(file_type, {
+            'buckets': [0] * (len(LATENCY_BUCKETS) + 1), 'count': 0, 'sum': 0.0
+        })
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                break
+        else:
+            index = len(LATENCY_BUCKETS)
+        histogram['buckets'][index] += 1
+        histogram['count'] += 1
+        histogram['sum'] += seconds
+
+    def get_stats(self):
+        """Counters, queue depth and per-language latency histograms"""
+        labels = [f"<={bound}s" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}s"]
+        return {
+            **self.stats,
+            'waiting': dict(self.waiting),
+            'checkers': {file_type: pool.get_stats() for file_type, pool in self.pools.items()},
+            'latency': {
+                file_type: {
+                    'count': histogram['count'],
+                    'avg_ms': round(histogram['sum'] / histogram['count'] * 1000, 1),
+                    'buckets': dict(zip(labels, histogram['buckets'])),
+                }
+                for file_type, histogram in self.histograms.items()
+            },
+        }
+
+    async def close(self):
+        """Stop the checker daemons"""
+        for pool in self.pools.values():
+            await pool.close()
+
+
+class ValidationCache:
+    """LRU of validation verdicts keyed by script hash, file type and ruleset"""
+
+    def __init__(self, db=None, max_entries: int = VALIDATION_CACHE_SIZE,
+                 persist: bool = VALIDATION_CACHE_PERSIST, ruleset: str = RULESET_VERSION):
+        self.db = db
+        self.max_entries = max_entries
+        self.persist = persist and db is not None
+        self.ruleset = ruleset
+        self.entries = OrderedDict()  # key -> (is_safe, error)
+        self.stats = {'hits': 0, 'db_hits': 0, 'misses': 0}
+
+    def key(self, script: str, file_type: str):
+        digest = hashlib.sha256(script.encode('utf-8', errors='surrogateescape')).hexdigest()
+        return f"{file_type}:{self.ruleset}:{digest}"
+
+    def _remember(self, key: str, verdict):
+        self.entries[key] = verdict
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def get(self, key: str):
+        """Cached (is_safe, error) for a key, or None"""
+        verdict = self.entries.get(key)
+        if verdict is not None:
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return verdict
+
+        if self.persist:
+            try:
+                doc = await self.db.get_validation_result(key)
+            except Exception as e:
+                logger.warning(f"Validation cache lookup failed: {e}")
+                doc = None
+            if doc:
+                verdict = (doc['is_safe'], doc.get('error'))
+                self._remember(key, verdict)
+                self.stats['db_hits'] += 1
+                return verdict
+
+        self.stats['misses'] += 1
+        return None
+
+    async def put(self, key: str, verdict):
+        self._remember(key, verdict)
+        if self.persist:
+            try:
+                await self.db.save_validation_result(key, verdict[0], verdict[1])
+            except Exception as e:
+                logger.warning(f"Validation cache write failed: {e}")
+
+    async def get_or_validate(self, script: str, file_type: str, validate):
+        """Return the cached verdict, or run ``validate`` and cache its result"""
+        key = self.key(script, file_type)
+        verdict = await self.get(key)
+        if verdict is not None:
+            return verdict
+
+        token = _uncacheable.set(False)
+        try:
+            verdict = await validate(script, file_type)
+            if not _uncacheable.get():
+                await self.put(key, verdict)
+        finally:
+            _uncacheable.reset(token)
+        return verdict
+
+    def get_stats(self):
+        lookups = self.stats['hits'] + self.stats['db_hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'entries': len(self.entries),
+            'ruleset': self.ruleset,
+            'hit_rate': round((self.stats['hits'] + self.stats['db_hits']) / lookups * 100, 1) if lookups else 0.0,
+        }
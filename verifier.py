@@ -0,0 +1,139 @@
+"""
+Token Verifier - Fast bot token verification for /addbot
+Developer: @Zeroboy216
+Channel: @zerodevbro
+
+Tokens are checked with a Bot API getMe call over a pooled aiohttp session
+instead of a full MTProto handshake. Results are cached for a short time and
+all verifications share a concurrency limit; MTProto is only used as a
+fallback when the Bot API can't be reached.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+
+import aiohttp
+
+from config import BOT_API_URL, TOKEN_VERIFY_CACHE_SIZE, TOKEN_VERIFY_CACHE_TTL, TOKEN_VERIFY_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+
+class TokenVerifier:
+    """getMe over HTTP with a bounded TTL cache and a concurrency limit"""
+
+    def __init__(self, fallback=None, cache_ttl: float = TOKEN_VERIFY_CACHE_TTL,
+                 concurrency: int = TOKEN_VERIFY_CONCURRENCY, api_url: str = BOT_API_URL,
+                 cache_size: int = TOKEN_VERIFY_CACHE_SIZE):
+        self.fallback = fallback  # async callable(token) -> (is_valid, bot_info)
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.api_url = api_url.rstrip("/")
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.session = None
+        self.cache = OrderedDict()  # token hash -> (expires_at, (is_valid, bot_info)), LRU order
+        self.inflight = {}  # token -> task, so duplicate requests share one call
+        self.stats = {'cache_hits': 0, 'http': 0, 'fallback': 0}
+
+    def _get_session(self):
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=TOKEN_VERIFY_CONCURRENCY, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+        return self.session
+
+    @staticmethod
+    def _key(token: str):
+        # Raw tokens are not kept around in the cache
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def _cached(self, token: str):
+        key = self._key(token)
+        entry = self.cache.get(key)
+        if not entry:
+            return None
+        expires_at, result = entry
+        if expires_at < time.monotonic():
+            del self.cache[key]
+            return None
+        self.cache.move_to_end(key)
+        return result
+
+    def _remember(self, token: str, result):
+        now = time.monotonic()
+        for key in [key for key, (expires_at, _) in self.cache.items() if expires_at < now]:
+            del self.cache[key]
+        key = self._key(token)
+        self.cache[key] = (now + self.cache_ttl, result)
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    async def verify(self, token: str):
+        """Verify a bot token, returns (is_valid, bot_info)"""
+        result = self._cached(token)
+        if result is not None:
+            self.stats['cache_hits'] += 1
+            return result
+
+        # Coalesce concurrent checks of the same token
+        task = self.inflight.get(token)
+        if task is None:
+            task = asyncio.ensure_future(self._verify_limited(token))
+            self.inflight[token] = task
+            task.add_done_callback(lambda _: self.inflight.pop(token, None))
+
+        return await asyncio.shield(task)
+
+    async def _verify_limited(self, token: str):
+        async with self.semaphore:
+            result, definitive = await self._verify_uncached(token)
+        # A failed fallback may just be a network error, so only cache real answers
+        if definitive or result[0]:
+            self._remember(token, result)
+        return result
+
+    async def _verify_uncached(self, token: str):
+        """Returns ((is_valid, bot_info), definitive)"""
+        try:
+            self.stats['http'] += 1
+            async with self._get_session().get(f"{self.api_url}/bot{token}/getMe") as response:
+                if response.status in (401, 404):
+                    logger.info("❌ Token rejected by Bot API")
+                    return (False, None), True
+
+                data = await response.json(content_type=None)
+                if response.status == 200 and data.get("ok"):
+                    me = data["result"]
+                    logger.info(f"✅ Token verified for bot: @{me.get('username')}")
+                    return (True, {
+                        "username": me.get("username"),
+                        "first_name": me.get("first_name"),
+                        "id": me.get("id")
+                    }), True
+
+                raise RuntimeError(f"Bot API returned {response.status}: {data.get('description')}")
+
+        except (aiohttp.ClientError, asyncio.TimeoutError, RuntimeError, ValueError) as e:
+            if not self.fallback:
+                logger.error(f"❌ Token verification failed: {e}")
+                return (False, None), False
+
+            logger.warning(f"Bot API unavailable ({e}), verifying over MTProto")
+            self.stats['fallback'] += 1
+            return await self.fallback(token), False
+
+    def invalidate(self, token: str):
+        """Forget a cached verification result"""
+        self.cache.pop(self._key(token), None)
+
+    def get_stats(self):
+        return {**self.stats, 'cached_tokens': len(self.cache)}
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
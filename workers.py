@@ -0,0 +1,416 @@
+"""
+Worker Pool - Hosts in-process Python bots across several worker processes
+Developer: @Zeroboy216
+Channel: @zerodevbro
+
+Each worker is a separate Python process with its own event loop and GIL,
+hosting many Pyrogram clients. The parent talks to workers over a pair of
+pipes using length-prefixed JSON frames, so a blocking or CPU-heavy bot only
+stalls the bots sharing its worker, never the control bot.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import struct
+import sys
+import time
+
+from config import WORKER_REQUEST_TIMEOUT, LOG_FORMAT, LOG_LEVEL
+
+logger = logging.getLogger(__name__)
+
+WORKER_SCRIPT = os.path.abspath(__file__)
+FRAME_HEADER = struct.Struct("!I")
+
+
+async def read_frame(reader: asyncio.StreamReader):
+    """Read one length-prefixed JSON frame"""
+    header = await reader.readexactly(FRAME_HEADER.size)
+    (length,) = FRAME_HEADER.unpack(header)
+    return json.loads(await reader.readexactly(length))
+
+
+def write_frame(writer: asyncio.StreamWriter, message: dict):
+    """Write one length-prefixed JSON frame"""
+    payload = json.dumps(message).encode()
+    writer.write(FRAME_HEADER.pack(len(payload)) + payload)
+
+
+async def open_pipe_streams(read_fd: int, write_fd: int):
+    """Wrap raw pipe file descriptors in asyncio streams"""
+    loop = asyncio.get_running_loop()
+
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(read_fd, 'rb', 0)
+    )
+
+    transport, protocol = await loop.connect_write_pipe(
+        lambda: asyncio.StreamReaderProtocol(asyncio.StreamReader()), os.fdopen(write_fd, 'wb', 0)
+    )
+    writer = asyncio.StreamWriter(transport, protocol, None, loop)
+
+    return reader, writer
+
+
+class RemoteClient:
+    """Parent-side handle for a Python bot hosted in a worker.
+
+    Mimics the parts of ``pyrogram.Client`` the runner relies on, so worker
+    bots live in ``BotRunner.bot_clients`` like in-process ones.
+    """
+
+    def __init__(self, pool, bot_id: str, code_stats: dict = None):
+        self.pool = pool
+        self.bot_id = bot_id
+        self.code_stats = code_stats or {}  # the worker's code cache counters for this bot
+
+    @property
+    def is_connected(self):
+        return self.pool.is_hosted(self.bot_id)
+
+    @property
+    def worker_index(self):
+        return self.pool.assignments.get(self.bot_id)
+
+    async def stop(self):
+        await self.pool.stop_bot(self.bot_id)
+
+
+class WorkerPool:
+    """Parent-side manager of the worker processes"""
+
+    def __init__(self, size: int, on_crash, request_timeout: float = WORKER_REQUEST_TIMEOUT):
+        self.size = max(1, size)
+        self.on_crash = on_crash          # async callback(bot_id, reason)
+        self.request_timeout = request_timeout
+        self.workers = {}                 # worker index -> worker state
+        self.assignments = {}             # bot_id -> worker index
+        self.bot_specs = {}               # bot_id -> (token, script), used for rebalancing
+        self.crash_tasks = set()          # crash handler tasks in flight
+        self.request_ids = itertools.count(1)
+        self.start_lock = asyncio.Lock()
+        self.closing = False
+        self.respawn_count = 0
+
+    async def ensure_started(self):
+        """Spawn any missing workers"""
+        async with self.start_lock:
+            for index in range(self.size):
+                if index not in self.workers:
+                    await self._spawn(index)
+
+    async def _spawn(self, index: int):
+        """Start worker process number ``index``"""
+        cmd_read, cmd_write = os.pipe()
+        event_read, event_write = os.pipe()
+
+        try:
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, WORKER_SCRIPT, str(index), str(cmd_read), str(event_write),
+                pass_fds=(cmd_read, event_write)
+            )
+        except Exception:
+            for fd in (cmd_read, cmd_write, event_read, event_write):
+                os.close(fd)
+            raise
+
+        os.close(cmd_read)
+        os.close(event_write)
+        reader, writer = await open_pipe_streams(event_read, cmd_write)
+
+        worker = {
+            'index': index,
+            'process': process,
+            'reader': reader,
+            'writer': writer,
+            'bots': set(),
+            'pending': {},    # request id -> future
+            'started_at': time.time(),
+            'stats': None,
+        }
+        try:
+            import psutil
+            worker['stats'] = psutil.Process(process.pid)
+        except Exception:
+            pass
+
+        worker['task'] = asyncio.create_task(self._read_events(worker))
+        self.workers[index] = worker
+        logger.info(f"⚙️ Worker {index} started (pid {process.pid})")
+
+    async def _request(self, worker: dict, message: dict, timeout: float = None):
+        """Send a command to a worker and wait for its reply"""
+        request_id = next(self.request_ids)
+        future = asyncio.get_running_loop().create_future()
+        worker['pending'][request_id] = future
+
+        try:
+            write_frame(worker['writer'], {**message, 'req': request_id})
+            await worker['writer'].drain()
+            reply = await asyncio.wait_for(future, timeout or self.request_timeout)
+        finally:
+            worker['pending'].pop(request_id, None)
+
+        if not reply.get('ok'):
+            raise RuntimeError(reply.get('error', 'worker error'))
+        return reply
+
+    def _pick_worker(self):
+        """Least-loaded live worker"""
+        return min(self.workers.values(), key=lambda worker: len(worker['bots']))
+
+    def _assign(self, bot_id: str, worker: dict, token: str, script: str):
+        worker['bots'].add(bot_id)
+        self.assignments[bot_id] = worker['index']
+        self.bot_specs[bot_id] = (token, script)
+
+    def _forget(self, bot_id: str):
+        index = self.assignments.pop(bot_id, None)
+        self.bot_specs.pop(bot_id, None)
+        if index in self.workers:
+            self.workers[index]['bots'].discard(bot_id)
+        return index
+
+    def is_hosted(self, bot_id: str):
+        """Check if a bot is assigned to a live worker"""
+        return self.assignments.get(bot_id) in self.workers
+
+    async def start_bot(self, bot_id: str, token: str, script: str):
+        """Host a Python bot on the least-loaded worker"""
+        await self.ensure_started()
+
+        worker = self._pick_worker()
+        self._assign(bot_id, worker, token, script)
+        try:
+            reply = await self._request(worker, {'op': 'start', 'bot_id': bot_id, 'token': token, 'script': script})
+        except Exception:
+            self._forget(bot_id)
+            raise
+
+        logger.info(f"✅ Python bot {bot_id} hosted on worker {worker['index']}")
+        return RemoteClient(self, bot_id, reply.get('code_cache'))
+
+    async def stop_bot(self, bot_id: str):
+        """Stop a bot on whichever worker hosts it"""
+        index = self._forget(bot_id)
+        worker = self.workers.get(index)
+        if not worker:
+            return
+
+        try:
+            await self._request(worker, {'op': 'stop', 'bot_id': bot_id})
+        except Exception as e:
+            logger.error(f"Error stopping bot {bot_id} on worker {index}: {e}")
+
+    async def _read_events(self, worker: dict):
+        """Dispatch replies and crash events coming from a worker"""
+        try:
+            while True:
+                message = await read_frame(worker['reader'])
+
+                if 'req' in message:
+                    future = worker['pending'].get(message['req'])
+                    if future and not future.done():
+                        future.set_result(message)
+
+                elif message.get('event') == 'crashed':
+                    bot_id = message['bot_id']
+                    if self.assignments.get(bot_id) == worker['index']:
+                        self._forget(bot_id)
+                        task = asyncio.ensure_future(self.on_crash(bot_id, message.get('reason', 'crashed')))
+                        self.crash_tasks.add(task)
+                        task.add_done_callback(self.crash_tasks.discard)
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            logger.error(f"Worker {worker['index']} protocol error: {e}")
+
+        if not self.closing:
+            await self._handle_worker_death(worker)
+
+    async def _handle_worker_death(self, worker: dict):
+        """Respawn a dead worker and spread its bots over the pool"""
+        index = worker['index']
+        try:
+            worker['process'].kill()
+        except ProcessLookupError:
+            pass
+        returncode = await worker['process'].wait()
+
+        orphans = list(worker['bots'])
+        logger.error(f"💥 Worker {index} died (code {returncode}), rebalancing {len(orphans)} bots")
+
+        for future in worker['pending'].values():
+            if not future.done():
+                future.set_exception(ConnectionError(f"worker {index} died"))
+
+        specs = {bot_id: self.bot_specs[bot_id] for bot_id in orphans if bot_id in self.bot_specs}
+        for bot_id in orphans:
+            self._forget(bot_id)
+        self.workers.pop(index, None)
+        self.respawn_count += 1
+
+        try:
+            await self.ensure_started()
+        except Exception as e:
+            logger.error(f"Failed to respawn worker {index}: {e}")
+
+        await asyncio.gather(*(
+            self._rehost(bot_id, token, script) for bot_id, (token, script) in specs.items()
+        ))
+
+    async def _rehost(self, bot_id: str, token: str, script: str):
+        """Move an orphaned bot to a live worker"""
+        try:
+            if not self.workers:
+                raise RuntimeError("no live workers")
+            worker = self._pick_worker()
+            self._assign(bot_id, worker, token, script)
+            await self._request(worker, {'op': 'start', 'bot_id': bot_id, 'token': token, 'script': script})
+            logger.info(f"♻️ Bot {bot_id} moved to worker {worker['index']}")
+        except Exception as e:
+            self._forget(bot_id)
+            await self.on_crash(bot_id, f"worker died and rehosting failed: {e}")
+
+    def get_load(self):
+        """Per-worker load: hosted bots, CPU and memory"""
+        load = []
+        for index, worker in sorted(self.workers.items()):
+            entry = {
+                'index': index,
+                'pid': worker['process'].pid,
+                'bots': len(worker['bots']),
+                'uptime': int(time.time() - worker['started_at']),
+            }
+            if worker['stats']:
+                try:
+                    entry['cpu_percent'] = worker['stats'].cpu_percent(interval=None)
+                    entry['memory_mb'] = round(worker['stats'].memory_info().rss / (1024 * 1024), 1)
+                except Exception:
+                    pass
+            load.append(entry)
+        return load
+
+    async def shutdown(self):
+        """Stop all workers"""
+        self.closing = True
+
+        for worker in list(self.workers.values()):
+            try:
+                await self._request(worker, {'op': 'shutdown'}, timeout=30)
+            except Exception:
+                pass
+            try:
+                await asyncio.wait_for(worker['process'].wait(), timeout=10)
+            except asyncio.TimeoutError:
+                worker['process'].kill()
+            worker['task'].cancel()
+
+        self.workers.clear()
+        self.assignments.clear()
+        self.bot_specs.clear()
+        logger.info("✅ Worker pool stopped")
+
+
+class WorkerHost:
+    """Runs inside a worker process and hosts Python bot clients"""
+
+    def __init__(self, index: int, writer: asyncio.StreamWriter):
+        from runner import BotSupervisor
+
+        self.index = index
+        self.writer = writer
+        self.clients = {}  # bot_id -> Client
+        self.supervisor = BotSupervisor(self._on_crash)
+        self.stopped = asyncio.Event()
+
+    def send(self, message: dict):
+        write_frame(self.writer, message)
+
+    async def _on_crash(self, bot_id: str, reason: str):
+        """Report a dead client to the parent"""
+        await self._stop_client(bot_id)
+        self.send({'event': 'crashed', 'bot_id': bot_id, 'reason': reason})
+
+    async def _stop_client(self, bot_id: str):
+        self.supervisor.unwatch(bot_id)
+        client = self.clients.pop(bot_id, None)
+        if client:
+            try:
+                await client.stop()
+            except Exception:
+                pass
+
+    async def _start_client(self, bot_id: str, token: str, script: str):
+        """Start a client, returns this bot's code cache counters"""
+        from runner import launch_python_bot, code_cache
+
+        await self._stop_client(bot_id)
+        client = await launch_python_bot(bot_id, token, script)
+        self.clients[bot_id] = client
+        self.supervisor.watch_client(bot_id, client)
+        return code_cache.get_bot_stats(bot_id)
+
+    async def _stop_all(self):
+        await asyncio.gather(*(self._stop_client(bot_id) for bot_id in list(self.clients)))
+
+    async def handle(self, message: dict):
+        """Execute one command from the parent and reply"""
+        op = message.get('op')
+        reply = {'req': message.get('req'), 'ok': True}
+
+        try:
+            if op == 'start':
+                reply['code_cache'] = await self._start_client(message['bot_id'], message['token'], message['script'])
+            elif op == 'stop':
+                await self._stop_client(message['bot_id'])
+            elif op == 'shutdown':
+                await self._stop_all()
+                self.stopped.set()
+            else:
+                raise ValueError(f"unknown op: {op}")
+        except Exception as e:
+            reply = {'req': message.get('req'), 'ok': False, 'error': str(e)}
+
+        self.send(reply)
+
+    async def serve(self, reader: asyncio.StreamReader):
+        """Read commands until shutdown or until the parent goes away"""
+        tasks = set()
+
+        async def read_loop():
+            try:
+                while True:
+                    message = await read_frame(reader)
+                    task = asyncio.create_task(self.handle(message))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                # Parent is gone: don't leave orphaned bots running
+                await self._stop_all()
+                self.stopped.set()
+
+        read_task = asyncio.create_task(read_loop())
+        await self.stopped.wait()
+        read_task.cancel()
+        await self.writer.drain()
+
+
+async def _worker_main(index: int, read_fd: int, write_fd: int):
+    reader, writer = await open_pipe_streams(read_fd, write_fd)
+    host = WorkerHost(index, writer)
+    logger.info(f"⚙️ Worker {index} ready")
+    await host.serve(reader)
+
+
+if __name__ == "__main__":
+    worker_index, command_fd, event_fd = (int(arg) for arg in sys.argv[1:4])
+    logging.basicConfig(level=LOG_LEVEL, format=f"[worker {worker_index}] {LOG_FORMAT}")
+    asyncio.run(_worker_main(worker_index, command_fd, event_fd))
@@ -0,0 +1,195 @@
+"""
+Script Workspace - Content-addressed script files for subprocess bots
+Developer: @Zeroboy216
+Channel: @zerodevbro
+
+Scripts are written once to WORKSPACE_DIR under the hash of their content
+and reused across restarts. Bots hosting the same script share one file;
+references are counted per bot and files nobody uses any more are reclaimed
+by collect() once they have been idle for WORKSPACE_GC_GRACE seconds.
+
+Bot tokens are passed in the environment, never written here. The workspace
+is only accessible to the hoster's user (0700 directories, 0600 files), and a
+script that contains its bot's token anyway is deleted as soon as no bot runs
+from it.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from config import WORKSPACE_DIR, WORKSPACE_GC_GRACE
+
+logger = logging.getLogger(__name__)
+
+# Per-start temp dirs left behind by older versions (tempfile.mkdtemp + bot_<id>.<ext>)
+LEGACY_ENTRY = re.compile(r"^bot_[0-9a-f]{24}(\.(js|sh|rb|php|go))?$")
+
+# Header older versions put in front of JavaScript bots, followed by the token
+LEGACY_TOKEN_HEADER = b"\n// Bot Token (injected)\nconst BOT_TOKEN = '"
+
+
+class ScriptWorkspace:
+    """Reference-counted script files keyed by content hash"""
+
+    def __init__(self, root: str = WORKSPACE_DIR, grace: float = WORKSPACE_GC_GRACE):
+        self.root = os.path.abspath(root)
+        self.scripts_dir = os.path.join(self.root, "scripts")
+        self.grace = grace
+        self.refs = {}      # file name -> set of bot_ids using it
+        self.bot_refs = {}  # bot_id -> file name
+        self.secrets = set()  # file names holding a bot token, removed once unused
+        self.stats = {'writes': 0, 'reuses': 0, 'reclaimed': 0, 'reclaimed_bytes': 0, 'purged': 0}
+
+        os.makedirs(self.scripts_dir, mode=0o700, exist_ok=True)
+        for directory in (self.root, self.scripts_dir):
+            os.chmod(directory, 0o700)  # created 0755 by older versions
+        self._purge_legacy_tokens()
+
+    def write_script(self, script: str, ext: str, mode: int = 0o600, secret: str = None):
+        """Path of the workspace file holding ``script``, written only if missing.
+
+        If ``secret`` occurs in the script, the file is purged once no bot uses it.
+        """
+        data = script.encode('utf-8')
+        name = f"{hashlib.sha256(data).hexdigest()}.{ext}"
+        path = os.path.join(self.scripts_dir, name)
+        if secret and secret in script:
+            self.secrets.add(name)
+
+        if os.path.exists(path):
+            self.stats['reuses'] += 1
+            os.utime(path)  # keeps freshly reused files out of the collector's reach
+            return path
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.scripts_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.chmod(tmp_path, mode)
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        self.stats['writes'] += 1
+        return path
+
+    def acquire(self, bot_id: str, path: str):
+        """Record that a bot runs from ``path``"""
+        self.release(bot_id)
+        name = os.path.basename(path)
+        self.refs.setdefault(name, set()).add(bot_id)
+        self.bot_refs[bot_id] = name
+
+    def release(self, bot_id: str):
+        """Drop a bot's reference; the file stays around for quick restarts"""
+        name = self.bot_refs.pop(bot_id, None)
+        if name is None:
+            return
+
+        users = self.refs.get(name)
+        if users is not None:
+            users.discard(bot_id)
+            if not users:
+                del self.refs[name]
+                path = os.path.join(self.scripts_dir, name)
+                if name in self.secrets:
+                    self.secrets.discard(name)
+                    self.stats['purged'] += self._remove(path)
+                    return
+                try:
+                    os.utime(path)  # start the grace period now
+                except FileNotFoundError:
+                    pass
+
+    def _remove(self, path: str):
+        try:
+            if os.path.isdir(path):
+                size = sum(
+                    os.path.getsize(os.path.join(dirpath, f))
+                    for dirpath, _, files in os.walk(path) for f in files
+                )
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                size = os.path.getsize(path)
+                os.remove(path)
+        except OSError:
+            return 0
+
+        self.stats['reclaimed'] += 1
+        self.stats['reclaimed_bytes'] += size
+        return 1
+
+    def _purge_legacy_tokens(self):
+        """Remove JavaScript scripts older versions wrote with the bot token injected"""
+        for name in os.listdir(self.scripts_dir):
+            if not name.endswith(".js"):
+                continue
+            path = os.path.join(self.scripts_dir, name)
+            try:
+                with open(path, 'rb') as f:
+                    header = f.read(len(LEGACY_TOKEN_HEADER))
+            except OSError:
+                continue
+            if header == LEGACY_TOKEN_HEADER:
+                self.stats['purged'] += self._remove(path)
+
+    def _collect_legacy(self, cutoff: float):
+        """Remove per-start temp dirs leaked by older versions"""
+        removed = 0
+        temp_root = tempfile.gettempdir()
+        try:
+            candidates = os.listdir(temp_root)
+        except OSError:
+            return 0
+
+        for name in candidates:
+            path = os.path.join(temp_root, name)
+            try:
+                if not name.startswith("tmp") or not os.path.isdir(path) or os.path.getmtime(path) > cutoff:
+                    continue
+                entries = os.listdir(path)
+            except OSError:
+                continue
+            if entries and all(LEGACY_ENTRY.match(entry) for entry in entries):
+                removed += self._remove(path)
+        return removed
+
+    def collect(self):
+        """Reclaim unreferenced scripts past the grace period, partial writes and leaked temp dirs"""
+        cutoff = time.time() - self.grace
+        removed = 0
+
+        for name in os.listdir(self.scripts_dir):
+            if name in self.refs:
+                continue
+            path = os.path.join(self.scripts_dir, name)
+            try:
+                if os.path.getmtime(path) > cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            removed += self._remove(path)
+
+        return removed + self._collect_legacy(cutoff)
+
+    def get_stats(self):
+        files = os.listdir(self.scripts_dir)
+        return {
+            **self.stats,
+            'files': len(files),
+            'in_use': len(self.refs),
+            'bots': len(self.bot_refs),
+            'size_mb': round(sum(
+                os.path.getsize(os.path.join(self.scripts_dir, f))
+                for f in files if os.path.exists(os.path.join(self.scripts_dir, f))
+            ) / (1024 * 1024), 2),
+        }